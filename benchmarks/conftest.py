@@ -0,0 +1,50 @@
+"""
+Shared fixtures for the PyTest-Gen benchmarks
+"""
+
+import pytest
+
+from fake_llm_server import FakeLLMServer
+from synthetic_project import make_project
+
+FUNCTIONS_PER_FILE = 20
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-functions",
+        default="1000",
+        help="Comma-separated synthetic project sizes in functions, e.g. 1000,10000,100000 (default: 1000)",
+    )
+    parser.addoption(
+        "--bench-latency",
+        default=0.0,
+        type=float,
+        help="Seconds the fake LLM server waits before answering (default: 0)",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "function_count" in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption("--bench-functions").split(",") if size]
+        metafunc.parametrize("function_count", sizes, indirect=True, ids=[f"{size}fn" for size in sizes])
+
+
+@pytest.fixture(scope="session")
+def function_count(request):
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def project(tmp_path_factory, function_count):
+    """Synthetic project with ``function_count`` functions, shared by all benchmarks"""
+    root = tmp_path_factory.mktemp(f"project_{function_count}")
+    make_project(root, files=max(1, function_count // FUNCTIONS_PER_FILE), functions_per_file=FUNCTIONS_PER_FILE)
+    return root
+
+
+@pytest.fixture(scope="session")
+def fake_llm(request):
+    """Running fake OpenAI-compatible server"""
+    with FakeLLMServer(latency=request.config.getoption("--bench-latency")) as server:
+        yield server
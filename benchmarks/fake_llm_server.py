@@ -0,0 +1,237 @@
+"""
+Local OpenAI-compatible stub server for PyTest-Gen benchmarks
+
+Answers ``POST /v1/chat/completions`` with a valid test for every function
+named in the prompt (including packed prompts), after a configurable
+latency. An optional requests-per-minute limit answers HTTP 429 with a
+``retry-after-ms`` header, like the real API. Requests with ``stream: true``
+are answered as server-sent events, one line per chunk.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+PACK_MARKER_RE = re.compile(r"^# === pytestgen function (\d+): (\S+) ===$", re.MULTILINE)
+SIGNATURE_RE = re.compile(r"^def (\w+)\(", re.MULTILINE)
+
+TEST_TEMPLATE = '''from module import {name}
+
+def test_{name}_returns_dict():
+    assert isinstance({name}([]), dict)
+'''
+
+# Prose a rambling model adds after the code block, one streamed chunk each
+TRAILING_CHUNK = "This test checks the return type. "
+
+
+def completion_text(prompt: str) -> str:
+    """
+    Build a completion answering a pytestgen prompt
+
+    Args:
+        prompt: User prompt sent by pytestgen
+
+    Returns:
+        Test code, split into marker sections for packed prompts
+    """
+    markers = PACK_MARKER_RE.findall(prompt)
+    if markers:
+        return "\n".join(
+            f"# === pytestgen function {position}: {name} ===\n" + TEST_TEMPLATE.format(name=name)
+            for position, name in markers
+        )
+    match = SIGNATURE_RE.search(prompt)
+    return TEST_TEMPLATE.format(name=match.group(1) if match else "function")
+
+
+class FakeLLMServer:
+    """
+    Stub chat-completions server running on a background thread
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        requests_per_minute: Optional[float] = None,
+        port: int = 0,
+        chunk_latency: float = 0.0,
+        trailing_chunks: int = 0,
+    ):
+        """
+        Initialize the server
+
+        Args:
+            latency: Seconds to wait before answering each request
+            requests_per_minute: Answer HTTP 429 beyond this rate (None for unlimited)
+            port: Port to listen on (0 picks a free one)
+            chunk_latency: Seconds between streamed chunks
+            trailing_chunks: Chunks of prose streamed after a fenced code block
+                (0 streams the bare test code)
+        """
+        self.latency = latency
+        self.requests_per_minute = requests_per_minute
+        self.chunk_latency = chunk_latency
+        self.trailing_chunks = trailing_chunks
+        self.requests = 0
+        self.chunks_sent = 0
+        self.throttled = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """OpenAI ``base_url`` pointing at this server"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _admit(self) -> Optional[float]:
+        """Count a request; return the retry delay in seconds if it exceeds the rate limit"""
+        with self._lock:
+            self.requests += 1
+            if not self.requests_per_minute:
+                return None
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 60.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.requests_per_minute:
+                self.throttled += 1
+                return 60.0 - (now - self._recent[0])
+            self._recent.append(now)
+            return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._reply(404, {"error": {"message": f"unknown path {self.path}"}})
+                    return
+
+                retry_after = server._admit()
+                if retry_after is not None:
+                    self._reply(
+                        429,
+                        {"error": {"message": "rate limit exceeded", "type": "rate_limit_exceeded"}},
+                        {"retry-after-ms": str(int(retry_after * 1000))},
+                    )
+                    return
+
+                if server.latency:
+                    time.sleep(server.latency)
+                prompt = body.get("messages", [{}])[-1].get("content", "")
+                text = completion_text(prompt)
+                if body.get("stream"):
+                    self._stream(body, text)
+                    return
+                self._reply(200, {
+                    "id": f"chatcmpl-{server.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": len(prompt) // 4 + 1,
+                        "completion_tokens": len(text) // 4 + 1,
+                        "total_tokens": (len(prompt) + len(text)) // 4 + 2,
+                    },
+                })
+
+            def _stream(self, body, text):
+                chunks = text.splitlines(keepends=True)
+                if server.trailing_chunks:
+                    chunks = ["```python\n"] + chunks + ["```\n"] + [TRAILING_CHUNK] * server.trailing_chunks
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                try:
+                    for chunk in chunks:
+                        if server.chunk_latency:
+                            time.sleep(server.chunk_latency)
+                        self._event({
+                            "id": f"chatcmpl-{server.requests}",
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": body.get("model", "fake"),
+                            "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+                        })
+                        with server._lock:
+                            server.chunks_sent += 1
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client closed the stream early
+                    pass
+
+            def _event(self, payload):
+                self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+
+            def _reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stub server")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each answer (default: 0)")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests per minute before answering 429")
+    parser.add_argument("--chunk-latency", type=float, default=0.0, help="Seconds between streamed chunks (default: 0)")
+    parser.add_argument("--trailing-chunks", type=int, default=0, help="Prose chunks streamed after the code block (default: 0)")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        latency=args.latency, requests_per_minute=args.rpm, port=args.port,
+        chunk_latency=args.chunk_latency, trailing_chunks=args.trailing_chunks
+    )
+    print(f"Serving on {server.base_url} (set OPENAI_BASE_URL to use it)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
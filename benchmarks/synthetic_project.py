@@ -0,0 +1,112 @@
+"""
+Synthetic project generator for PyTest-Gen benchmarks
+"""
+
+import argparse
+from pathlib import Path
+
+# Source files per package directory, to mimic a monorepo layout
+FILES_PER_PACKAGE = 50
+
+FUNCTION_TEMPLATE = '''
+def {name}(items: List[int], threshold: int = 0, label: Optional[str] = None) -> Dict[str, int]:
+    """
+{docstring}
+    """
+    result = {{}}
+    for item in items:
+        if item > threshold and label:
+            result[label] = result.get(label, 0) + item
+        elif item < 0:
+            continue
+    return result
+'''
+
+TEST_TEMPLATE = '''
+def test_{name}():
+    assert {name}([1, 2], label="x") == {{"x": 3}}
+'''
+
+
+def function_name(file_index: int, function_index: int) -> str:
+    """
+    Name of a generated function
+
+    Args:
+        file_index: Index of the source file
+        function_index: Index of the function within its file
+
+    Returns:
+        Function name, unique across the project
+    """
+    return f"compute_{file_index}_{function_index}"
+
+
+def make_project(
+    root: Path,
+    files: int,
+    functions_per_file: int = 20,
+    docstring_lines: int = 5,
+    tested_ratio: float = 0.1,
+) -> int:
+    """
+    Write a synthetic project of plain functions with a partial test suite
+
+    Source files are spread over ``pkg_<n>`` packages; a fraction of the
+    functions get a matching test in ``tests/``.
+
+    Args:
+        root: Directory to create the project in
+        files: Number of source files
+        functions_per_file: Functions defined in each source file
+        docstring_lines: Lines of prose in each docstring
+        tested_ratio: Fraction of functions that already have a test
+
+    Returns:
+        Total number of functions written
+    """
+    root = Path(root)
+    tests_dir = root / "tests"
+    tests_dir.mkdir(parents=True, exist_ok=True)
+    docstring = "\n".join(
+        f"    Line {line} describing what the function does with its arguments."
+        for line in range(docstring_lines)
+    )
+    tested_every = int(1 / tested_ratio) if tested_ratio > 0 else 0
+
+    for file_index in range(files):
+        package = root / f"pkg_{file_index // FILES_PER_PACKAGE}"
+        if not package.exists():
+            package.mkdir()
+            (package / "__init__.py").write_text("", encoding="utf-8")
+
+        names = [function_name(file_index, i) for i in range(functions_per_file)]
+        source = ["from typing import Dict, List, Optional\n"]
+        source.extend(FUNCTION_TEMPLATE.format(name=name, docstring=docstring) for name in names)
+        (package / f"module_{file_index}.py").write_text("".join(source), encoding="utf-8")
+
+        tested = names[::tested_every] if tested_every else []
+        if tested:
+            test_source = [f"from pkg_{file_index // FILES_PER_PACKAGE}.module_{file_index} import *\n"]
+            test_source.extend(TEST_TEMPLATE.format(name=name) for name in tested)
+            (tests_dir / f"test_module_{file_index}.py").write_text("".join(test_source), encoding="utf-8")
+
+    return files * functions_per_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic project for benchmarking pytestgen")
+    parser.add_argument("root", type=Path, help="Directory to create the project in")
+    parser.add_argument("--functions", type=int, default=1000, help="Total number of functions (default: 1000)")
+    parser.add_argument("--functions-per-file", type=int, default=20, help="Functions per source file (default: 20)")
+    parser.add_argument("--docstring-lines", type=int, default=5, help="Lines per docstring (default: 5)")
+    parser.add_argument("--tested-ratio", type=float, default=0.1, help="Fraction of functions with tests (default: 0.1)")
+    args = parser.parse_args()
+
+    files = max(1, args.functions // args.functions_per_file)
+    total = make_project(args.root, files, args.functions_per_file, args.docstring_lines, args.tested_ratio)
+    print(f"Wrote {total} functions in {files} files to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
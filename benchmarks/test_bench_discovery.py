@@ -0,0 +1,41 @@
+"""
+Discovery and prompt-building benchmarks
+"""
+
+import pytest
+
+from pytestgen.discovery_index import DiscoveryIndex
+from pytestgen.function_discovery import FunctionDiscovery
+from pytestgen.test_generator import TestGenerator
+
+pytest.importorskip("pytest_benchmark")
+
+
+def test_discover_cold(benchmark, project):
+    functions = benchmark(lambda: FunctionDiscovery(project).discover())
+    assert functions
+
+
+def test_discover_warm_index(benchmark, project, tmp_path):
+    index_path = tmp_path / "discovery_index.json"
+    FunctionDiscovery(project, index=DiscoveryIndex(index_path)).discover()
+
+    functions = benchmark(lambda: FunctionDiscovery(project, index=DiscoveryIndex(index_path)).discover())
+    assert functions
+
+
+def test_get_untested_functions(benchmark, project):
+    discovery = FunctionDiscovery(project)
+    discovery.discover()
+
+    untested = benchmark(discovery.get_untested_functions)
+    assert untested
+
+
+def test_generate_prompt(benchmark, project):
+    discovery = FunctionDiscovery(project)
+    functions = discovery.discover()
+    generator = TestGenerator(api_key="benchmark")
+
+    prompts = benchmark(lambda: [generator._generate_prompt(function_info) for function_info in functions])
+    assert len(prompts) == len(functions)
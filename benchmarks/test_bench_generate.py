@@ -0,0 +1,72 @@
+"""
+End-to-end ``pytestgen generate`` throughput against the fake LLM server
+"""
+
+import shutil
+
+import pytest
+from click.testing import CliRunner
+
+from pytestgen import cli
+
+pytest.importorskip("pytest_benchmark")
+
+
+def test_generate_end_to_end(benchmark, project, fake_llm, function_count, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_BASE_URL", fake_llm.base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "benchmark")
+    output_dir = tmp_path / "generated"
+    runner = CliRunner()
+
+    def setup():
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    def run():
+        return runner.invoke(cli, [
+            "generate",
+            "--project-dir", str(project),
+            "--output-dir", str(output_dir),
+            "--no-cache",
+            "--no-index",
+            "--concurrency", "32",
+        ])
+
+    result = benchmark.pedantic(run, setup=setup, rounds=1, iterations=1)
+
+    assert result.exit_code == 0, result.output
+    assert "❌" not in result.output
+    benchmark.extra_info["functions"] = function_count
+    benchmark.extra_info["requests"] = fake_llm.requests
+
+
+def test_generate_streaming(benchmark, project, function_count, tmp_path, monkeypatch):
+    from fake_llm_server import FakeLLMServer
+
+    # a model that keeps talking after the code block
+    with FakeLLMServer(chunk_latency=0.001, trailing_chunks=40) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "benchmark")
+        output_dir = tmp_path / "generated"
+        runner = CliRunner()
+
+        def setup():
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        def run():
+            return runner.invoke(cli, [
+                "generate",
+                "--project-dir", str(project),
+                "--output-dir", str(output_dir),
+                "--no-cache",
+                "--no-index",
+                "--concurrency", "32",
+                "--stream",
+            ])
+
+        result = benchmark.pedantic(run, setup=setup, rounds=1, iterations=1)
+
+    assert result.exit_code == 0, result.output
+    assert "❌" not in result.output
+    benchmark.extra_info["functions"] = function_count
+    benchmark.extra_info["requests"] = server.requests
+    benchmark.extra_info["chunks_sent"] = server.chunks_sent
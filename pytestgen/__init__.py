@@ -4,11 +4,32 @@ PyTest-Gen - AI-Powered Test-Case Generator for Python
 """
 
 import click
+import contextlib
+import cProfile
+import itertools
 import os
 import sys
 from pathlib import Path
 from .function_discovery import FunctionDiscovery
 from .test_generator import TestGenerator
+from .cache import ResponseCache
+from .discovery_index import DiscoveryIndex, default_index_path
+from .file_walker import FileWalker
+from .batch import BatchRunner, OpenAIBatchTransport
+from .rate_limit import RequestScheduler, RetryPolicy
+from .test_writer import TestFileWriter
+from .validation import TestValidator
+from .metrics import Metrics
+from .git_diff import GitDiffError, changed_lines
+from .journal import ProgressJournal, default_journal_path
+from .backends import ROUTING_STRATEGIES, BackendPool, endpoints_from_specs
+from .dedup import Deduplicator
+from .watch import FunctionWatcher
+from .sharding import default_bundle_path, in_shard, merge_bundles, parse_shard, write_bundle
+from .coverage_db import CoverageData, CoverageDataError, rank_by_coverage, select_within_budget
+
+# Request files and job state of batch submissions, relative to the project
+BATCH_STATE_DIR = Path(".pytestgen") / "batches"
 
 @click.group()
 @click.version_option("0.1.0")
@@ -20,35 +41,277 @@ def cli():
 @click.option("--project-dir", default=".", type=click.Path(exists=True), help="Project directory to scan")
 @click.option("--api-key", envvar="OPENAI_API_KEY", help="OpenAI API key")
 @click.option("--max-functions", default=None, type=int, help="Maximum number of functions to process")
-@click.option("--overwrite", is_flag=True, help="Overwrite existing test files")
+@click.option("--max-files", default=None, type=int, help="Maximum number of source files to scan")
+@click.option("--include", multiple=True, help="Only scan files matching this glob (repeatable)")
+@click.option("--exclude", multiple=True, help="Skip files and directories matching this gitignore-style pattern (repeatable)")
+@click.option("--follow-symlinks", is_flag=True, help="Descend into symlinked directories")
+@click.option("--overwrite", is_flag=True, help="Replace existing test files instead of merging new tests into them")
 @click.option("--model", default="gpt-4o", help="LLM model to use")
 @click.option("--dry-run", is_flag=True, help="Print generated tests to the console instead of writing files")
 @click.option("--output-dir", default="tests", type=click.Path(), help="Directory to write generated test files (default: ./tests)")
-def generate(project_dir, api_key, max_functions, overwrite, model, dry_run, output_dir):
+@click.option("--concurrency", default=1, type=click.IntRange(min=1), help="Number of LLM requests to run in parallel (default: 1)")
+@click.option("--timeout", default=None, type=float, help="Per-request timeout in seconds")
+@click.option("--no-cache", is_flag=True, help="Always call the API instead of reusing cached responses")
+@click.option("--cache-dir", default=None, type=click.Path(), help="Response cache directory (default: ~/.cache/pytestgen)")
+@click.option("--no-index", is_flag=True, help="Re-parse every file instead of using the incremental discovery index")
+@click.option("--jobs", default=1, type=click.IntRange(min=1), help="Number of processes used to parse source files (default: 1)")
+@click.option("--pack-token-budget", default=0, type=click.IntRange(min=0), help="Pack functions from the same file into one request up to this many prompt tokens (default: 0, disabled)")
+@click.option("--batch", is_flag=True, help="Submit all requests as one offline batch job instead of calling the API directly")
+@click.option("--batch-id", default=None, help="Resume polling a previously submitted batch job and write its results")
+@click.option("--batch-wait/--no-batch-wait", default=True, help="Wait for the batch job to finish (default) or exit after submitting")
+@click.option("--poll-interval", default=30.0, type=float, help="Seconds between batch status polls (default: 30)")
+@click.option("--rpm", default=None, type=float, help="Maximum requests per minute")
+@click.option("--tpm", default=None, type=float, help="Maximum tokens per minute (estimated prompt + completion tokens)")
+@click.option("--max-retries", default=2, type=click.IntRange(min=0), help="Retries for rate-limited or failed requests (default: 2)")
+@click.option("--prompt-token-budget", default=0, type=click.IntRange(min=0), help="Shorten long docstrings and signatures so each prompt fits this many tokens (default: 0, disabled)")
+@click.option("--max-output-tokens", default=1000, type=click.IntRange(min=1), help="Upper bound on completion tokens per function; the limit is sized from its complexity (default: 1000)")
+@click.option("--no-validate", is_flag=True, help="Write generated tests without checking that they compile and import their target")
+@click.option("--max-attempts", default=2, type=click.IntRange(min=1), help="Generation attempts per function when validation fails (default: 2)")
+@click.option("--lint", is_flag=True, help="Also reject generated tests with pyflakes errors (requires pyflakes)")
+@click.option("--metrics-json", default=None, type=click.Path(dir_okay=False), help="Write per-stage timings, request latency percentiles, token usage and cache hit rate to this JSON file")
+@click.option("--profile", default=None, type=click.Path(dir_okay=False), help="Run under cProfile and write the stats to this file (main thread only)")
+@click.option("--since", default=None, help="Only generate tests for functions changed since this git ref (e.g. origin/main)")
+@click.option("--module-context-tokens", default=0, type=click.IntRange(min=0), help="Send an outline of each function's module (imports, constants, class and function signatures) of up to this many tokens as a shared prompt prefix (default: 0, disabled)")
+@click.option("--resume", is_flag=True, help="Continue an interrupted run: replay results recorded in the progress journal instead of generating them again")
+@click.option("--endpoint", "endpoints", multiple=True, help="OpenAI-compatible base URL to send requests to, as URL[,weight=N][,key_env=VAR] (repeatable; default: the OpenAI API)")
+@click.option("--routing", default="least-outstanding", type=click.Choice(ROUTING_STRATEGIES), help="How requests are spread across several --endpoint values (default: least-outstanding)")
+@click.option("--stream", is_flag=True, help="Stream completions and stop each one as soon as its code block is complete")
+@click.option("--no-dedup", is_flag=True, help="Generate tests for every copy of identical functions instead of once per distinct function")
+@click.option("--coverage-file", default=None, type=click.Path(exists=True, dir_okay=False), help="coverage.py data file (.coverage); generate tests for the functions with the most uncovered lines times complexity first")
+@click.option("--budget", default=None, type=click.IntRange(min=1), help="Generate tests for at most this many functions, or within this many estimated tokens (see --budget-unit), highest-priority functions first")
+@click.option("--budget-unit", default="functions", type=click.Choice(["functions", "tokens"]), help="Unit of --budget: functions, or estimated prompt + completion tokens of one attempt per function (default: functions)")
+@click.option("--shard", default=None, help="Only generate tests for shard i of N (e.g. 2/8), chosen by a stable hash of file path and qualified name; results go to a bundle for 'pytestgen merge'")
+@click.option("--bundle", default=None, type=click.Path(dir_okay=False), help="Results bundle written with --shard (default: .pytestgen/shards/shard-<i>-of-<N>.json)")
+def generate(project_dir, api_key, max_functions, max_files, include, exclude, follow_symlinks, overwrite, model, dry_run, output_dir, concurrency, timeout, no_cache, cache_dir, no_index, jobs, pack_token_budget, batch, batch_id, batch_wait, poll_interval, rpm, tpm, max_retries, prompt_token_budget, max_output_tokens, no_validate, max_attempts, lint, metrics_json, profile, since, module_context_tokens, resume, endpoints, routing, stream, no_dedup, coverage_file, budget, budget_unit, shard, bundle):
     """Generate pytest test cases for Python functions."""
     if not api_key:
         click.echo("Error: API key is required. Please provide --api-key or set OPENAI_API_KEY environment variable.")
         sys.exit(1)
 
     project_path = Path(project_dir).resolve()
+    if shard:
+        try:
+            shard_index, shard_count = parse_shard(shard)
+        except ValueError as e:
+            click.echo(f"Error: invalid --shard: {e}")
+            sys.exit(1)
+        bundle = Path(bundle) if bundle else default_bundle_path(project_path, shard_index, shard_count)
     click.echo(f"🔍 Scanning project at {project_path}")
     click.echo(f"🤖 Using model: {model}")
 
-    # Discover functions
-    discovery = FunctionDiscovery(project_path)
-    functions = discovery.discover(max_files=max_functions)
-    untested = discovery.get_untested_functions()
-    
-    if not untested:
-        click.echo("✅ All functions have tests. No new tests needed!")
-        return
+    metrics = Metrics()
+    client = None
+    if endpoints:
+        try:
+            client = BackendPool(endpoints_from_specs(endpoints, api_key), strategy=routing, metrics=metrics)
+        except ValueError as e:
+            click.echo(f"Error: invalid --endpoint: {e}")
+            sys.exit(1)
+        click.echo(f"🔀 Routing requests across {len(client.endpoints)} endpoints ({routing})")
+
+    with _instrumented(metrics, metrics_json, profile):
+        cache = None if no_cache else ResponseCache(cache_dir)
+        generator_options = dict(
+            api_key=api_key,
+            model=model,
+            concurrency=concurrency,
+            timeout=timeout,
+            cache=cache,
+            pack_token_budget=pack_token_budget,
+            prompt_token_budget=prompt_token_budget,
+            max_output_tokens=max_output_tokens,
+            validator=None if no_validate else TestValidator(lint=lint),
+            max_attempts=max_attempts,
+            metrics=metrics,
+            module_context_tokens=module_context_tokens,
+            client=client,
+            stream=stream,
+            scheduler=RequestScheduler(
+                max_concurrency=concurrency,
+                requests_per_minute=rpm,
+                tokens_per_minute=tpm,
+                retry_policy=RetryPolicy(max_retries=max_retries),
+            ),
+        )
+
+        def emit(results):
+            if shard:
+                # Test files are written by 'pytestgen merge' from all shards' bundles
+                _emit_bundle(write_bundle(bundle, results, shard_index, shard_count, project_path), bundle, metrics)
+            else:
+                _emit_results(results, dry_run, output_dir, overwrite, metrics, project_path)
+
+        if batch_id:
+            # Resuming a submitted batch job needs no discovery
+            generator = TestGenerator(**generator_options)
+            results = _run_batch(generator, project_path, None, batch_id, batch_wait, poll_interval)
+            if results is not None:
+                emit(results)
+            return
+
+        changed = None
+        if since:
+            try:
+                changed = changed_lines(project_path, since)
+            except GitDiffError as e:
+                click.echo(f"Error: cannot diff against {since}: {e}")
+                sys.exit(1)
+            click.echo(f"🔀 {len(changed)} Python files changed since {since}")
+
+        coverage = None
+        if coverage_file:
+            try:
+                coverage = CoverageData(coverage_file)
+            except CoverageDataError as e:
+                click.echo(f"Error: cannot read coverage data: {e}")
+                sys.exit(1)
+            click.echo(f"📊 Loaded coverage data for {len(coverage.executed)} files")
+
+        # Discover functions
+        index = None if no_index else DiscoveryIndex(default_index_path(project_path))
+        walker = FileWalker(project_path, include=include, exclude=exclude, follow_symlinks=follow_symlinks)
+        discovery = FunctionDiscovery(
+            project_path, index=index, workers=jobs, walker=walker, test_dirs=[Path(output_dir).resolve()],
+            metrics=metrics, changed_lines=changed
+        )
+        if coverage is not None:
+            scan = discovery.iter_source_functions(max_files=max_files)
+        else:
+            scan = discovery.iter_untested_functions(max_files=max_files)
+        # islice and early returns leave the scan unfinished; closing it still saves the discovery index
+        with contextlib.closing(scan):
+            if coverage is not None:
+                # Ranking needs every candidate, so coverage-guided runs discover all functions up front
+                ranked = rank_by_coverage(scan, coverage)
+                click.echo(f"🎯 {len(ranked)} functions have uncovered lines")
+                untested = iter(ranked)
+            else:
+                untested = scan
+            if shard:
+                # Every runner scans the whole tree and keeps its own share
+                untested = in_shard(untested, shard_index, shard_count, project_path)
+            if max_functions:
+                untested = itertools.islice(untested, max_functions)
+            if budget is not None:
+                untested = iter(_apply_budget(untested, budget, budget_unit, generator_options, metrics))
+
+            # Peek so that a fully tested project never constructs a client
+            first = next(untested, None)
+            if first is None:
+                if shard:
+                    # an empty bundle still tells the merge that this shard finished
+                    emit([])
+                if coverage is not None:
+                    click.echo("✅ No functions with uncovered lines to generate tests for.")
+                elif since:
+                    click.echo(f"✅ No untested functions changed since {since}.")
+                else:
+                    click.echo("✅ All functions have tests. No new tests needed!")
+                return
+            untested = itertools.chain([first], untested)
+
+            if batch:
+                generator = TestGenerator(**generator_options)
+                results = _run_batch(generator, project_path, untested, None, batch_wait, poll_interval)
+                if results is not None:
+                    emit(results)
+                return
 
-    click.echo(f"Found {len(untested)} untested functions")
-    
-    # Generate tests
-    generator = TestGenerator(api_key=api_key, model=model)
-    results = generator.generate_tests_for_functions(untested)
-    
+            # Every completed result is journaled so that an interrupted run can be resumed
+            with ProgressJournal(default_journal_path(project_path), resume=resume) as journal:
+                if resume:
+                    click.echo(f"♻️ Resuming: {len(journal)} completed functions in the progress journal")
+                generator = TestGenerator(**generator_options, journal=journal)
+                # Generate tests; results stream in as discovery and generation progress
+                if no_dedup:
+                    results = generator.iter_tests_for_functions(untested)
+                else:
+                    results = Deduplicator(metrics).run(untested, generator.iter_tests_for_functions)
+                emit(results)
+            _report_dedup(metrics)
+
+def _apply_budget(functions, budget, unit, generator_options, metrics):
+    """Select the functions, in priority order, whose estimated cost fits the budget.
+
+    The cost is that of one attempt per function: regenerations after failed
+    validation, pack fallbacks and retries are not charged.
+    """
+    if unit == "tokens":
+        estimator = TestGenerator(**generator_options)
+        cost = estimator.estimate_request_tokens
+    else:
+        cost = lambda function_info: 1
+    candidates = list(functions)
+    selected = select_within_budget(candidates, budget, cost)
+    skipped = len(candidates) - len(selected)
+    if skipped:
+        metrics.count("functions_over_budget", skipped)
+    click.echo(f"💰 Budget of {budget} {unit} covers {len(selected)} of {len(candidates)} functions")
+    return selected
+
+def _emit_bundle(results, bundle, metrics):
+    """Report results as they are collected into a shard's bundle."""
+    usage = _TokenUsage()
+    processed = 0
+    for result in usage.track(results):
+        processed += 1
+        if result.error:
+            click.echo(f"❌ Error generating tests for {result.function_info['function_name']}: {result.error}")
+        else:
+            click.echo(f"✅ Generated tests for {result.function_info['function_name']}")
+    click.echo(f"📦 {processed} results written to {bundle}")
+    usage.report()
+    metrics.count("functions_processed", processed)
+
+def _report_dedup(metrics):
+    """Print how many functions were copies of another function."""
+    summary = metrics.summary()
+    deduplicated = summary["counters"].get("functions_deduplicated", 0)
+    if deduplicated:
+        click.echo(f"♻️ {deduplicated} functions were copies of others and reused their tests (dedup ratio {summary['dedup_ratio']:.1%})")
+
+@contextlib.contextmanager
+def _instrumented(metrics, metrics_json, profile):
+    """Time the run as the ``total`` stage, optionally under cProfile, and write the reports."""
+    profiler = cProfile.Profile() if profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with metrics.stage("total"):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            click.echo(f"📈 Profile written to {profile}")
+        if metrics_json:
+            metrics.write_json(metrics_json)
+            click.echo(f"📊 Metrics written to {metrics_json}")
+
+def _run_batch(generator, project_path, functions, batch_id, wait, poll_interval):
+    """Submit and/or poll a batch job; return its results once it has finished."""
+    client = generator.client
+    if isinstance(client, BackendPool):
+        # a batch job is submitted to a single provider
+        client = client.endpoints[0].client
+    runner = BatchRunner(generator, OpenAIBatchTransport(client), project_path / BATCH_STATE_DIR)
+    if batch_id is None:
+        batch_id = runner.submit(functions)
+        click.echo(f"📦 Submitted batch {batch_id}")
+    if not wait:
+        click.echo(f"Resume later with: pytestgen generate --batch-id {batch_id}")
+        return None
+
+    click.echo(f"⏳ Waiting for batch {batch_id}")
+    state = runner.wait(batch_id, poll_interval=poll_interval)
+    if state != "completed":
+        click.echo(f"⚠️ Batch {batch_id} ended in state '{state}'; collecting available results")
+    return runner.collect(batch_id)
+
+def _emit_results(results, dry_run, output_dir, overwrite, metrics=None, project_dir=None):
+    """Print results (dry run) or write them to test files as they arrive."""
+    usage = _TokenUsage()
+    results = usage.track(results)
     if dry_run:
         click.echo("\n--- DRY RUN: Generated Test Cases ---\n")
         for result in results:
@@ -58,28 +321,186 @@ def generate(project_dir, api_key, max_functions, overwrite, model, dry_run, out
             else:
                 click.echo(result.test_code.strip() + "\n")
         click.echo("--- END DRY RUN ---\n")
+        usage.report()
         return
 
-    # Write test files
-    output_path = Path(output_dir).resolve()
-    output_path.mkdir(exist_ok=True)
-    for result in results:
+    # Write test files as each module's results are complete
+    writer = TestFileWriter(Path(output_dir).resolve(), overwrite=overwrite, metrics=metrics, project_dir=project_dir)
+    processed = 0
+    for outcome in writer.write(results):
+        processed += 1
+        result = outcome.result
         if result.error:
             click.echo(f"❌ Error generating tests for {result.function_info['function_name']}: {result.error}")
             continue
 
-        module_name = Path(result.function_info.get("file_path", "module")).stem
-        test_file = output_path / f"test_{module_name}.py"
-        
-        if test_file.exists() and not overwrite:
-            click.echo(f"⚠️ Skipping {test_file.name} - file exists and --overwrite not specified")
+        if not outcome.added and outcome.skipped:
+            click.echo(f"⚠️ Tests for {result.function_info['function_name']} already in {outcome.test_file.name}, skipping")
             continue
 
-        with open(test_file, "a") as f:
-            f.write(result.test_code.strip())
-            f.write("\n\n")
+        notes = []
+        if result.retries:
+            notes.append(f"after {result.retries} retries")
+        if result.attempts > 1:
+            notes.append(f"on attempt {result.attempts}")
+        notes = f" ({', '.join(notes)})" if notes else ""
+        click.echo(f"✅ Generated tests for {result.function_info['function_name']} in {outcome.test_file.name}{notes}")
+
+    click.echo(f"Processed {processed} untested functions")
+    usage.report()
+    if metrics is not None:
+        metrics.count("functions_processed", processed)
+
+class _TokenUsage:
+    """Running totals of the token usage reported for generated results."""
 
-        click.echo(f"✅ Generated tests for {result.function_info['function_name']} in {test_file.name}")
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.reported = False
+
+    def track(self, results):
+        for result in results:
+            if result.prompt_tokens is not None:
+                self.prompt_tokens += result.prompt_tokens
+                self.reported = True
+            if result.completion_tokens is not None:
+                self.completion_tokens += result.completion_tokens
+                self.reported = True
+            yield result
+
+    def report(self):
+        if self.reported:
+            click.echo(f"Tokens used: {self.prompt_tokens} prompt, {self.completion_tokens} completion")
+
+@cli.command(name="watch")
+@click.option("--project-dir", default=".", type=click.Path(exists=True), help="Project directory to watch")
+@click.option("--api-key", envvar="OPENAI_API_KEY", help="OpenAI API key")
+@click.option("--include", multiple=True, help="Only watch files matching this glob (repeatable)")
+@click.option("--exclude", multiple=True, help="Skip files and directories matching this gitignore-style pattern (repeatable)")
+@click.option("--follow-symlinks", is_flag=True, help="Descend into symlinked directories")
+@click.option("--overwrite", is_flag=True, help="Replace existing test files instead of merging new tests into them")
+@click.option("--model", default="gpt-4o", help="LLM model to use")
+@click.option("--dry-run", is_flag=True, help="Print generated tests to the console instead of writing files")
+@click.option("--output-dir", default="tests", type=click.Path(), help="Directory to write generated test files (default: ./tests)")
+@click.option("--concurrency", default=1, type=click.IntRange(min=1), help="Number of LLM requests to run in parallel (default: 1)")
+@click.option("--timeout", default=None, type=float, help="Per-request timeout in seconds")
+@click.option("--no-cache", is_flag=True, help="Always call the API instead of reusing cached responses")
+@click.option("--cache-dir", default=None, type=click.Path(), help="Response cache directory (default: ~/.cache/pytestgen)")
+@click.option("--no-index", is_flag=True, help="Do not load or update the on-disk discovery index")
+@click.option("--max-retries", default=2, type=click.IntRange(min=0), help="Retries for rate-limited or failed requests (default: 2)")
+@click.option("--max-output-tokens", default=1000, type=click.IntRange(min=1), help="Upper bound on completion tokens per function; the limit is sized from its complexity (default: 1000)")
+@click.option("--no-validate", is_flag=True, help="Write generated tests without checking that they compile and import their target")
+@click.option("--max-attempts", default=2, type=click.IntRange(min=1), help="Generation attempts per function when validation fails (default: 2)")
+@click.option("--lint", is_flag=True, help="Also reject generated tests with pyflakes errors (requires pyflakes)")
+@click.option("--module-context-tokens", default=0, type=click.IntRange(min=0), help="Send an outline of each function's module of up to this many tokens as a shared prompt prefix (default: 0, disabled)")
+@click.option("--endpoint", "endpoints", multiple=True, help="OpenAI-compatible base URL to send requests to, as URL[,weight=N][,key_env=VAR] (repeatable; default: the OpenAI API)")
+@click.option("--routing", default="least-outstanding", type=click.Choice(ROUTING_STRATEGIES), help="How requests are spread across several --endpoint values (default: least-outstanding)")
+@click.option("--stream", is_flag=True, help="Stream completions and stop each one as soon as its code block is complete")
+@click.option("--interval", default=0.5, type=click.FloatRange(min=0.01), help="Seconds between checks for changed files (default: 0.5)")
+@click.option("--debounce", default=0.3, type=click.FloatRange(min=0), help="Seconds without further saves before changed files are processed (default: 0.3)")
+def watch(project_dir, api_key, include, exclude, follow_symlinks, overwrite, model, dry_run, output_dir, concurrency, timeout, no_cache, cache_dir, no_index, max_retries, max_output_tokens, no_validate, max_attempts, lint, module_context_tokens, endpoints, routing, stream, interval, debounce):
+    """Generate tests for new or changed untested functions as files are saved."""
+    if not api_key:
+        click.echo("Error: API key is required. Please provide --api-key or set OPENAI_API_KEY environment variable.")
+        sys.exit(1)
+
+    project_path = Path(project_dir).resolve()
+    metrics = Metrics()
+    client = None
+    if endpoints:
+        try:
+            client = BackendPool(endpoints_from_specs(endpoints, api_key), strategy=routing, metrics=metrics)
+        except ValueError as e:
+            click.echo(f"Error: invalid --endpoint: {e}")
+            sys.exit(1)
+
+    # One generator for the whole session, so the client and its connections stay warm
+    generator = TestGenerator(
+        api_key=api_key,
+        model=model,
+        concurrency=concurrency,
+        timeout=timeout,
+        cache=None if no_cache else ResponseCache(cache_dir),
+        max_output_tokens=max_output_tokens,
+        validator=None if no_validate else TestValidator(lint=lint),
+        max_attempts=max_attempts,
+        metrics=metrics,
+        module_context_tokens=module_context_tokens,
+        client=client,
+        stream=stream,
+        scheduler=RequestScheduler(max_concurrency=concurrency, retry_policy=RetryPolicy(max_retries=max_retries)),
+    )
+    index = None if no_index else DiscoveryIndex(default_index_path(project_path))
+    walker = FileWalker(project_path, include=include, exclude=exclude, follow_symlinks=follow_symlinks)
+    discovery = FunctionDiscovery(
+        project_path, index=index, walker=walker, test_dirs=[Path(output_dir).resolve()], metrics=metrics
+    )
+    watcher = FunctionWatcher(discovery, poll_interval=interval, debounce=debounce, metrics=metrics)
+    files = watcher.start()
+    click.echo(f"👀 Watching {files} files in {project_path} (Ctrl+C to stop)")
+
+    try:
+        while True:
+            functions = watcher.wait()
+            click.echo(f"✏️ {len(functions)} new or changed untested functions")
+            _emit_results(generator.iter_tests_for_functions(functions), dry_run, output_dir, overwrite, metrics, project_path)
+    except KeyboardInterrupt:
+        click.echo("Stopped watching")
+
+@cli.command(name="merge")
+@click.argument("bundles", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--project-dir", default=".", type=click.Path(exists=True), help="Project directory the bundles were generated for")
+@click.option("--output-dir", default="tests", type=click.Path(), help="Directory to write generated test files (default: ./tests)")
+@click.option("--overwrite", is_flag=True, help="Replace existing test files instead of merging new tests into them")
+@click.option("--dry-run", is_flag=True, help="Print the merged tests to the console instead of writing files")
+@click.option("--allow-missing", is_flag=True, help="Merge even if bundles of some shards are missing")
+def merge(bundles, project_dir, output_dir, overwrite, dry_run, allow_missing):
+    """Write test files from the results bundles of 'generate --shard' runs."""
+    project_path = Path(project_dir).resolve()
+    try:
+        results, missing = merge_bundles(bundles, project_path)
+    except ValueError as e:
+        click.echo(f"Error: {e}")
+        sys.exit(1)
+    if missing:
+        click.echo(f"⚠️ No bundle for shards {', '.join(map(str, missing))}")
+        if not allow_missing:
+            click.echo("Error: pass --allow-missing to merge the available shards anyway.")
+            sys.exit(1)
+    click.echo(f"🧩 Merging {len(results)} results from {len(bundles)} bundles")
+    _emit_results(results, dry_run, output_dir, overwrite, Metrics(), project_path)
+
+@cli.group(name="cache")
+def cache_group():
+    """Inspect and prune the LLM response cache."""
+    pass
+
+@cache_group.command(name="stats")
+@click.option("--cache-dir", default=None, type=click.Path(), help="Response cache directory (default: ~/.cache/pytestgen)")
+def cache_stats(cache_dir):
+    """Show the number and size of cached responses."""
+    cache = ResponseCache(cache_dir)
+    stats = cache.stats()
+    click.echo(f"Cache directory: {cache.cache_dir}")
+    click.echo(f"Entries: {stats.entries}")
+    click.echo(f"Size: {stats.total_bytes / 1024:.1f} KiB")
+
+@cache_group.command(name="prune")
+@click.option("--cache-dir", default=None, type=click.Path(), help="Response cache directory (default: ~/.cache/pytestgen)")
+@click.option("--max-age-days", default=None, type=float, help="Remove entries not used for this many days")
+@click.option("--max-size-mb", default=None, type=float, help="Evict least recently used entries until the cache fits")
+def cache_prune(cache_dir, max_age_days, max_size_mb):
+    """Evict cached responses by age and/or total size."""
+    if max_age_days is None and max_size_mb is None:
+        click.echo("Error: specify --max-age-days and/or --max-size-mb.")
+        sys.exit(1)
+    cache = ResponseCache(cache_dir)
+    removed = cache.prune(
+        max_age=max_age_days * 86400 if max_age_days is not None else None,
+        max_bytes=int(max_size_mb * 1024 * 1024) if max_size_mb is not None else None,
+    )
+    click.echo(f"🧹 Removed {removed} cache entries")
 
 if __name__ == "__main__":
     cli()
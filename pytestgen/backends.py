@@ -0,0 +1,304 @@
+"""
+LLM endpoints and load-balancing for PyTest-Gen
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from openai import OpenAI
+
+from .metrics import Metrics
+from .rate_limit import is_retryable
+
+logger = logging.getLogger(__name__)
+
+ROUTING_STRATEGIES = ("least-outstanding", "weighted")
+
+
+@dataclass
+class Endpoint:
+    """
+    One OpenAI-compatible backend and its routing state
+
+    ``client`` is anything with ``chat.completions.create``: an ``OpenAI``
+    client for the hosted API, a self-hosted inference server behind an
+    OpenAI-compatible ``base_url``, or a stand-in in tests.
+    """
+    name: str
+    client: Any
+    weight: float = 1.0
+    outstanding: int = 0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+    current_weight: float = 0.0
+
+
+def parse_endpoint(spec: str) -> Dict[str, Any]:
+    """
+    Parse an ``--endpoint`` specification
+
+    The format is ``URL[,weight=N][,key_env=NAME]``, e.g.
+    ``http://localhost:8000/v1,weight=2,key_env=LOCAL_KEY``. The API key is
+    read from the named environment variable so it never appears on the
+    command line.
+
+    Args:
+        spec: Endpoint specification
+
+    Returns:
+        Dictionary with ``base_url``, ``weight`` and ``key_env`` (None if not given)
+
+    Raises:
+        ValueError: If an option is unknown or malformed
+    """
+    base_url, *options = [part.strip() for part in spec.split(",")]
+    if not base_url:
+        raise ValueError(f"missing URL in endpoint '{spec}'")
+    parsed = {"base_url": base_url, "weight": 1.0, "key_env": None}
+    for option in options:
+        name, sep, value = option.partition("=")
+        if not sep or name not in ("weight", "key_env"):
+            raise ValueError(f"unknown option '{option}' in endpoint '{spec}'")
+        if name == "weight":
+            parsed["weight"] = float(value)
+            if parsed["weight"] <= 0:
+                raise ValueError(f"weight must be positive in endpoint '{spec}'")
+        else:
+            parsed["key_env"] = value
+    return parsed
+
+
+def openai_endpoint(
+    base_url: Optional[str],
+    api_key: str,
+    weight: float = 1.0,
+    parent: Optional[OpenAI] = None,
+) -> Endpoint:
+    """
+    Create an endpoint for an OpenAI-compatible HTTP API
+
+    Args:
+        base_url: API base URL (None for the OpenAI API)
+        api_key: API key for the endpoint
+        weight: Routing weight
+        parent: Client whose pooled HTTP connections are shared
+            (default: a new client with its own pool)
+
+    Returns:
+        Endpoint object
+    """
+    if parent is not None:
+        client = parent.with_options(api_key=api_key, base_url=base_url)
+    else:
+        # retries are handled by the request scheduler
+        client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+    return Endpoint(name=base_url or "openai", client=client, weight=weight)
+
+
+def endpoints_from_specs(specs: List[str], api_key: str, parent: Optional[OpenAI] = None) -> List[Endpoint]:
+    """
+    Create endpoints from ``--endpoint`` specifications
+
+    All endpoints share the HTTP connection pool of one client, so
+    keep-alive connections are reused across endpoints and worker threads.
+
+    Args:
+        specs: Endpoint specifications, see ``parse_endpoint``
+        api_key: API key for endpoints without ``key_env``
+        parent: Client whose connection pool is shared (default: a new one)
+
+    Returns:
+        List of Endpoint objects
+
+    Raises:
+        ValueError: If a specification is invalid or names an unset variable
+    """
+    parent = parent or OpenAI(api_key=api_key, max_retries=0)
+    endpoints = []
+    for spec in specs:
+        parsed = parse_endpoint(spec)
+        key = api_key
+        if parsed["key_env"]:
+            key = os.environ.get(parsed["key_env"])
+            if not key:
+                raise ValueError(f"environment variable {parsed['key_env']} is not set")
+        endpoints.append(openai_endpoint(parsed["base_url"], key, parsed["weight"], parent))
+    return endpoints
+
+
+class PooledStream:
+    """
+    Streamed response that keeps its endpoint busy until it is read or closed
+
+    The endpoint is released once, when the stream is exhausted, closed or
+    fails while being read; a failure while reading counts toward ejecting
+    the endpoint like a failed request. Other attributes are those of the
+    wrapped stream.
+    """
+
+    def __init__(self, stream: Any, release: Callable[[Optional[Exception]], None]):
+        """
+        Wrap a stream
+
+        Args:
+            stream: Stream returned by ``chat.completions.create(stream=True)``
+            release: Called with the error, or None, when the stream is done
+        """
+        self._stream = stream
+        self._release = release
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            for chunk in self._stream:
+                yield chunk
+        except Exception as e:
+            self._finish(e)
+            raise
+        self._finish(None)
+
+    def close(self):
+        """Close the wrapped stream and release the endpoint"""
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._finish(None)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def _finish(self, error: Optional[Exception]):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._release(error)
+
+
+class BackendPool:
+    """
+    Spread chat completion requests across several endpoints
+
+    Routes each request to a healthy endpoint, either the one with the
+    fewest outstanding requests relative to its weight (``least-outstanding``)
+    or by smooth weighted round robin (``weighted``). An endpoint that fails
+    ``max_failures`` times in a row with a transient error is ejected for
+    ``cooldown`` seconds, doubling on each further ejection run; if every
+    endpoint is ejected, the one that comes back first is used.
+
+    The pool can stand in for an ``OpenAI`` client: it exposes
+    ``chat.completions.create``. Errors are raised unchanged, so the request
+    scheduler still retries them, and a retry goes to whichever endpoint is
+    picked next. A streamed response holds its endpoint until the stream
+    is exhausted or closed (see ``PooledStream``).
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        strategy: str = "least-outstanding",
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+        metrics: Optional[Metrics] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the pool
+
+        Args:
+            endpoints: Endpoints to route between
+            strategy: ``least-outstanding`` or ``weighted``
+            max_failures: Consecutive transient failures before an endpoint is ejected
+            cooldown: Seconds an endpoint stays ejected the first time
+            metrics: Collector for endpoint ejection counts (default: a private one)
+            clock: Monotonic time source
+        """
+        if not endpoints:
+            raise ValueError("at least one endpoint is required")
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"unknown routing strategy '{strategy}'")
+        self.endpoints = list(endpoints)
+        self.strategy = strategy
+        self.max_failures = max(1, max_failures)
+        self.cooldown = cooldown
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request: Any) -> Any:
+        """
+        Send a chat completion request to the next endpoint
+
+        Args:
+            **request: Arguments for ``chat.completions.create``
+
+        Returns:
+            The endpoint's response, wrapped in a ``PooledStream`` when
+            ``stream`` is set
+        """
+        endpoint = self._acquire()
+        try:
+            response = endpoint.client.chat.completions.create(**request)
+        except Exception as e:
+            self._release(endpoint, e)
+            raise
+        if request.get("stream"):
+            return PooledStream(response, lambda error: self._release(endpoint, error))
+        self._release(endpoint, None)
+        return response
+
+    def _acquire(self) -> Endpoint:
+        with self._lock:
+            now = self.clock()
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.ejected_until <= now]
+            if not healthy:
+                endpoint = min(self.endpoints, key=lambda e: e.ejected_until)
+            elif self.strategy == "weighted":
+                endpoint = self._next_weighted(healthy)
+            else:
+                endpoint = min(healthy, key=lambda e: (e.outstanding + 1) / e.weight)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+        return endpoint
+
+    def _next_weighted(self, healthy: List[Endpoint]) -> Endpoint:
+        """Smooth weighted round robin: spreads picks evenly in proportion to weight"""
+        total = sum(endpoint.weight for endpoint in healthy)
+        for endpoint in healthy:
+            endpoint.current_weight += endpoint.weight
+        chosen = max(healthy, key=lambda e: e.current_weight)
+        chosen.current_weight -= total
+        return chosen
+
+    def _release(self, endpoint: Endpoint, error: Optional[Exception]):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.consecutive_failures = 0
+                endpoint.ejections = 0
+                return
+            if not is_retryable(error):
+                # the request was at fault, not the endpoint
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures < self.max_failures:
+                return
+            duration = self.cooldown * 2 ** endpoint.ejections
+            endpoint.ejections += 1
+            endpoint.ejected_until = self.clock() + duration
+            endpoint.consecutive_failures = 0
+        logger.warning(f"Ejecting endpoint {endpoint.name} for {duration:.0f}s after {self.max_failures} failures: {str(error)}")
+        self.metrics.count("endpoint_ejections")
@@ -0,0 +1,251 @@
+"""
+Offline batch-job submission for PyTest-Gen
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .cache import ResponseCache
+from .test_generator import TestGenerator, TestGenerationResult
+from .tokens import completion_budget
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchTransport(ABC):
+    """
+    Interface to a provider's batch endpoint
+
+    Implementations upload a JSONL request file, report the job state and
+    return the result lines once the job has finished. A subclass missing
+    any of these methods cannot be instantiated.
+    """
+
+    @abstractmethod
+    def submit(self, requests_path: Path) -> str:
+        """
+        Submit a JSONL request file
+
+        Args:
+            requests_path: Path to the request file
+
+        Returns:
+            Provider batch identifier
+        """
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """
+        Get the state of a batch job
+
+        Args:
+            batch_id: Provider batch identifier
+
+        Returns:
+            Provider state, e.g. ``in_progress`` or ``completed``
+        """
+
+    @abstractmethod
+    def fetch_results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Download the result lines of a finished batch job
+
+        Args:
+            batch_id: Provider batch identifier
+
+        Yields:
+            Parsed result lines carrying ``custom_id`` and ``response`` or ``error``
+        """
+
+
+class OpenAIBatchTransport(BatchTransport):
+    """
+    Batch transport using the OpenAI Files and Batches APIs
+    """
+
+    def __init__(self, client, completion_window: str = "24h"):
+        """
+        Initialize the transport
+
+        Args:
+            client: OpenAI client (any OpenAI-compatible ``base_url`` works)
+            completion_window: Completion window requested for the job
+        """
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, requests_path: Path) -> str:
+        with open(requests_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def fetch_results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+class BatchRunner:
+    """
+    Submit generation requests as a batch job and map the results back
+    """
+
+    def __init__(self, generator: TestGenerator, transport: BatchTransport, state_dir: Path):
+        """
+        Initialize the batch runner
+
+        Args:
+            generator: Test generator used to build prompts and parse completions
+            transport: Transport talking to the batch endpoint
+            state_dir: Directory holding request files and job state for resuming
+        """
+        self.generator = generator
+        self.transport = transport
+        self.state_dir = Path(state_dir)
+
+    def submit(self, functions: Iterable[Dict[str, Any]]) -> str:
+        """
+        Write the request file for ``functions`` and submit it
+
+        The job state is saved next to the request file so that
+        ``wait``/``collect`` can be resumed later with only the batch id.
+
+        Args:
+            functions: Function information dictionaries
+
+        Returns:
+            Provider batch identifier
+        """
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        fd, requests_name = tempfile.mkstemp(dir=self.state_dir, prefix="requests-", suffix=".jsonl")
+        pending = {}
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for position, function_info in enumerate(functions):
+                custom_id = f"fn-{position}"
+                pending[custom_id] = dict(function_info)
+                f.write(json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": self.generator.build_request(function_info),
+                }) + "\n")
+
+        batch_id = self.transport.submit(Path(requests_name))
+        self._save_state(batch_id, {
+            "requests_file": requests_name,
+            "model": self.generator.model,
+            "temperature": self.generator.temperature,
+            "max_tokens": self.generator.max_tokens,
+            "functions": pending,
+        })
+        logger.info(f"Submitted batch {batch_id} with {len(pending)} requests")
+        return batch_id
+
+    def wait(self, batch_id: str, poll_interval: float = 30.0, timeout: Optional[float] = None) -> str:
+        """
+        Poll a batch job until it reaches a terminal state
+
+        Args:
+            batch_id: Provider batch identifier
+            poll_interval: Seconds between polls
+            timeout: Give up after this many seconds (None waits indefinitely)
+
+        Returns:
+            Final (or last seen) job state
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self.transport.status(batch_id)
+            if state in TERMINAL_STATES:
+                return state
+            if deadline is not None and time.monotonic() + poll_interval > deadline:
+                return state
+            time.sleep(poll_interval)
+
+    def collect(self, batch_id: str) -> List[TestGenerationResult]:
+        """
+        Map the results of a finished batch job back onto functions
+
+        Functions without a successful response get an error result.
+
+        Args:
+            batch_id: Provider batch identifier
+
+        Returns:
+            TestGenerationResult objects in submission order
+        """
+        state = self._load_state(batch_id)
+        functions = state["functions"]
+        raw_by_id: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        for line in self.transport.fetch_results(batch_id):
+            custom_id = line.get("custom_id")
+            if custom_id not in functions:
+                continue
+            response = line.get("response") or {}
+            if line.get("error") or response.get("status_code") != 200:
+                error = line.get("error") or response.get("body", {}).get("error") or "request failed"
+                errors[custom_id] = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+                continue
+            choices = response.get("body", {}).get("choices") or []
+            raw_by_id[custom_id] = choices[0]["message"]["content"] if choices else ""
+
+        cache = self.generator.cache
+        validator = self.generator.validator
+        results = []
+        for custom_id, function_info in functions.items():
+            if custom_id in raw_by_id:
+                raw = raw_by_id[custom_id]
+                test_code = self.generator._extract_code(raw)
+                # batch results cannot be regenerated in place; reject invalid code
+                problem = validator.validate(test_code, function_info) if validator is not None else None
+                if cache is not None and raw and problem is None:
+                    # key the entry by the settings the job was submitted with
+                    messages = self.generator.build_request(function_info)["messages"]
+                    max_tokens = completion_budget(function_info, state["max_tokens"])
+                    key = ResponseCache.make_key(state["model"], state["temperature"], max_tokens, messages)
+                    cache.set(key, raw, model=state["model"])
+                results.append(TestGenerationResult(
+                    function_info=function_info,
+                    test_code=test_code,
+                    error=f"generated tests failed validation: {problem}" if problem else None
+                ))
+            else:
+                results.append(TestGenerationResult(
+                    function_info=function_info,
+                    test_code="",
+                    error=errors.get(custom_id, "no result returned by batch job")
+                ))
+        return results
+
+    def _state_path(self, batch_id: str) -> Path:
+        return self.state_dir / f"{batch_id}.json"
+
+    def _save_state(self, batch_id: str, state: Dict[str, Any]):
+        with open(self._state_path(batch_id), "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    def _load_state(self, batch_id: str) -> Dict[str, Any]:
+        with open(self._state_path(batch_id), "r", encoding="utf-8") as f:
+            return json.load(f)
@@ -0,0 +1,209 @@
+"""
+Content-addressed on-disk cache of LLM responses for PyTest-Gen
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = "PYTESTGEN_CACHE_DIR"
+
+
+def default_cache_dir() -> Path:
+    """
+    Return the cache directory used when none is given explicitly
+
+    Returns:
+        ``$PYTESTGEN_CACHE_DIR`` if set, otherwise ``~/.cache/pytestgen``
+    """
+    env_dir = os.environ.get(CACHE_DIR_ENV)
+    if env_dir:
+        return Path(env_dir)
+    return Path.home() / ".cache" / "pytestgen"
+
+
+@dataclass
+class CacheStats:
+    """
+    Summary of the cache contents
+    """
+    entries: int
+    total_bytes: int
+    oldest: Optional[float] = None
+    newest: Optional[float] = None
+
+
+class ResponseCache:
+    """
+    Persistent cache of completion text keyed by a hash of the request
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_age: Optional[float] = None):
+        """
+        Initialize the response cache
+
+        Args:
+            cache_dir: Directory holding cache entries (default: ``default_cache_dir()``)
+            max_age: Entries older than this many seconds are treated as misses
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_age = max_age
+
+    @staticmethod
+    def make_key(model: str, temperature: float, max_tokens: int, messages: List[Dict[str, Any]]) -> str:
+        """
+        Build the cache key for a completion request
+
+        Args:
+            model: LLM model name
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            messages: Chat messages making up the prompt
+
+        Returns:
+            Hex SHA-256 digest identifying the request
+        """
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "messages": messages,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _iter_entries(self):
+        if not self.cache_dir.is_dir():
+            return
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file(follow_symlinks=False) and entry.name.endswith(".json"):
+                    yield entry
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached completion
+
+        Args:
+            key: Cache key from ``make_key``
+
+        Returns:
+            Cached completion text, or None on a miss
+        """
+        path = self._entry_path(key)
+        try:
+            if self.max_age is not None and time.time() - path.stat().st_mtime > self.max_age:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                content = json.load(f)["content"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # bump the mtime so size-based pruning evicts least recently used entries first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return content
+
+    def set(self, key: str, content: str, model: Optional[str] = None):
+        """
+        Store a completion in the cache
+
+        Args:
+            key: Cache key from ``make_key``
+            content: Completion text to store
+            model: Model that produced the completion (informational)
+        """
+        path = self._entry_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"model": model, "created": time.time(), "content": content}, f)
+            os.replace(tmp_name, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path}: {str(e)}")
+
+    def delete(self, key: str):
+        """
+        Remove a cached completion, if present
+
+        Args:
+            key: Cache key from ``make_key``
+        """
+        self._remove(str(self._entry_path(key)))
+
+    def stats(self) -> CacheStats:
+        """
+        Collect statistics about the cache contents
+
+        Returns:
+            CacheStats object
+        """
+        stats = CacheStats(entries=0, total_bytes=0)
+        for entry in self._iter_entries():
+            st = entry.stat()
+            stats.entries += 1
+            stats.total_bytes += st.st_size
+            stats.oldest = st.st_mtime if stats.oldest is None else min(stats.oldest, st.st_mtime)
+            stats.newest = st.st_mtime if stats.newest is None else max(stats.newest, st.st_mtime)
+        return stats
+
+    def prune(self, max_age: Optional[float] = None, max_bytes: Optional[int] = None) -> int:
+        """
+        Evict cache entries by age and total size
+
+        Args:
+            max_age: Remove entries not used for more than this many seconds
+            max_bytes: Remove least recently used entries until the cache fits
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.time()
+        entries = []
+        for entry in self._iter_entries():
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+
+        removed = 0
+        kept = []
+        for mtime, size, path in entries:
+            if max_age is not None and now - mtime > max_age:
+                removed += self._remove(path)
+            else:
+                kept.append((mtime, size, path))
+
+        if max_bytes is not None:
+            total = sum(size for _, size, _ in kept)
+            for mtime, size, path in sorted(kept):
+                if total <= max_bytes:
+                    break
+                removed += self._remove(path)
+                total -= size
+
+        return removed
+
+    def _remove(self, path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
@@ -0,0 +1,203 @@
+"""
+Coverage-guided prioritization for PyTest-Gen
+"""
+
+import ast
+import logging
+import os
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Line numbers set in each possible byte of a coverage.py numbits blob
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte & (1 << bit)) for byte in range(256))
+
+
+class CoverageDataError(RuntimeError):
+    """Raised when a coverage data file cannot be read"""
+
+
+def numbits_to_lines(numbits: bytes) -> List[int]:
+    """
+    Decode a coverage.py numbits blob
+
+    Args:
+        numbits: Bitmap where bit ``n % 8`` of byte ``n // 8`` marks line ``n``
+
+    Returns:
+        Line numbers set in the bitmap
+    """
+    lines = []
+    for index, byte in enumerate(numbits):
+        if byte:
+            base = index * 8
+            lines.extend(base + bit for bit in _BYTE_BITS[byte])
+    return lines
+
+
+@lru_cache(maxsize=256)
+def _statement_lines(file_path: str, mtime_ns: int, size: int) -> FrozenSet[int]:
+    """
+    Lines that start a statement, excluding docstrings
+
+    Cached per file version, so each module is parsed once.
+
+    Args:
+        file_path: Path to the Python file
+        mtime_ns: Modification time, part of the cache key
+        size: File size, part of the cache key
+
+    Returns:
+        Line numbers coverage.py can report as executed
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    docstrings = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and ast.get_docstring(node):
+            docstrings.add(id(node.body[0]))
+    return frozenset(
+        node.lineno for node in ast.walk(tree)
+        if isinstance(node, ast.stmt) and id(node) not in docstrings
+    )
+
+
+class CoverageData:
+    """
+    Executed lines per file, read from a coverage.py ``.coverage`` database
+
+    The database is read with one query per table (``line_bits`` for line
+    coverage, ``arc`` for branch coverage), merging all contexts, instead of
+    one lookup per function. The ``coverage`` package is not needed.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Load the executed lines
+
+        Args:
+            path: Path to the ``.coverage`` file
+
+        Raises:
+            CoverageDataError: If the file is missing or not a coverage database
+        """
+        self.path = Path(path)
+        self.executed: Dict[str, Set[int]] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.is_file():
+            raise CoverageDataError(f"{self.path} does not exist")
+        base = os.path.dirname(os.path.abspath(self.path))
+        try:
+            connection = sqlite3.connect(f"file:{self.path.resolve().as_posix()}?mode=ro", uri=True)
+            try:
+                tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                if "file" not in tables:
+                    raise CoverageDataError(f"{self.path} is not a coverage.py data file")
+                if "line_bits" in tables:
+                    rows = connection.execute(
+                        "SELECT file.path, line_bits.numbits FROM line_bits JOIN file ON file.id = line_bits.file_id"
+                    )
+                    for path, numbits in rows:
+                        self._lines(base, path).update(numbits_to_lines(numbits))
+                if "arc" in tables:
+                    rows = connection.execute(
+                        "SELECT file.path, arc.fromno, arc.tono FROM arc JOIN file ON file.id = arc.file_id"
+                    )
+                    for path, from_line, to_line in rows:
+                        # negative line numbers mark entries to and exits from a code object
+                        self._lines(base, path).update(line for line in (from_line, to_line) if line > 0)
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            raise CoverageDataError(f"cannot read {self.path}: {str(e)}") from e
+
+    def _lines(self, base: str, path: str) -> Set[int]:
+        # relative paths (``relative_files = true``) are relative to the data file
+        key = os.path.normcase(os.path.abspath(os.path.join(base, path)))
+        return self.executed.setdefault(key, set())
+
+    def uncovered_lines(self, function_info: Mapping[str, Any]) -> Tuple[int, int]:
+        """
+        Count the statements of a function that never ran
+
+        Args:
+            function_info: Function information dictionary with ``file_path``,
+                ``line_number`` and ``end_line_number``
+
+        Returns:
+            Tuple of (uncovered statements, statements) in the function's
+            body; files absent from the data count as fully uncovered
+        """
+        file_path = os.path.abspath(function_info["file_path"])
+        first = function_info["line_number"]
+        last = function_info.get("end_line_number") or first
+        try:
+            st = os.stat(file_path)
+            statements = _statement_lines(file_path, st.st_mtime_ns, st.st_size)
+        except (OSError, SyntaxError, UnicodeDecodeError, ValueError) as e:
+            logger.warning(f"Could not read statements of {function_info['function_name']} from {file_path}: {str(e)}")
+            return 0, 0
+        # the ``def`` line runs on import, so only the body says whether the function was exercised
+        lines = [line for line in statements if first < line <= last]
+        executed = self.executed.get(os.path.normcase(file_path), ())
+        return sum(1 for line in lines if line not in executed), len(lines)
+
+
+def rank_by_coverage(functions: Iterable[Mapping[str, Any]], coverage: CoverageData) -> List[Mapping[str, Any]]:
+    """
+    Order functions by how much untested logic they hold
+
+    Functions are scored by uncovered statements times cyclomatic
+    complexity; fully covered functions are dropped.
+
+    Args:
+        functions: Iterable of function information dictionaries
+        coverage: Executed lines of the project
+
+    Returns:
+        Functions with uncovered statements, highest score first (ties keep
+        input order)
+    """
+    scored = []
+    for position, function_info in enumerate(functions):
+        uncovered, _ = coverage.uncovered_lines(function_info)
+        if uncovered:
+            scored.append((uncovered * (function_info.get("complexity") or 1), position, function_info))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [function_info for _, _, function_info in scored]
+
+
+def select_within_budget(
+    functions: Iterable[Mapping[str, Any]],
+    budget: int,
+    cost: Callable[[Mapping[str, Any]], int],
+) -> List[Mapping[str, Any]]:
+    """
+    Take functions in order while their total cost fits the budget
+
+    Functions that do not fit are skipped, so cheaper ones further down can
+    still use the rest of the budget.
+
+    Args:
+        functions: Functions in priority order
+        budget: Total budget, e.g. requests or tokens
+        cost: Cost of one function in budget units
+
+    Returns:
+        Selected functions, in priority order
+    """
+    selected = []
+    remaining = budget
+    for function_info in functions:
+        price = cost(function_info)
+        if price <= remaining:
+            selected.append(function_info)
+            remaining -= price
+            if remaining <= 0:
+                break
+    return selected
@@ -0,0 +1,178 @@
+"""
+Deduplication of identical functions for PyTest-Gen
+"""
+
+import ast
+import dataclasses
+import re
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+
+from .metrics import Metrics
+from .test_generator import module_import_path
+
+
+def module_names(file_path: str) -> Tuple[str, str]:
+    """
+    Names a test may import a source file's module by
+
+    Args:
+        file_path: Path to the source file
+
+    Returns:
+        Tuple of (dotted import path, as given to the model by
+        ``module_import_path``; bare module name)
+    """
+    dotted = module_import_path(file_path)
+    return dotted, dotted.rpartition(".")[2] or Path(file_path).stem
+
+
+def retarget_imports(code: str, old: Tuple[str, str], new: Tuple[str, str]) -> str:
+    """
+    Point a test's imports of one module at another module
+
+    Dotted module paths are replaced everywhere, which also covers
+    ``mock.patch`` targets. The bare module name is only replaced in import
+    statements; ``import old`` becomes ``import new as old`` so that
+    attribute access in the test keeps working. A bare name that is the old
+    module's import path is pointed at the new module's import path.
+
+    Args:
+        code: Test code generated for a function in the old module
+        old: ``module_names`` of the module the code was generated for
+        new: ``module_names`` of the module to test instead
+
+    Returns:
+        Test code importing from the new module
+    """
+    (old_dotted, old_stem), (new_dotted, new_stem) = old, new
+    if "." in old_dotted and old_dotted != new_dotted:
+        code = re.sub(rf"(?<![\w.]){re.escape(old_dotted)}(?![\w])", new_dotted, code)
+    target = new_dotted if old_dotted == old_stem else new_stem
+    if old_stem == target:
+        return code
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+
+    lines = code.splitlines()
+    for node in sorted(tree.body, key=lambda n: n.lineno, reverse=True):
+        replacement = None
+        if isinstance(node, ast.ImportFrom) and node.level == 0 and node.module == old_stem:
+            names = ", ".join(f"{a.name} as {a.asname}" if a.asname else a.name for a in node.names)
+            replacement = f"from {target} import {names}"
+        elif isinstance(node, ast.Import) and any(a.name == old_stem for a in node.names):
+            names = ", ".join(
+                f"{target} as {a.asname or old_stem}" if a.name == old_stem
+                else (f"{a.name} as {a.asname}" if a.asname else a.name)
+                for a in node.names
+            )
+            replacement = f"import {names}"
+        if replacement is not None:
+            indent = lines[node.lineno - 1][:node.col_offset]
+            lines[node.lineno - 1:node.end_lineno] = [indent + replacement]
+    return "\n".join(lines)
+
+
+class Deduplicator:
+    """
+    Generate tests once per distinct function and fan results out to copies
+
+    Functions are matched by their ``fingerprint`` (see
+    ``FunctionDiscovery``). The first occurrence of a fingerprint is sent for
+    generation; later occurrences receive its result, with imports of the
+    first occurrence's module pointed at their own. Functions without a
+    fingerprint are always generated.
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None):
+        """
+        Initialize the deduplicator
+
+        Args:
+            metrics: Collector for the ``functions_unique`` and
+                ``functions_deduplicated`` counters (default: a private one)
+        """
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    def run(
+        self,
+        functions: Iterable[Mapping[str, Any]],
+        generate: Callable[[Iterable[Mapping[str, Any]]], Iterator[Any]],
+    ) -> Iterator[Any]:
+        """
+        Generate tests for a stream of functions, once per fingerprint
+
+        ``functions`` is consumed lazily, and results are yielded in input
+        order. A copy's result follows as soon as the next generated result
+        (or the end of the stream) is reached.
+
+        Args:
+            functions: Iterable of function information dictionaries
+            generate: Function generating results for an iterable of
+                functions, in order, such as ``TestGenerator.iter_tests_for_functions``
+
+        Yields:
+            TestGenerationResult objects, one per input function
+        """
+        # functions pulled from the input, in order; True marks a copy
+        order: deque = deque()
+        first: Dict[str, Any] = {}
+
+        def unique() -> Iterator[Mapping[str, Any]]:
+            for function_info in functions:
+                fingerprint = function_info.get("fingerprint")
+                copy = fingerprint is not None and fingerprint in first
+                order.append((function_info, copy))
+                if copy:
+                    self.metrics.count("functions_deduplicated")
+                    continue
+                self.metrics.count("functions_unique")
+                if fingerprint is not None:
+                    first[fingerprint] = None
+                yield function_info
+
+        for result in generate(unique()):
+            while order:
+                function_info, copy = order.popleft()
+                if not copy:
+                    fingerprint = function_info.get("fingerprint")
+                    if fingerprint is not None:
+                        first[fingerprint] = result
+                    yield result
+                    break
+                yield self._fan_out(first[function_info["fingerprint"]], function_info)
+        while order:
+            function_info, _ = order.popleft()
+            yield self._fan_out(first[function_info["fingerprint"]], function_info)
+
+    def _fan_out(self, result: Any, function_info: Mapping[str, Any]) -> Any:
+        """
+        Copy a generated result onto an identical function in another module
+
+        Args:
+            result: Result generated for the first occurrence
+            function_info: The copy
+
+        Returns:
+            TestGenerationResult for the copy, marked as cached
+        """
+        test_code = result.test_code
+        if test_code:
+            test_code = retarget_imports(
+                test_code,
+                module_names(result.function_info.get("file_path", "")),
+                module_names(function_info.get("file_path", "")),
+            )
+        return dataclasses.replace(
+            result,
+            function_info=function_info,
+            test_code=test_code,
+            cached=True,
+            retries=0,
+            estimated_prompt_tokens=0,
+            prompt_tokens=None,
+            completion_tokens=None,
+        )
@@ -0,0 +1,163 @@
+"""
+Persistent index of discovered functions for PyTest-Gen
+"""
+
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 6
+INDEX_DIR_NAME = ".pytestgen"
+INDEX_FILE_NAME = "discovery_index.json"
+
+
+def default_index_path(project_dir: Path) -> Path:
+    """
+    Return the default location of the discovery index for a project
+
+    Args:
+        project_dir: Path to the project directory
+
+    Returns:
+        Path to ``<project_dir>/.pytestgen/discovery_index.json``
+    """
+    return Path(project_dir) / INDEX_DIR_NAME / INDEX_FILE_NAME
+
+
+class DiscoveryIndex:
+    """
+    Per-file cache of extracted function records
+
+    Entries are keyed by file path and validated by mtime and size first,
+    then by content hash, so unchanged files are never re-parsed.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize the index and load it from disk if present
+
+        Args:
+            path: Location of the index file
+        """
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable discovery index {self.path}: {str(e)}")
+            return
+
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.entries = data.get("files", {})
+
+    def lookup(self, file_path: str, mtime_ns: int, size: int) -> Optional[Dict[str, Any]]:
+        """
+        Return the entry for a file whose mtime and size are unchanged
+
+        Args:
+            file_path: Path of the source file
+            mtime_ns: Current modification time in nanoseconds
+            size: Current file size in bytes
+
+        Returns:
+            Index entry, or None if the file must be re-checked
+        """
+        entry = self.entries.get(file_path)
+        if entry is not None and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+            return entry
+        return None
+
+    def lookup_hash(self, file_path: str, digest: str, mtime_ns: int, size: int) -> Optional[Dict[str, Any]]:
+        """
+        Return the entry for a file whose content hash is unchanged
+
+        A match refreshes the stored mtime and size, so the next lookup
+        can skip hashing.
+
+        Args:
+            file_path: Path of the source file
+            digest: SHA-256 hex digest of the current file content
+            mtime_ns: Current modification time in nanoseconds
+            size: Current file size in bytes
+
+        Returns:
+            Index entry, or None if the file must be re-parsed
+        """
+        entry = self.entries.get(file_path)
+        if entry is None or entry["sha256"] != digest:
+            return None
+        if entry["mtime_ns"] != mtime_ns or entry["size"] != size:
+            entry["mtime_ns"] = mtime_ns
+            entry["size"] = size
+            self._dirty = True
+        return entry
+
+    def update(
+        self,
+        file_path: str,
+        mtime_ns: int,
+        size: int,
+        digest: str,
+        functions: List[Dict[str, Any]],
+        error: Optional[str] = None,
+    ):
+        """
+        Store the extracted functions for a file
+
+        Args:
+            file_path: Path of the source file
+            mtime_ns: Modification time in nanoseconds
+            size: File size in bytes
+            digest: SHA-256 hex digest of the file content
+            functions: Function records extracted from the file
+            error: Parse error message, if the file could not be parsed
+        """
+        self.entries[file_path] = {
+            "mtime_ns": mtime_ns,
+            "size": size,
+            "sha256": digest,
+            "functions": functions,
+            "error": error,
+        }
+        self._dirty = True
+
+    def retain(self, file_paths: Iterable[str]):
+        """
+        Drop entries for files that are no longer present
+
+        Args:
+            file_paths: Paths of all files found by the latest full scan
+        """
+        keep = set(file_paths)
+        stale = [path for path in self.entries if path not in keep]
+        for path in stale:
+            del self.entries[path]
+        if stale:
+            self._dirty = True
+
+    def save(self):
+        """Write the index to disk if it changed"""
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "files": self.entries}, f, separators=(",", ":"))
+            os.replace(tmp_name, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Could not write discovery index {self.path}: {str(e)}")
@@ -0,0 +1,258 @@
+"""
+Ignore-aware filesystem walker for PyTest-Gen
+"""
+
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Directories that never contain first-party code worth testing
+DEFAULT_EXCLUDES = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".venv",
+    "venv",
+    "node_modules",
+    "build",
+    "dist",
+    "site-packages",
+    "__pycache__",
+    ".tox",
+    ".nox",
+    ".eggs",
+    "*.egg-info",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    ".pytestgen",
+)
+
+
+def _translate_glob(pattern: str) -> str:
+    """
+    Translate a gitignore-style glob into a regular expression fragment
+
+    Args:
+        pattern: Glob where ``*`` and ``?`` stop at ``/`` and ``**`` spans directories
+
+    Returns:
+        Regular expression source (without anchors)
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
+
+
+class IgnoreRule:
+    """
+    A single gitignore-style pattern
+    """
+
+    def __init__(self, pattern: str, base: str = ""):
+        """
+        Compile a pattern
+
+        Args:
+            pattern: Pattern line, e.g. ``build/``, ``!keep.py`` or ``/docs/*.py``
+            base: Directory (relative to the walk root, POSIX style) the pattern is relative to
+        """
+        self.negated = pattern.startswith("!")
+        if self.negated:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # a slash anywhere but at the end anchors the pattern to its base directory
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        prefix = re.escape(base + "/") if base else ""
+        if anchored:
+            self.regex = re.compile(f"^{prefix}{_translate_glob(pattern)}$")
+        else:
+            self.regex = re.compile(f"^{prefix}(?:.*/)?{_translate_glob(pattern)}$")
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        Check whether the rule matches a path
+
+        Args:
+            rel_path: Path relative to the walk root, POSIX style
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the pattern matches
+        """
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(rel_path) is not None
+
+
+def parse_gitignore(path: Path, base: str = "") -> List[IgnoreRule]:
+    """
+    Load the rules of a ``.gitignore`` file
+
+    Args:
+        path: Path to the ``.gitignore`` file
+        base: Directory of the file relative to the walk root, POSIX style
+
+    Returns:
+        List of rules in file order
+    """
+    rules = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError as e:
+        logger.warning(f"Could not read {path}: {str(e)}")
+        return rules
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("\\"):
+            line = line[1:]
+        rules.append(IgnoreRule(line, base))
+    return rules
+
+
+def _is_ignored(rules: Sequence[IgnoreRule], rel_path: str, is_dir: bool) -> bool:
+    ignored = False
+    for rule in rules:
+        if rule.negated == ignored and rule.matches(rel_path, is_dir):
+            ignored = not rule.negated
+    return ignored
+
+
+class FileWalker:
+    """
+    Walk a project tree with ``os.scandir``, pruning ignored directories early
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        use_default_excludes: bool = True,
+        respect_gitignore: bool = True,
+        follow_symlinks: bool = False,
+        suffix: str = ".py",
+    ):
+        """
+        Initialize the walker
+
+        Args:
+            root: Directory to walk
+            include: Glob patterns a file must match (relative to ``root``); None includes everything
+            exclude: Additional gitignore-style patterns to skip
+            use_default_excludes: Skip ``DEFAULT_EXCLUDES`` such as ``.git`` and ``.venv``
+            respect_gitignore: Honor ``.gitignore`` files found during the walk
+            follow_symlinks: Descend into symlinked directories and yield symlinked files
+            suffix: File name suffix to yield
+        """
+        self.root = Path(root)
+        self.include = [IgnoreRule(pattern) for pattern in include or []]
+        self.respect_gitignore = respect_gitignore
+        self.follow_symlinks = follow_symlinks
+        self.suffix = suffix
+        patterns = list(DEFAULT_EXCLUDES) if use_default_excludes else []
+        patterns.extend(exclude or [])
+        self.base_rules = [IgnoreRule(pattern) for pattern in patterns]
+
+    def _is_included(self, rel_path: str) -> bool:
+        if any(rule.matches(rel_path, False) for rule in self.include):
+            return True
+        # a pattern naming a directory includes everything below it
+        parent = rel_path.rpartition("/")[0]
+        while parent:
+            if any(rule.matches(parent, True) for rule in self.include):
+                return True
+            parent = parent.rpartition("/")[0]
+        return False
+
+    def walk(self, max_files: Optional[int] = None) -> Iterator[Path]:
+        """
+        Yield matching files in a deterministic depth-first order
+
+        Files of a directory are yielded (sorted by name) before its
+        subdirectories are visited.
+
+        Args:
+            max_files: Stop after yielding this many files
+
+        Yields:
+            Paths of matching files
+        """
+        count = 0
+        seen_dirs = set()
+        stack: List[Tuple[str, str, List[IgnoreRule]]] = [(str(self.root), "", self.base_rules)]
+        while stack:
+            dir_path, rel_dir, rules = stack.pop()
+            if self.follow_symlinks:
+                real = os.path.realpath(dir_path)
+                if real in seen_dirs:
+                    continue
+                seen_dirs.add(real)
+
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                logger.warning(f"Could not read directory {dir_path}: {str(e)}")
+                continue
+
+            if self.respect_gitignore:
+                for entry in entries:
+                    if entry.name == ".gitignore" and entry.is_file():
+                        rules = rules + parse_gitignore(Path(entry.path), rel_dir)
+                        break
+
+            subdirs = []
+            for entry in entries:
+                if not self.follow_symlinks and entry.is_symlink():
+                    continue
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if _is_ignored(rules, rel_path, is_dir):
+                    continue
+                if is_dir:
+                    subdirs.append((entry.path, rel_path, rules))
+                elif entry.name.endswith(self.suffix):
+                    if self.include and not self._is_included(rel_path):
+                        continue
+                    yield Path(entry.path)
+                    count += 1
+                    if max_files and count >= max_files:
+                        return
+
+            stack.extend(reversed(subdirs))
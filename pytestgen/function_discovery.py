@@ -3,29 +3,260 @@ Function discovery module for PyTest-Gen
 """
 
 import ast
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Set, Tuple
 import logging
+from .discovery_index import DiscoveryIndex
+from .file_walker import FileWalker
+from .function_info import FunctionInfo, iter_function_nodes
+from .git_diff import LineRanges, overlaps
+from .metrics import Metrics
+from .test_generator import module_import_path
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on files handed to a worker process per task
+MAX_CHUNK_SIZE = 64
+
+# Nodes that add a decision point to a function's cyclomatic complexity
+BRANCH_NODES = tuple(
+    getattr(ast, name) for name in (
+        "If", "IfExp", "For", "AsyncFor", "While", "ExceptHandler", "Assert", "match_case"
+    ) if hasattr(ast, name)
+)
+
+# pytest collects names starting with "test"; require a word boundary after it
+TEST_NAME_RE = re.compile(r"test(?![a-z])")
+
+def _test_targets(test_name: str) -> List[str]:
+    """
+    Candidate target names for a test function
+
+    ``test_add_negative_numbers`` yields ``add_negative_numbers``,
+    ``add_negative`` and ``add``.
+
+    Args:
+        test_name: Name of the test function
+
+    Returns:
+        Candidate names, longest first
+    """
+    stem = test_name[len("test"):]
+    # testAddNumbers is the camelCase spelling of test_add_numbers
+    stem = stem.lstrip("_") if stem.startswith("_") else _snake_case(stem)
+    if not stem:
+        return []
+    targets = [stem]
+    position = stem.rfind("_")
+    while position > 0:
+        targets.append(stem[:position])
+        position = stem.rfind("_", 0, position)
+    return targets
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+
+def _target_module(test_file: Optional[str]) -> Optional[str]:
+    """Module a test file is named after: ``test_<module>.py`` or ``<module>_test.py``"""
+    if not test_file:
+        return None
+    stem = Path(test_file).stem
+    if stem.startswith("test_"):
+        return stem[len("test_"):] or None
+    if stem.endswith("_test"):
+        return stem[:-len("_test")] or None
+    return None
+
+def module_test_name(file_path: str, project_dir: Optional[Path] = None) -> str:
+    """
+    Name of the generated test file for a module: ``test_<name>.py``
+
+    The name depends only on where the module lives, so modules that share
+    a file name always get their own test files, whatever order or run
+    their tests are written in. Modules inside a package are named after
+    their import path (``pkg/util.py`` is ``pkg_util``); other modules after
+    their path relative to ``project_dir`` (``scripts/util.py`` is
+    ``scripts_util``).
+
+    Args:
+        file_path: Path to the source module
+        project_dir: Project root; without it, modules outside packages are
+            named after their file name
+
+    Returns:
+        Module name used in the test file name
+    """
+    dotted = module_import_path(file_path)
+    if "." in dotted or project_dir is None:
+        return dotted.replace(".", "_")
+    try:
+        parts = Path(os.path.abspath(file_path)).relative_to(os.path.abspath(project_dir)).with_suffix("").parts
+    except ValueError:
+        return dotted
+    return "_".join(parts) or dotted
+
+class TestIndex:
+    """
+    Set-based index mapping existing tests to the functions they cover
+
+    - ``test_<name>`` covers functions and methods called ``<name>``
+    - ``Test<Class>.test_<name>`` covers the method ``<Class>.<name>`` and
+      top-level functions called ``<name>``
+    - ``Test<CamelName>`` covers the top-level function ``<camel_name>``
+
+    Test names may carry a descriptive suffix: ``test_add_negative_numbers``
+    in ``test_calc.py`` also covers ``add`` from ``calc.py``. Shortened names
+    only count for the module the test file is named after, by file name or
+    by ``module_test_name``, so the test does not mark every ``add`` in the
+    project as tested.
+    """
+
+    __test__ = False
+
+    def __init__(self, project_dir: Optional[Path] = None):
+        """
+        Initialize an empty index
+
+        Args:
+            project_dir: Project root, used to match test files named by
+                ``module_test_name``
+        """
+        self.project_dir = project_dir
+        self.module_names: Set[str] = set()
+        self.class_scoped_names: Set[str] = set()
+        self.methods: Set[str] = set()
+        self.class_targets: Set[str] = set()
+        # (module, name) pairs for shortened test names
+        self.module_scoped_names: Set[Tuple[str, str]] = set()
+
+    def add(self, func: Dict[str, Any]):
+        """
+        Register a test function
+
+        Args:
+            func: Function information of a test function
+        """
+        targets = _test_targets(func["function_name"])
+        if not targets:
+            return
+        module = _target_module(func.get("file_path"))
+        if module is not None:
+            self.module_scoped_names.update((module, target) for target in targets[1:])
+        class_name = func.get("class_name")
+        if class_name and class_name.startswith("Test") and len(class_name) > len("Test"):
+            target_class = class_name[len("Test"):]
+            self.class_targets.add(_snake_case(target_class))
+            self.class_scoped_names.add(targets[0])
+            # the test class already scopes shortened names to one class
+            self.methods.update(f"{target_class}.{target}" for target in targets)
+        else:
+            self.module_names.add(targets[0])
+
+    def update(self, functions: Iterable[Dict[str, Any]]):
+        """
+        Register every test function in an iterable of function records
+
+        Args:
+            functions: Function information dictionaries
+        """
+        for func in functions:
+            if func["is_test"]:
+                self.add(func)
+
+    def covers(self, func: Dict[str, Any]) -> bool:
+        """
+        Check whether a function has a corresponding test
+
+        Args:
+            func: Function information of a non-test function
+
+        Returns:
+            True if an indexed test covers the function
+        """
+        name = func["function_name"]
+        if name in self.module_names:
+            return True
+        file_path = func.get("file_path")
+        if file_path and (
+            (Path(file_path).stem, name) in self.module_scoped_names
+            or (module_test_name(file_path, self.project_dir), name) in self.module_scoped_names
+        ):
+            return True
+        class_name = func.get("class_name")
+        if class_name:
+            return f"{class_name}.{name}" in self.methods
+        return name in self.class_scoped_names or name in self.class_targets
+
+def _parse_chunk(
+    project_dir: str, file_paths: List[str], indexed_digests: List[Optional[str]]
+) -> List[Tuple[Optional[tuple], Optional[str]]]:
+    """
+    Parse a chunk of files in a worker process
+
+    Args:
+        project_dir: Project directory of the parent discovery
+        file_paths: Paths of the files to parse
+        indexed_digests: Content hash the parent's index holds for each file,
+            if any; files whose content still matches are not parsed
+
+    Returns:
+        One (parse result, exception message) pair per file, in input order
+    """
+    discovery = FunctionDiscovery(Path(project_dir))
+    results = []
+    for file_path, indexed_digest in zip(file_paths, indexed_digests):
+        try:
+            results.append((discovery._read_and_parse(Path(file_path), indexed_digest), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
 class FunctionDiscovery:
     """
     Discover and analyze Python functions in a project directory
     """
 
-    def __init__(self, project_dir: Path):
+    def __init__(
+        self,
+        project_dir: Path,
+        index: Optional[DiscoveryIndex] = None,
+        workers: int = 1,
+        walker: Optional[FileWalker] = None,
+        test_dirs: Optional[Sequence[Path]] = None,
+        metrics: Optional[Metrics] = None,
+        changed_lines: Optional[LineRanges] = None,
+    ):
         """
         Initialize the function discovery
         
         Args:
             project_dir: Path to the project directory to scan
+            index: Persistent index used to skip re-parsing unchanged files
+            workers: Number of processes used to parse files
+            walker: File walker selecting the files to scan (default: ``FileWalker(project_dir)``)
+            test_dirs: Extra directories (e.g. the output directory) whose tests count as existing coverage
+            metrics: Collector for stage timings and counters (default: a private one)
+            changed_lines: Changed line ranges per file (see ``git_diff.changed_lines``);
+                when given, only functions overlapping a change are reported and
+                source files without changes are not parsed
         """
         self.project_dir = project_dir
+        self.walker = walker if walker is not None else FileWalker(project_dir)
+        self.test_dirs = list(test_dirs or [])
+        self.index = index
+        self.workers = max(1, workers)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.changed_lines = None
+        if changed_lines is not None:
+            self.changed_lines = {Path(os.path.abspath(path)): ranges for path, ranges in changed_lines.items()}
         self.visited_files = set()
         self.discovered_functions = []
 
-    def discover(self, max_files: int = None) -> List[Dict[str, Any]]:
+    def discover(self, max_files: int = None) -> List[FunctionInfo]:
         """
         Discover functions in the project directory
         
@@ -37,16 +268,209 @@ class FunctionDiscovery:
         """
         self.discovered_functions = []
         python_files = self._find_python_files(max_files)
+        for functions in self._iter_files(self._select_files(python_files)):
+            self.discovered_functions.extend(functions)
+        self._finish_scan(python_files, max_files)
+        return self.discovered_functions
+
+    def iter_untested_functions(self, max_files: int = None) -> Iterator[FunctionInfo]:
+        """
+        Stream functions that don't have corresponding test functions
+        
+        Unlike ``discover`` followed by ``get_untested_functions``, functions
+        are yielded as soon as their file has been processed and nothing is
+        accumulated in ``discovered_functions``. Test files (``test_*.py``,
+        ``*_test.py``, ``conftest.py`` and files under ``tests/``) are
+        processed first so that the test index is complete before other files
+        are checked; tests living in regular modules only cover functions of
+        their own or later files.
+        
+        Args:
+            max_files: Maximum number of files to process
+        
+        Yields:
+            Functions that need tests
+        """
+        python_files = self._find_python_files(max_files)
+        selected_files = self._select_files(python_files)
+        test_files = [file_path for file_path in selected_files if self.is_test_file(file_path)]
+        source_files = [file_path for file_path in selected_files if not self.is_test_file(file_path)]
+
+        # files parsed so far are indexed even if the consumer stops early
+        try:
+            test_index = TestIndex(self.project_dir)
+            test_index.update(self.discover_external_tests({str(file_path) for file_path in python_files}))
+            candidates = []
+            for functions in self._iter_files(test_files):
+                test_index.update(functions)
+                candidates.extend(func for func in functions if not func["is_test"])
+            for func in candidates:
+                if self._is_changed(func) and not test_index.covers(func):
+                    yield func
+
+            for functions in self._iter_files(source_files):
+                test_index.update(functions)
+                for func in functions:
+                    if not func["is_test"] and self._is_changed(func) and not test_index.covers(func):
+                        yield func
+        finally:
+            self._finish_scan(python_files, max_files)
+
+    def iter_source_functions(self, max_files: int = None) -> Iterator[FunctionInfo]:
+        """
+        Stream the non-test functions of non-test files
+        
+        Unlike ``iter_untested_functions``, existing tests are not matched
+        by name; coverage-guided runs decide what needs tests from coverage
+        data instead.
+        
+        Args:
+            max_files: Maximum number of files to process
+        
+        Yields:
+            Functions outside test files (only changed ones with ``changed_lines``)
+        """
+        python_files = self._find_python_files(max_files)
+        source_files = [
+            file_path for file_path in self._select_files(python_files) if not self.is_test_file(file_path)
+        ]
+        try:
+            for functions in self._iter_files(source_files):
+                for func in functions:
+                    if not func["is_test"] and self._is_changed(func):
+                        yield func
+        finally:
+            self._finish_scan(python_files, max_files)
+
+    def scan_file(self, file_path: Path) -> List[FunctionInfo]:
+        """
+        Extract the functions of one file, from the index if it is unchanged
+        
+        Args:
+            file_path: Path to the Python file
+        
+        Returns:
+            List of functions found in the file
+        
+        Raises:
+            OSError: If the file cannot be read
+            UnicodeDecodeError: If the file is not valid UTF-8
+        """
+        with self.metrics.stage("parse"):
+            functions = self._process_file(file_path)
+        self.metrics.count("files_processed")
+        return functions
+
+    def _select_files(self, python_files: List[Path]) -> List[Path]:
+        """
+        Pick the files that have to be parsed
+        
+        With ``changed_lines``, test files are kept for the test index and
+        other files only if they changed.
+        
+        Args:
+            python_files: Files found by the scan
+        
+        Returns:
+            Files to parse, in scan order
+        """
+        if self.changed_lines is None:
+            return python_files
+        return [
+            file_path for file_path in python_files
+            if self.is_test_file(file_path) or Path(os.path.abspath(file_path)) in self.changed_lines
+        ]
+
+    def _is_changed(self, func: Dict[str, Any]) -> bool:
+        """
+        Check if a function overlaps a changed line
+        
+        Args:
+            func: Function information dictionary
         
+        Returns:
+            True without ``changed_lines``, or if any line of the function changed
+        """
+        if self.changed_lines is None:
+            return True
+        ranges = self.changed_lines.get(Path(os.path.abspath(func["file_path"])))
+        if not ranges:
+            return False
+        return overlaps(ranges, func["line_number"], func.get("end_line_number") or func["line_number"])
+
+    def is_test_file(self, file_path: Path) -> bool:
+        """
+        Check if a file holds tests by pytest naming conventions
+        
+        Args:
+            file_path: Path to the Python file
+        
+        Returns:
+            True for test modules, conftest.py and files under a tests directory
+        """
+        name = file_path.name
+        if name.startswith("test_") or name.endswith("_test.py") or name == "conftest.py":
+            return True
+        try:
+            parts = file_path.relative_to(self.project_dir).parent.parts
+        except ValueError:
+            parts = ()
+        return any(part in ("test", "tests") for part in parts)
+
+    def _finish_scan(self, python_files: List[Path], max_files: int = None):
+        """
+        Update and persist the discovery index after a scan
+        
+        Args:
+            python_files: Files found by the scan
+            max_files: File limit the scan ran with
+        """
+        if self.index is None:
+            return
+        if self.scan_is_complete(python_files, max_files):
+            self.index.retain(str(file_path) for file_path in python_files)
+        self.index.save()
+
+    def scan_is_complete(self, python_files: List[Path], max_files: int = None) -> bool:
+        """
+        Check if a scan saw every file of the project
+        
+        Only a complete scan proves that a file missing from it was deleted;
+        ``--include`` filters, ``changed_lines`` and a file limit narrow it.
+        
+        Args:
+            python_files: Files found by the scan
+            max_files: File limit the scan ran with
+        
+        Returns:
+            True if index entries of files the scan did not see can be dropped
+        """
+        if self.walker.include or self.changed_lines is not None:
+            return False
+        return not max_files or len(python_files) < max_files
+
+    def _iter_files(self, python_files: List[Path]) -> Iterator[List[FunctionInfo]]:
+        """
+        Process files serially or on the worker pool
+        
+        Args:
+            python_files: Paths of the files to process
+        
+        Yields:
+            Functions found in each file, in the order of ``python_files``
+        """
+        if self.workers > 1 and len(python_files) > 1:
+            yield from self._process_files_parallel(python_files)
+            return
         for file_path in python_files:
             try:
-                functions = self._process_file(file_path)
-                self.discovered_functions.extend(functions)
+                with self.metrics.stage("parse"):
+                    functions = self._process_file(file_path)
             except Exception as e:
                 logger.warning(f"Error processing {file_path}: {str(e)}")
                 continue
-        
-        return self.discovered_functions
+            self.metrics.count("files_processed")
+            yield functions
 
     def _find_python_files(self, max_files: int = None) -> List[Path]:
         """
@@ -59,15 +483,74 @@ class FunctionDiscovery:
             List of Python file paths
         """
         python_files = []
-        for file in self.project_dir.rglob("*.py"):
-            if file not in self.visited_files:
-                python_files.append(file)
-                self.visited_files.add(file)
-                if max_files and len(python_files) >= max_files:
-                    break
+        with self.metrics.stage("walk"):
+            for file in self.walker.walk():
+                if file not in self.visited_files:
+                    python_files.append(file)
+                    self.visited_files.add(file)
+                    if max_files and len(python_files) >= max_files:
+                        break
+        self.metrics.count("files_found", len(python_files))
         return python_files
 
-    def _process_file(self, file_path: Path) -> List[Dict[str, Any]]:
+    def _process_files_parallel(self, python_files: List[Path]) -> Iterator[List[FunctionInfo]]:
+        """
+        Process files using a pool of worker processes
+        
+        Index lookups happen in this process; only files that must be parsed
+        are sent to the workers, in chunks.
+        
+        Args:
+            python_files: Paths of the files to process
+        
+        Yields:
+            Functions found in each file, in the order of ``python_files``
+        """
+        cached: Dict[int, Optional[List[FunctionInfo]]] = {}
+        pending = []
+        with self.metrics.stage("parse"):
+            for position, file_path in enumerate(python_files):
+                try:
+                    functions = self._lookup_index(file_path)
+                except Exception as e:
+                    logger.warning(f"Error processing {file_path}: {str(e)}")
+                    cached[position] = None
+                    continue
+                if functions is None:
+                    pending.append(position)
+                else:
+                    cached[position] = functions
+
+        chunk_size = max(1, min(MAX_CHUNK_SIZE, len(pending) // (self.workers * 4)))
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        with ProcessPoolExecutor(max_workers=max(1, min(self.workers, len(chunks)))) as executor:
+            jobs = zip(chunks, executor.map(
+                _parse_chunk,
+                [str(self.project_dir)] * len(chunks),
+                [[str(python_files[position]) for position in chunk] for chunk in chunks],
+                [[self._indexed_digest(python_files[position]) for position in chunk] for chunk in chunks],
+            ))
+            parsed: Dict[int, tuple] = {}
+            for position, file_path in enumerate(python_files):
+                if position in cached:
+                    functions = cached.pop(position)
+                    if functions is not None:
+                        self.metrics.count("files_processed")
+                        yield functions
+                    continue
+                # wall time spent waiting on the workers
+                with self.metrics.stage("parse"):
+                    while position not in parsed:
+                        chunk, chunk_results = next(jobs)
+                        parsed.update(zip(chunk, chunk_results))
+                result, exception = parsed.pop(position)
+                if exception is not None:
+                    logger.warning(f"Error processing {file_path}: {exception}")
+                    continue
+                self.metrics.count("files_processed")
+                yield self._store_parsed(file_path, result)
+
+    def _process_file(self, file_path: Path) -> List[FunctionInfo]:
         """
         Process a single Python file and extract function information
         
@@ -77,51 +560,163 @@ class FunctionDiscovery:
         Returns:
             List of functions found in the file
         """
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-            
+        functions = self._lookup_index(file_path)
+        if functions is not None:
+            return functions
+        return self._store_parsed(file_path, self._read_and_parse(file_path))
+
+    def _lookup_index(self, file_path: Path) -> Optional[List[FunctionInfo]]:
+        """
+        Return the indexed functions of a file whose mtime and size are unchanged
+        
+        Args:
+            file_path: Path to the Python file
+        
+        Returns:
+            List of functions, or None if the file has to be read
+        """
+        if self.index is None:
+            return None
+        st = os.stat(file_path)
+        entry = self.index.lookup(str(file_path), st.st_mtime_ns, st.st_size)
+        if entry is None:
+            return None
+        self.metrics.count("index_hits")
+        if entry["error"]:
+            logger.warning(entry["error"])
+        return [FunctionInfo.from_dict(record) for record in entry["functions"]]
+
+    def _indexed_digest(self, file_path: Path) -> Optional[str]:
+        """Content hash the index holds for a file, if any"""
+        if self.index is None:
+            return None
+        entry = self.index.entries.get(str(file_path))
+        return entry["sha256"] if entry is not None else None
+
+    def _read_and_parse(self, file_path: Path, indexed_digest: Optional[str] = None) -> tuple:
+        """
+        Read a file and extract its functions unless its content is indexed
+        
+        Args:
+            file_path: Path to the Python file
+            indexed_digest: Indexed content hash, for workers that have no index
+        
+        Returns:
+            Tuple of (functions, syntax error message, mtime_ns, size, sha256)
+            where functions is None if the indexed content hash still matches
+        """
+        st = os.stat(file_path)
+        with open(file_path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest == indexed_digest or (
+            self.index is not None and self.index.lookup_hash(str(file_path), digest, st.st_mtime_ns, st.st_size)
+        ):
+            return None, None, st.st_mtime_ns, st.st_size, digest
+        functions, error = self._parse_source(data.decode("utf-8"), file_path)
+        return functions, error, st.st_mtime_ns, st.st_size, digest
+
+    def _store_parsed(self, file_path: Path, parsed: tuple) -> List[FunctionInfo]:
+        """
+        Record a parse result in the index and log its errors
+        
+        Args:
+            file_path: Path to the Python file
+            parsed: Tuple returned by ``_read_and_parse``
+        
+        Returns:
+            List of functions found in the file
+        """
+        functions, error, mtime_ns, size, digest = parsed
+        if self.index is not None:
+            key = str(file_path)
+            if functions is None:
+                # refreshes the stored mtime and size, also for files hashed by a worker
+                entry = self.index.lookup_hash(key, digest, mtime_ns, size)
+                functions = [FunctionInfo.from_dict(record) for record in entry["functions"]]
+                error = entry["error"]
+            else:
+                records = [func.to_dict(include_lazy=False) for func in functions]
+                self.index.update(key, mtime_ns, size, digest, records, error)
+        if error:
+            logger.warning(error)
+        return functions
+
+    def _parse_source(self, content: str, file_path: Path) -> Tuple[List[FunctionInfo], Optional[str]]:
+        """
+        Parse source code and extract function information
+        
+        Args:
+            content: Source code of the file
+            file_path: Path to the Python file
+        
+        Returns:
+            Tuple of (functions found, syntax error message or None)
+        """
         try:
             tree = ast.parse(content)
-            functions = []
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    func_info = self._extract_function_info(node, file_path)
-                    functions.append(func_info)
-            return functions
         except SyntaxError as e:
-            logger.warning(f"Syntax error in {file_path}: {str(e)}")
-            return []
+            return [], f"Syntax error in {file_path}: {str(e)}"
+
+        functions = [
+            self._extract_function_info(node, file_path, class_name)
+            for node, class_name in iter_function_nodes(tree)
+        ]
+        return functions, None
 
-    def _extract_function_info(self, node: ast.FunctionDef, file_path: Path) -> Dict[str, Any]:
+    def _extract_function_info(
+        self, node: ast.FunctionDef, file_path: Path, class_name: Optional[str] = None
+    ) -> FunctionInfo:
         """
         Extract detailed information about a function
         
+        The docstring is not copied; ``FunctionInfo`` reads it from the file
+        when it is first used.
+        
         Args:
             node: AST node representing the function
             file_path: Path to the file containing the function
+            class_name: Name of the class the function is defined in, if any
         
         Returns:
-            Dictionary containing function information
+            FunctionInfo record
         """
         # Get function arguments
-        args = []
-        for arg in node.args.args:
-            args.append({
-                "name": arg.arg,
-                "annotation": getattr(arg.annotation, "id", None) if arg.annotation else None
-            })
-
-        # Get docstring
-        docstring = ast.get_docstring(node)
-
-        return {
-            "file_path": str(file_path),
-            "function_name": node.name,
-            "args": args,
-            "docstring": docstring,
-            "line_number": node.lineno,
-            "is_test": self._is_test_function(node.name)
-        }
+        arg_specs = tuple(
+            (arg.arg, getattr(arg.annotation, "id", None) if arg.annotation else None)
+            for arg in node.args.args
+        )
+
+        return FunctionInfo(
+            file_path=str(file_path),
+            function_name=node.name,
+            class_name=class_name,
+            arg_specs=arg_specs,
+            line_number=node.lineno,
+            end_line_number=node.end_lineno,
+            is_test=self._is_test_function(node.name),
+            complexity=self._complexity(node)
+        )
+
+    def _complexity(self, node: ast.FunctionDef) -> int:
+        """
+        Compute the cyclomatic complexity of a function
+        
+        Args:
+            node: AST node representing the function
+        
+        Returns:
+            1 plus the number of decision points in the function body
+        """
+        complexity = 1
+        for child in ast.walk(node):
+            if isinstance(child, BRANCH_NODES):
+                complexity += 1
+            elif isinstance(child, ast.BoolOp):
+                complexity += len(child.values) - 1
+            elif isinstance(child, ast.comprehension):
+                complexity += 1 + len(child.ifs)
+        return complexity
 
     def _is_test_function(self, function_name: str) -> bool:
         """
@@ -133,9 +728,9 @@ class FunctionDiscovery:
         Returns:
             True if the function is a test function, False otherwise
         """
-        return function_name.startswith("test_") or "test" in function_name.lower()
+        return TEST_NAME_RE.match(function_name) is not None
 
-    def get_untested_functions(self) -> List[Dict[str, Any]]:
+    def get_untested_functions(self) -> List[FunctionInfo]:
         """
         Get functions that don't have corresponding test functions
         
@@ -143,18 +738,37 @@ class FunctionDiscovery:
             List of functions that need tests
         """
         functions = self.discovered_functions
-        untested = []
+        test_index = TestIndex(self.project_dir)
+        test_index.update(functions)
+        test_index.update(self.discover_external_tests({func["file_path"] for func in functions}))
+
+        return [
+            func for func in functions
+            if not func["is_test"] and self._is_changed(func) and not test_index.covers(func)
+        ]
+
+    def discover_external_tests(self, scanned_files: Set[str]) -> List[FunctionInfo]:
+        """
+        Collect test functions from ``test_dirs`` that the project scan did not cover
         
-        for func in functions:
-            if not func["is_test"]:
-                # Check if there's a corresponding test function
-                test_name = f"test_{func['function_name']}"
-                has_test = any(
-                    f["is_test"] and f["function_name"] == test_name
-                    for f in functions
-                )
-                
-                if not has_test:
-                    untested.append(func)
-        
-        return untested
+        Args:
+            scanned_files: Paths of files already processed by ``discover``
+        
+        Returns:
+            List of test functions
+        """
+        tests = []
+        for test_dir in self.test_dirs:
+            test_dir = Path(test_dir)
+            if not test_dir.is_dir():
+                continue
+            for file_path in FileWalker(test_dir).walk():
+                if str(file_path) in scanned_files:
+                    continue
+                try:
+                    functions = self._read_and_parse(file_path)[0]
+                except Exception as e:
+                    logger.warning(f"Error processing {file_path}: {str(e)}")
+                    continue
+                tests.extend(func for func in functions or [] if func["is_test"])
+        return tests
@@ -0,0 +1,288 @@
+"""
+Compact function records for PyTest-Gen
+"""
+
+import ast
+import hashlib
+import logging
+import os
+import sys
+from collections import deque
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Keys exposed through dict-style access, in the order of the old dict records
+KEYS = (
+    "file_path",
+    "function_name",
+    "class_name",
+    "args",
+    "docstring",
+    "line_number",
+    "end_line_number",
+    "is_test",
+    "complexity",
+    "fingerprint",
+)
+
+# Marks a docstring or fingerprint that has not been read yet; Ellipsis survives pickling as a singleton
+_UNLOADED = ...
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def iter_function_nodes(tree: ast.AST) -> Iterator[Tuple[ast.FunctionDef, Optional[str]]]:
+    """
+    Walk the function definitions of a module breadth-first, like ``ast.walk``
+
+    Args:
+        tree: Parsed module
+
+    Yields:
+        Tuples of (function node, name of the class it is defined in, if any)
+    """
+    todo = deque((child, None) for child in ast.iter_child_nodes(tree))
+    while todo:
+        node, class_name = todo.popleft()
+        if isinstance(node, ast.FunctionDef):
+            yield node, class_name
+            todo.extend((child, None) for child in ast.iter_child_nodes(node))
+        elif isinstance(node, ast.ClassDef):
+            todo.extend((child, node.name) for child in ast.iter_child_nodes(node))
+        else:
+            todo.extend((child, class_name) for child in ast.iter_child_nodes(node))
+
+
+def fingerprint_node(node: ast.FunctionDef, class_name: Optional[str]) -> str:
+    """
+    Hash a function's normalized AST
+
+    Line numbers, column offsets and formatting are left out, so copies
+    of a function in different files (or at different lines) share a
+    fingerprint. The class name is included because generated tests
+    instantiate the class.
+
+    Args:
+        node: AST node representing the function
+        class_name: Name of the class the function is defined in, if any
+
+    Returns:
+        Hex digest of the signature, docstring and body
+    """
+    dump = ast.dump(node, annotate_fields=False, include_attributes=False)
+    return hashlib.blake2b(f"{class_name}:{dump}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=64)
+def _file_fingerprints(file_path: str, mtime_ns: int, size: int) -> Dict[int, str]:
+    """
+    Fingerprint of every function in a file, keyed by ``def`` line
+
+    Cached per file version, so the functions of one module share a parse.
+
+    Args:
+        file_path: Path to the Python file
+        mtime_ns: Modification time, part of the cache key
+        size: File size, part of the cache key
+
+    Returns:
+        Mapping of line number to fingerprint
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return {node.lineno: fingerprint_node(node, class_name) for node, class_name in iter_function_nodes(tree)}
+
+
+@lru_cache(maxsize=64)
+def _file_details(file_path: str, mtime_ns: int, size: int) -> Dict[int, Tuple[Optional[str], str]]:
+    """
+    Docstring and source of every function in a file, keyed by ``def`` line
+
+    Cached per file version, so the functions of one module share a parse.
+
+    Args:
+        file_path: Path to the Python file
+        mtime_ns: Modification time, part of the cache key
+        size: File size, part of the cache key
+
+    Returns:
+        Mapping of line number to (docstring, source)
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    lines = content.splitlines()
+    details = {}
+    for node in ast.walk(ast.parse(content)):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            source = "\n".join(lines[node.lineno - 1:node.end_lineno])
+            details[node.lineno] = (ast.get_docstring(node), source)
+    return details
+
+
+class FunctionInfo(Mapping):
+    """
+    Slotted record of a discovered function
+
+    Names and file paths are interned, arguments are stored as a tuple of
+    ``(name, annotation)`` pairs, and the docstring and source are read from
+    the file only when first needed (typically when a prompt is built). The
+    fingerprint is computed on first access as well, since only dedup, the
+    journal and watch mode use it; watch mode reads it right after a scan,
+    before the file can change again.
+    Supports read-only dict-style access with the keys of the former dict
+    records, e.g. ``info["function_name"]`` or ``info.get("class_name")``.
+    """
+
+    __slots__ = (
+        "file_path",
+        "function_name",
+        "class_name",
+        "arg_specs",
+        "line_number",
+        "end_line_number",
+        "is_test",
+        "complexity",
+        "_fingerprint",
+        "_docstring",
+    )
+
+    def __init__(
+        self,
+        file_path: str,
+        function_name: str,
+        class_name: Optional[str] = None,
+        arg_specs: Tuple[Tuple[str, Optional[str]], ...] = (),
+        line_number: int = 1,
+        end_line_number: Optional[int] = None,
+        is_test: bool = False,
+        complexity: int = 1,
+        fingerprint: Any = _UNLOADED,
+        docstring: Any = _UNLOADED,
+    ):
+        """
+        Initialize the record
+
+        Args:
+            file_path: Path to the file containing the function
+            function_name: Name of the function
+            class_name: Name of the enclosing class, if any
+            arg_specs: ``(name, annotation)`` pair per positional argument
+            line_number: Line of the ``def`` statement
+            end_line_number: Last line of the function
+            is_test: Whether the function is a test
+            complexity: Cyclomatic complexity
+            fingerprint: Hash of the normalized AST, equal for identical
+                copies, if already known; computed lazily otherwise
+            docstring: Docstring if already known; read lazily otherwise
+        """
+        self.file_path = _intern(file_path)
+        self.function_name = _intern(function_name)
+        self.class_name = _intern(class_name)
+        self.arg_specs = tuple((_intern(name), _intern(annotation)) for name, annotation in arg_specs)
+        self.line_number = line_number
+        self.end_line_number = end_line_number
+        self.is_test = is_test
+        self.complexity = complexity
+        self._fingerprint = fingerprint
+        self._docstring = docstring
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FunctionInfo":
+        """
+        Build a record from a dict record
+
+        Args:
+            data: Dictionary with the keys of ``KEYS``; ``docstring`` is optional
+
+        Returns:
+            FunctionInfo object
+        """
+        return cls(
+            file_path=data["file_path"],
+            function_name=data["function_name"],
+            class_name=data.get("class_name"),
+            arg_specs=tuple((arg["name"], arg["annotation"]) for arg in data.get("args") or ()),
+            line_number=data["line_number"],
+            end_line_number=data.get("end_line_number"),
+            is_test=data.get("is_test", False),
+            complexity=data.get("complexity") or 1,
+            fingerprint=data.get("fingerprint", _UNLOADED),
+            docstring=data.get("docstring", _UNLOADED),
+        )
+
+    def to_dict(self, include_lazy: bool = True) -> Dict[str, Any]:
+        """
+        Convert the record to a plain dict
+
+        Args:
+            include_lazy: Include the docstring and fingerprint, reading them
+                if necessary
+
+        Returns:
+            Dictionary with the keys of ``KEYS``
+        """
+        return {key: self[key] for key in KEYS if include_lazy or key not in ("docstring", "fingerprint")}
+
+    @property
+    def args(self):
+        """Arguments as a list of ``{"name", "annotation"}`` dicts"""
+        return [{"name": name, "annotation": annotation} for name, annotation in self.arg_specs]
+
+    @property
+    def docstring(self) -> Optional[str]:
+        """Docstring of the function, read from its file on first access"""
+        if self._docstring is _UNLOADED:
+            self._docstring = self._details()[0]
+        return self._docstring
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        """Hash of the function's normalized AST, computed from its file on first access"""
+        if self._fingerprint is _UNLOADED:
+            try:
+                st = os.stat(self.file_path)
+                self._fingerprint = _file_fingerprints(self.file_path, st.st_mtime_ns, st.st_size).get(self.line_number)
+            except (OSError, SyntaxError, UnicodeDecodeError, ValueError) as e:
+                logger.warning(f"Could not fingerprint {self.function_name} in {self.file_path}: {str(e)}")
+                self._fingerprint = None
+        return self._fingerprint
+
+    @property
+    def source(self) -> str:
+        """Source code of the function, read from its file"""
+        return self._details()[1]
+
+    def _details(self) -> Tuple[Optional[str], str]:
+        try:
+            st = os.stat(self.file_path)
+            return _file_details(self.file_path, st.st_mtime_ns, st.st_size).get(self.line_number, (None, ""))
+        except (OSError, SyntaxError, UnicodeDecodeError, ValueError) as e:
+            logger.warning(f"Could not read details of {self.function_name} from {self.file_path}: {str(e)}")
+            return None, ""
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(KEYS)
+
+    def __len__(self) -> int:
+        return len(KEYS)
+
+    def __repr__(self) -> str:
+        owner = f"{self.class_name}." if self.class_name else ""
+        return f"FunctionInfo({owner}{self.function_name} at {self.file_path}:{self.line_number})"
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, _intern(value) if slot in ("file_path", "function_name", "class_name") else value)
@@ -0,0 +1,110 @@
+"""
+Changed-line detection from git for PyTest-Gen
+"""
+
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# New-side range of a zero-context hunk: "@@ -a[,b] +c[,d] @@"
+HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+LineRanges = Dict[Path, List[Tuple[int, int]]]
+
+
+class GitDiffError(RuntimeError):
+    """Raised when git is unavailable or the diff cannot be computed"""
+
+
+def _git(project_dir: Path, *args: str) -> str:
+    try:
+        completed = subprocess.run(
+            ["git", *args],
+            cwd=project_dir,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except FileNotFoundError as e:
+        raise GitDiffError("git is not installed") from e
+    except subprocess.CalledProcessError as e:
+        raise GitDiffError(e.stderr.strip() or f"git {args[0]} failed") from e
+    return completed.stdout
+
+
+def parse_diff(diff: str, root: Path) -> LineRanges:
+    """
+    Extract changed line ranges from a zero-context unified diff
+
+    Pure deletions mark the line after which content was removed, so a
+    function that only lost lines still counts as changed.
+
+    Args:
+        diff: Output of ``git diff -U0``
+        root: Directory the diff paths are relative to
+
+    Returns:
+        Mapping of file path to inclusive (first, last) line ranges in the new file
+    """
+    changed: LineRanges = {}
+    current = None
+    for line in diff.splitlines():
+        if line.startswith("+++ "):
+            target = line[4:]
+            current = None if target == "/dev/null" else root / target[2:]
+            if current is not None:
+                changed.setdefault(current, [])
+            continue
+        match = HUNK_RE.match(line)
+        if match and current is not None:
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            changed[current].append((start, start + count - 1) if count else (start, start + 1))
+    return changed
+
+
+def changed_lines(project_dir: Path, since: str) -> LineRanges:
+    """
+    Find the lines of Python files changed since a git ref
+
+    Covers committed, staged and unstaged changes relative to ``since``;
+    untracked files count as changed in full.
+
+    Args:
+        project_dir: Directory inside the git work tree
+        since: Commit, branch or tag to diff against, e.g. ``origin/main``
+
+    Returns:
+        Mapping of absolute file path to changed line ranges
+
+    Raises:
+        GitDiffError: If git fails, e.g. because ``since`` is unknown
+    """
+    root = Path(_git(project_dir, "rev-parse", "--show-toplevel").strip()).resolve()
+    diff = _git(
+        project_dir, "diff", "-U0", "--no-color", "--no-ext-diff", "--no-renames",
+        "--src-prefix=a/", "--dst-prefix=b/", since, "--", "*.py",
+    )
+    changed = parse_diff(diff, root)
+    untracked = _git(project_dir, "ls-files", "--others", "--exclude-standard", "--full-name", "--", "*.py")
+    for name in untracked.splitlines():
+        if name:
+            changed[root / name] = [(1, sys.maxsize)]
+    return changed
+
+
+def overlaps(ranges: List[Tuple[int, int]], start: int, end: int) -> bool:
+    """
+    Check if a line span intersects any changed range
+
+    Args:
+        ranges: Inclusive (first, last) changed line ranges
+        start: First line of the span
+        end: Last line of the span
+
+    Returns:
+        True if at least one changed line falls within ``start``..``end``
+    """
+    return any(first <= end and last >= start for first, last in ranges)
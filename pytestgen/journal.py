@@ -0,0 +1,170 @@
+"""
+Append-only progress journal for resumable PyTest-Gen runs
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from .test_generator import TestGenerationResult
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 2
+JOURNAL_FILE_NAME = "journal.ndjson"
+
+
+def default_journal_path(project_dir: Path) -> Path:
+    """
+    Return the default location of the progress journal for a project
+
+    Args:
+        project_dir: Path to the project directory
+
+    Returns:
+        Path to ``<project_dir>/.pytestgen/journal.ndjson``
+    """
+    return Path(project_dir) / ".pytestgen" / JOURNAL_FILE_NAME
+
+
+def _function_key(function_info: Mapping[str, Any]) -> Tuple[str, Optional[str], str]:
+    return (function_info.get("file_path", ""), function_info.get("class_name"), function_info["function_name"])
+
+
+def _same_version(record: Mapping[str, Any], function_info: Mapping[str, Any]) -> bool:
+    """
+    Check that a journaled result was generated for the function's current body
+
+    Compares fingerprints when both sides have one, otherwise line numbers.
+    """
+    fingerprint = function_info.get("fingerprint")
+    if fingerprint is not None and record["fingerprint"] is not None:
+        return fingerprint == record["fingerprint"]
+    return function_info.get("line_number") == record["line_number"]
+
+
+class ProgressJournal:
+    """
+    Record of completed generation results, one JSON line per result
+
+    Lines are appended and flushed as each result completes, so a run that
+    dies keeps everything finished before the crash; a torn last line is
+    ignored when the journal is read back. Successful results can then be
+    replayed instead of being generated again.
+    """
+
+    def __init__(self, path: Path, resume: bool = False):
+        """
+        Open the journal
+
+        Args:
+            path: Location of the journal file
+            resume: Load and append to an existing journal instead of
+                starting a new one
+        """
+        self.path = Path(path)
+        self.completed: Dict[Tuple[str, Optional[str], str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        torn = self._load() if resume else False
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if torn:
+            # keep the next record off the unterminated line
+            self._file.write("\n")
+
+    def _load(self) -> bool:
+        """
+        Load the successful results of an existing journal
+
+        Returns:
+            True if the journal ends in an unterminated line
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Ignoring unreadable progress journal {self.path}: {str(e)}")
+            return False
+
+        for number, line in enumerate(lines, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # the last line is torn if the previous run died mid-write
+                logger.warning(f"Skipping unreadable line {number} of progress journal {self.path}")
+                continue
+            # failed results are generated again
+            if record.get("version") == JOURNAL_VERSION and not record["error"]:
+                self.completed[(record["file_path"], record["class_name"], record["function_name"])] = record
+        return bool(lines) and not lines[-1].endswith("\n")
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def replay(self, function_info: Mapping[str, Any]) -> Optional[TestGenerationResult]:
+        """
+        Return the journaled result of a function completed by an earlier run
+
+        Args:
+            function_info: Function information dictionary
+
+        Returns:
+            TestGenerationResult marked as cached, or None if the function
+            has no successful result in the journal or was edited since
+        """
+        record = self.completed.get(_function_key(function_info))
+        if record is None or not _same_version(record, function_info):
+            return None
+        return TestGenerationResult(
+            function_info=function_info,
+            test_code=record["test_code"],
+            cached=True,
+            attempts=record["attempts"]
+        )
+
+    def record(self, result: TestGenerationResult):
+        """
+        Append a completed result and flush it to the operating system
+
+        Safe to call from generation worker threads.
+
+        Args:
+            result: Generation result, successful or not
+        """
+        file_path, class_name, function_name = _function_key(result.function_info)
+        line = json.dumps({
+            "version": JOURNAL_VERSION,
+            "file_path": file_path,
+            "class_name": class_name,
+            "function_name": function_name,
+            "fingerprint": result.function_info.get("fingerprint"),
+            "line_number": result.function_info.get("line_number"),
+            "test_code": result.test_code,
+            "error": result.error,
+            "attempts": result.attempts,
+            "prompt_tokens": result.prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+        }, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        """Flush the journal to disk and close it"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self) -> "ProgressJournal":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
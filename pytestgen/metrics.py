@@ -0,0 +1,129 @@
+"""
+Run metrics for PyTest-Gen
+"""
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+# Percentiles reported for every histogram
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile of a list of values
+
+    Args:
+        values: Observed values (need not be sorted)
+        q: Percentile between 0 and 100
+
+    Returns:
+        The smallest value that at least ``q`` percent of values are less than or equal to
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Metrics:
+    """
+    Thread-safe collector of stage timings, histograms and counters
+
+    Stage times are summed over every thread that entered the stage, so
+    stages running concurrently can add up to more than the total wall time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.histograms: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a block of work as part of a named stage
+
+        Args:
+            name: Stage name, e.g. ``walk`` or ``write``
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            with self._lock:
+                stage = self.stages.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+                stage["wall_seconds"] += wall
+                stage["cpu_seconds"] += cpu
+                stage["calls"] += 1
+
+    def observe(self, name: str, value: float):
+        """
+        Record one value of a histogram
+
+        Args:
+            name: Histogram name, e.g. ``request_latency_seconds``
+            value: Observed value
+        """
+        with self._lock:
+            self.histograms.setdefault(name, []).append(value)
+
+    def count(self, name: str, amount: int = 1):
+        """
+        Increase a counter
+
+        Args:
+            name: Counter name, e.g. ``bytes_written``
+            amount: Amount to add
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize everything recorded so far
+
+        Returns:
+            Dictionary with ``stages``, ``histograms`` (count, mean, max and
+            percentiles), ``counters``, ``cache_hit_rate`` and ``dedup_ratio``
+        """
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+            histograms = {name: list(values) for name, values in self.histograms.items()}
+            counters = dict(self.counters)
+
+        summary: Dict[str, Any] = {"stages": stages, "histograms": {}, "counters": counters}
+        for name, values in histograms.items():
+            summary["histograms"][name] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "max": max(values),
+                **{f"p{q}": percentile(values, q) for q in PERCENTILES},
+            }
+        lookups = counters.get("cache_hits", 0) + counters.get("cache_misses", 0)
+        summary["cache_hit_rate"] = counters.get("cache_hits", 0) / lookups if lookups else None
+        deduplicated = counters.get("functions_deduplicated", 0)
+        functions = counters.get("functions_unique", 0) + deduplicated
+        summary["dedup_ratio"] = deduplicated / functions if functions else None
+        return summary
+
+    def write_json(self, path: Path):
+        """
+        Write the summary to a JSON file
+
+        Args:
+            path: Destination file
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2, sort_keys=True)
+            f.write("\n")
@@ -0,0 +1,142 @@
+"""
+Module context extraction for PyTest-Gen prompts
+"""
+
+import ast
+import logging
+import os
+from functools import lru_cache
+from typing import List, Union
+
+logger = logging.getLogger(__name__)
+
+# Constants whose source is longer than this are shown as ``NAME = ...``
+MAX_CONSTANT_CHARS = 120
+
+
+def _header(node: Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef], lines: List[str]) -> List[str]:
+    """
+    Source lines of a definition up to its body, decorators included
+
+    Args:
+        node: Function or class definition
+        lines: Lines of the module source
+
+    Returns:
+        Header lines with their original indentation
+    """
+    start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+    body_start = node.body[0].lineno
+    if body_start == node.lineno:
+        # one-line definition such as ``def f(): return 1``
+        header = lines[start - 1:node.lineno]
+        header[-1] = header[-1][:node.body[0].col_offset].rstrip()
+        return header
+    return lines[start - 1:body_start - 1]
+
+
+def _stub(node: Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef], lines: List[str]) -> List[str]:
+    """
+    Render a definition as its header and first docstring line, bodies elided
+
+    Methods of a class are rendered as stubs as well.
+
+    Args:
+        node: Function or class definition
+        lines: Lines of the module source
+
+    Returns:
+        Stub lines
+    """
+    stub = _header(node, lines)
+    indent = " " * (node.col_offset + 4)
+    docstring = ast.get_docstring(node)
+    if docstring:
+        stub.append(f'{indent}"""{docstring.splitlines()[0]}"""')
+
+    members = []
+    if isinstance(node, ast.ClassDef):
+        for child in node.body:
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                members.extend(_stub(child, lines))
+            elif isinstance(child, (ast.Assign, ast.AnnAssign)):
+                members.extend(_assignment(child, lines))
+    if not members and not docstring:
+        members.append(f"{indent}...")
+    stub.extend(members)
+    return stub
+
+
+def _assignment(node: Union[ast.Assign, ast.AnnAssign], lines: List[str]) -> List[str]:
+    """
+    Render an assignment, eliding long values
+
+    Args:
+        node: Assignment statement
+        lines: Lines of the module source
+
+    Returns:
+        Source lines of the assignment, or a ``NAME = ...`` line
+    """
+    source = lines[node.lineno - 1:node.end_lineno]
+    if sum(len(line) for line in source) <= MAX_CONSTANT_CHARS:
+        return source
+    target = node.targets[0] if isinstance(node, ast.Assign) else node.target
+    name = lines[target.lineno - 1][target.col_offset:target.end_col_offset]
+    return [" " * node.col_offset + f"{name} = ..."]
+
+
+@lru_cache(maxsize=64)
+def _module_context(file_path: str, mtime_ns: int, size: int) -> str:
+    """
+    Summarize a module's imports, constants, classes and functions
+
+    Cached per file version, so each module is parsed once however many
+    of its functions are sent for generation.
+
+    Args:
+        file_path: Path to the Python file
+        mtime_ns: Modification time, part of the cache key
+        size: File size, part of the cache key
+
+    Returns:
+        Outline of the module as Python source with bodies elided
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    lines = content.splitlines()
+
+    outline = []
+    for node in ast.parse(content).body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            outline.extend(lines[node.lineno - 1:node.end_lineno])
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            outline.extend(_assignment(node, lines))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if outline and outline[-1]:
+                outline.append("")
+            outline.extend(_stub(node, lines))
+    return "\n".join(outline).strip()
+
+
+def module_context(file_path: str) -> str:
+    """
+    Outline of the module a function is defined in
+
+    The outline keeps imports, module-level constants and the signatures
+    and first docstring lines of classes, methods and functions, in source
+    order. It is identical for every function of a module, so it can form
+    part of a shared prompt prefix.
+
+    Args:
+        file_path: Path to the Python file
+
+    Returns:
+        Module outline, or an empty string if the file cannot be read or parsed
+    """
+    try:
+        st = os.stat(file_path)
+        return _module_context(file_path, st.st_mtime_ns, st.st_size)
+    except (OSError, SyntaxError, UnicodeDecodeError, ValueError) as e:
+        logger.warning(f"Could not extract module context from {file_path}: {str(e)}")
+        return ""
@@ -0,0 +1,309 @@
+"""
+Rate-limit-aware request scheduling for PyTest-Gen
+"""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+
+class RetriesExhaustedError(Exception):
+    """
+    Raised when a request still fails after all retries
+
+    The message is that of the last underlying error.
+    """
+
+    def __init__(self, error: Exception, retries: int):
+        super().__init__(str(error))
+        self.error = error
+        self.retries = retries
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at a per-minute rate
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket, initially full
+
+        Args:
+            per_minute: Refill rate in units per minute
+            capacity: Maximum burst size (default: one minute's worth)
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0):
+        """
+        Block until ``amount`` units are available and take them
+
+        Requests larger than the capacity wait for a full bucket instead of
+        blocking forever.
+
+        Args:
+            amount: Number of units to take
+        """
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit that halves when throttled and recovers additively
+    """
+
+    def __init__(self, max_limit: int):
+        """
+        Initialize the limiter
+
+        Args:
+            max_limit: Upper bound on concurrent requests
+        """
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Block until a request slot is free under the current limit"""
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+
+    def release(self):
+        """Return a request slot"""
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        """Halve the limit after a rate-limit response"""
+        with self._condition:
+            new_limit = max(1, self.limit // 2)
+            if new_limit < self.limit:
+                logger.info(f"Throttled: reducing concurrency from {self.limit} to {new_limit}")
+            self.limit = new_limit
+            self._successes = 0
+
+    def on_success(self):
+        """Grow the limit by one after a full window of successful requests"""
+        with self._condition:
+            if self.limit >= self.max_limit:
+                return
+            self._successes += 1
+            if self._successes >= self.limit:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Check if a request error is transient
+
+    Args:
+        error: Exception raised by the request
+
+    Returns:
+        True for rate limits, timeouts, connection errors and 5xx responses
+    """
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+def is_throttle(error: Exception) -> bool:
+    """
+    Check if a request error signals that the client is sending too fast
+
+    Args:
+        error: Exception raised by the request
+
+    Returns:
+        True for HTTP 429 responses
+    """
+    return isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+def is_too_large(error: Exception) -> bool:
+    """
+    Check if a request was rejected because it is too long
+
+    Args:
+        error: Exception raised by the request
+
+    Returns:
+        True for HTTP 413 responses and requests over the model's context length
+    """
+    if getattr(error, "status_code", None) == 413:
+        return True
+    if isinstance(error, openai.BadRequestError):
+        return getattr(error, "code", None) == "context_length_exceeded" or "context length" in str(error).lower()
+    return False
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read the server-requested delay from a failed response
+
+    Args:
+        error: Exception raised by the request
+
+    Returns:
+        Delay in seconds from ``retry-after-ms`` or ``retry-after``, or None
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter
+    """
+
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 60.0):
+        """
+        Initialize the policy
+
+        Args:
+            max_retries: Maximum number of retries per request
+            base_delay: Delay ceiling in seconds for the first retry
+            max_delay: Upper bound on any single delay
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Compute the delay before a retry
+
+        Args:
+            attempt: Zero-based number of the retry
+            retry_after: Delay requested by the server, honored when present
+
+        Returns:
+            Delay in seconds
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class RequestScheduler:
+    """
+    Run requests within RPM/TPM budgets, retrying transient failures
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 1,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            max_concurrency: Upper bound on concurrent requests
+            requests_per_minute: Request budget (None for unlimited)
+            tokens_per_minute: Token budget (None for unlimited)
+            retry_policy: Backoff policy (default: ``RetryPolicy()``)
+        """
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    def call(self, request: Callable[[], Any], estimated_tokens: int = 0) -> Tuple[Any, int]:
+        """
+        Run a request, waiting for budget and retrying transient errors
+
+        Args:
+            request: Zero-argument callable performing the request
+            estimated_tokens: Tokens the request is expected to consume
+
+        Returns:
+            Tuple of (request result, number of retries needed)
+
+        Raises:
+            RetriesExhaustedError: If the request still fails after retrying
+            Exception: Any non-retryable error, immediately
+        """
+        attempt = 0
+        while True:
+            if self.requests is not None:
+                self.requests.acquire(1)
+            if self.tokens is not None and estimated_tokens:
+                self.tokens.acquire(estimated_tokens)
+
+            self.concurrency.acquire()
+            try:
+                result = request()
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                if attempt >= self.retry_policy.max_retries:
+                    if attempt == 0:
+                        raise
+                    raise RetriesExhaustedError(e, attempt) from e
+                if is_throttle(e):
+                    self.concurrency.on_throttle()
+                delay = self.retry_policy.delay(attempt, retry_after_seconds(e))
+                logger.info(f"Retrying in {delay:.1f}s after error: {str(e)}")
+            else:
+                self.concurrency.on_success()
+                return result, attempt
+            finally:
+                self.concurrency.release()
+
+            time.sleep(delay)
+            attempt += 1
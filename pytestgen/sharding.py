@@ -0,0 +1,236 @@
+"""
+Deterministic sharding of generation work and merging of shard results
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Tuple
+
+from .function_info import FunctionInfo
+from .test_generator import TestGenerationResult
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_VERSION = 1
+SHARD_DIR = Path(".pytestgen") / "shards"
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a ``--shard`` specification
+
+    Args:
+        spec: ``i/N`` with ``1 <= i <= N``, e.g. ``2/8``
+
+    Returns:
+        Tuple of (shard index, shard count)
+
+    Raises:
+        ValueError: If the specification is malformed or out of range
+    """
+    index, sep, count = spec.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got '{spec}'") from None
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard index must be between 1 and the shard count, got '{spec}'")
+    return index, count
+
+
+def default_bundle_path(project_dir: Path, index: int, count: int) -> Path:
+    """
+    Return the default location of a shard's results bundle
+
+    Args:
+        project_dir: Path to the project directory
+        index: Shard index
+        count: Shard count
+
+    Returns:
+        Path to ``<project_dir>/.pytestgen/shards/shard-<i>-of-<N>.json``
+    """
+    return Path(project_dir) / SHARD_DIR / f"shard-{index}-of-{count}.json"
+
+
+def _relative_path(file_path: str, project_dir: Path) -> str:
+    """Project-relative POSIX path, so keys agree between checkouts in different directories"""
+    try:
+        return Path(os.path.abspath(file_path)).relative_to(Path(project_dir).resolve()).as_posix()
+    except ValueError:
+        return Path(file_path).as_posix()
+
+
+def shard_key(function_info: Mapping[str, Any], project_dir: Path) -> str:
+    """
+    Stable identity of a function: its project-relative path and qualified name
+
+    Args:
+        function_info: Function information dictionary
+        project_dir: Project root the path is made relative to
+
+    Returns:
+        Key such as ``pkg/mod.py:Class.method``
+    """
+    class_name = function_info.get("class_name")
+    name = f"{class_name}.{function_info['function_name']}" if class_name else function_info["function_name"]
+    return f"{_relative_path(function_info['file_path'], project_dir)}:{name}"
+
+
+def shard_of(function_info: Mapping[str, Any], count: int, project_dir: Path) -> int:
+    """
+    Return the shard a function belongs to
+
+    The shard is derived from a hash of ``shard_key``, not from Python's
+    randomized ``hash``, so every machine assigns a function to the same
+    shard no matter which files it scanned or in which order.
+
+    Args:
+        function_info: Function information dictionary
+        count: Number of shards
+        project_dir: Project root
+
+    Returns:
+        Shard index from 1 to ``count``
+    """
+    digest = hashlib.blake2b(shard_key(function_info, project_dir).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+
+def in_shard(
+    functions: Iterable[Mapping[str, Any]], index: int, count: int, project_dir: Path
+) -> Iterator[Mapping[str, Any]]:
+    """
+    Keep the functions of one shard
+
+    Args:
+        functions: Iterable of function information dictionaries
+        index: Shard to keep
+        count: Number of shards
+        project_dir: Project root
+
+    Yields:
+        Functions assigned to shard ``index``
+    """
+    for function_info in functions:
+        if shard_of(function_info, count, project_dir) == index:
+            yield function_info
+
+
+def write_bundle(
+    path: Path, results: Iterable[TestGenerationResult], index: int, count: int, project_dir: Path
+) -> Iterator[TestGenerationResult]:
+    """
+    Collect a shard's results into a portable bundle
+
+    Paths in the bundle are relative to the project, so it can be merged on
+    another machine. The bundle is written atomically once ``results`` is
+    exhausted.
+
+    Args:
+        path: Location of the bundle file
+        results: Generation results of the shard
+        index: Shard index
+        count: Shard count
+        project_dir: Project root
+
+    Yields:
+        Each result, after it has been added to the bundle
+    """
+    records = []
+    for result in results:
+        # docstrings are read from the source again when needed
+        function = {key: result.function_info[key] for key in result.function_info if key != "docstring"}
+        function["file_path"] = _relative_path(function["file_path"], project_dir)
+        records.append({
+            "function": function,
+            "test_code": result.test_code,
+            "error": result.error,
+            "attempts": result.attempts,
+            "prompt_tokens": result.prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+        })
+        yield result
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": BUNDLE_VERSION, "shard": index, "shards": count, "results": records}, f)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def _read_bundle(path: Path) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            bundle = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"cannot read bundle {path}: {str(e)}") from e
+    if not isinstance(bundle, dict) or bundle.get("version") != BUNDLE_VERSION:
+        raise ValueError(f"{path} is not a version {BUNDLE_VERSION} results bundle")
+    return bundle
+
+
+def merge_bundles(paths: Iterable[Path], project_dir: Path) -> Tuple[List[TestGenerationResult], List[int]]:
+    """
+    Combine shard bundles into one deterministic list of results
+
+    Results are ordered by target module, source path and line, so the
+    merged test files do not depend on the order bundles are given in or
+    finished. A function, identified by ``shard_key`` and its line, found in
+    several bundles keeps its successful result from the lowest shard;
+    definitions sharing a qualified name in one file, such as a property
+    getter and its setter, are kept apart by their lines.
+
+    Args:
+        paths: Bundle files
+        project_dir: Project root the bundled paths are resolved against
+
+    Returns:
+        Tuple of (results, indices of shards with no bundle)
+
+    Raises:
+        ValueError: If a bundle is unreadable or bundles disagree on the shard count
+    """
+    bundles = sorted((_read_bundle(Path(path)) for path in paths), key=lambda bundle: bundle["shard"])
+    counts = {bundle["shards"] for bundle in bundles}
+    if len(counts) > 1:
+        raise ValueError(f"bundles come from different shard counts: {sorted(counts)}")
+
+    merged: Dict[Tuple[str, int], TestGenerationResult] = {}
+    for bundle in bundles:
+        for record in bundle["results"]:
+            function = dict(record["function"])
+            function["file_path"] = str(Path(project_dir) / function["file_path"])
+            result = TestGenerationResult(
+                function_info=FunctionInfo.from_dict(function),
+                test_code=record["test_code"],
+                error=record["error"],
+                cached=True,
+                attempts=record["attempts"],
+                prompt_tokens=record["prompt_tokens"],
+                completion_tokens=record["completion_tokens"],
+            )
+            key = (shard_key(result.function_info, project_dir), result.function_info["line_number"])
+            if key not in merged or (merged[key].error and not result.error):
+                merged[key] = result
+
+    results = sorted(merged.values(), key=lambda result: (
+        Path(result.function_info["file_path"]).stem,
+        result.function_info["file_path"],
+        result.function_info["line_number"],
+        shard_key(result.function_info, project_dir),
+    ))
+    missing = []
+    if counts:
+        present = {bundle["shard"] for bundle in bundles}
+        missing = [index for index in range(1, counts.pop() + 1) if index not in present]
+    return results, missing
@@ -0,0 +1,144 @@
+"""
+Incremental handling of streamed completions for PyTest-Gen
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional
+
+
+@dataclass
+class StreamedCompletion:
+    """
+    Text and statistics of a consumed completion stream
+    """
+    text: str
+    usage: Any = None
+    time_to_first_token: Optional[float] = None
+    cancelled: bool = False
+    # content chunks received, roughly the completion tokens generated
+    chunks: int = 0
+
+
+class CodeStream:
+    """
+    Assemble streamed completion text and detect when the code is complete
+
+    The code is complete once a fenced block that opens the response is
+    closed; anything the model writes after the closing fence is not
+    needed. Responses that do not open with a fence are complete only when
+    the stream ends.
+    """
+
+    def __init__(self, stop_at_fence: bool = True):
+        """
+        Initialize the parser
+
+        Args:
+            stop_at_fence: Report completion at the closing fence
+        """
+        self.stop_at_fence = stop_at_fence
+        self.parts: List[str] = []
+        self.done = False
+        self._end: Optional[int] = None
+        self._received = 0
+        # start offset and text of the line being received
+        self._line_start = 0
+        self._line = ""
+        self._lines_seen = 0
+        self._opened = False
+
+    def feed(self, delta: str) -> bool:
+        """
+        Add a piece of streamed text
+
+        Args:
+            delta: Text of one stream chunk
+
+        Returns:
+            True once the code is complete and the stream can be closed
+        """
+        if self.done or not delta:
+            return self.done
+        self.parts.append(delta)
+        self._received += len(delta)
+        if not self.stop_at_fence:
+            return False
+
+        *complete, self._line = (self._line + delta).split("\n")
+        for line in complete:
+            self._check_line(line, self._line_start + len(line))
+            self._line_start += len(line) + 1
+            if self.done:
+                return True
+        # a closing fence needs no trailing newline
+        self._check_fence(self._line, self._received)
+        return self.done
+
+    def _check_line(self, line: str, end: int):
+        if self._lines_seen == 0:
+            if line.strip():
+                self._lines_seen = 1
+                self._opened = line.strip().startswith("```")
+            return
+        self._lines_seen += 1
+        self._check_fence(line, end)
+
+    def _check_fence(self, line: str, end: int):
+        if self._opened and self._lines_seen and line.strip().startswith("```"):
+            self.done = True
+            self._end = end
+
+    @property
+    def text(self) -> str:
+        """Text received so far, up to the closing fence once it has arrived"""
+        return "".join(self.parts)[:self._end]
+
+
+def consume_stream(
+    stream: Iterable[Any],
+    max_tokens: int,
+    stop_at_fence: bool = True,
+    started: Optional[float] = None,
+) -> StreamedCompletion:
+    """
+    Read a chat completion stream until the code is complete
+
+    The stream is closed as soon as the closing fence arrives or more than
+    ``max_tokens`` content chunks have been received, so the server stops
+    generating output that would be thrown away.
+
+    Args:
+        stream: Stream returned by ``chat.completions.create(stream=True)``
+        max_tokens: Output budget, counted as content chunks
+        stop_at_fence: Stop at the closing fence of the code block
+        started: ``time.perf_counter()`` value the request was sent at
+
+    Returns:
+        StreamedCompletion object
+    """
+    started = time.perf_counter() if started is None else started
+    code = CodeStream(stop_at_fence=stop_at_fence)
+    result = StreamedCompletion(text="")
+    chunks = 0
+    try:
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                result.usage = chunk.usage
+            choices = getattr(chunk, "choices", None)
+            delta = choices[0].delta.content if choices else None
+            if not delta:
+                continue
+            if result.time_to_first_token is None:
+                result.time_to_first_token = time.perf_counter() - started
+            chunks += 1
+            if code.feed(delta) or chunks > max_tokens:
+                result.cancelled = True
+                break
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+    result.text = code.text
+    result.chunks = chunks
+    return result
@@ -2,14 +2,113 @@
 Test case generator using LLM for Python functions
 """
 
+import ast
 import logging
 import os
-from typing import Dict, Any, List
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 from openai import OpenAI
+from .cache import ResponseCache
+from .metrics import Metrics
+from .module_context import module_context
+from .rate_limit import RequestScheduler, RetriesExhaustedError, is_too_large
+from .streaming import StreamedCompletion, consume_stream
+from .tokens import completion_budget, estimate_tokens, truncate_to_tokens
+from .validation import TestValidator
+
+if TYPE_CHECKING:
+    from .journal import ProgressJournal
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+# Appended to the system prompt so that every request for a module shares one prefix
+MODULE_CONTEXT_PROMPT = """
+
+The functions to test are defined in the module `{module}`. Outline of the module:
+```python
+{context}
+```"""
+
+PROMPT_REQUIREMENTS = """Requirements:
+1. Write at least 3 test cases that cover different scenarios
+2. Use descriptive test names that indicate what's being tested
+3. Include assertions that verify the function's behavior
+4. Follow pytest best practices
+5. If the function has type hints, use appropriate test data types"""
+
+# Delimits the per-function sections of a packed completion
+PACK_MARKER = "# === pytestgen function {position}: {name} ==="
+PACK_MARKER_RE = re.compile(r"^# === pytestgen function (\d+): \S+ ===$")
+
+# Rough size of the fixed part of a packed prompt
+PACK_OVERHEAD_TOKENS = 150
+
+# Appended to the prompt when regenerating tests that failed validation
+REPAIR_PROMPT = """
+A previous answer for this function was rejected: {problem}
+Make sure the test code is valid Python and imports everything it uses.{import_hint}
+"""
+
+# Tells the model where the function under test is imported from
+IMPORT_PROMPT = "Import it in the tests with: `{import_line}`"
+
+# Annotations longer than this are shortened when compacting a signature
+MAX_ANNOTATION_TOKENS = 16
+
+@lru_cache(maxsize=1024)
+def module_import_path(file_path: str) -> str:
+    """
+    Dotted path a module is imported by
+
+    Parent directories are included as long as they are packages (contain
+    an ``__init__.py``), so ``src/pkg/mod.py`` is ``pkg.mod``.
+
+    Args:
+        file_path: Path to the module's source file
+
+    Returns:
+        Dotted module path
+    """
+    path = os.path.abspath(file_path)
+    directory, name = os.path.split(path)
+    parts = [] if name == "__init__.py" else [os.path.splitext(name)[0]]
+    while os.path.isfile(os.path.join(directory, "__init__.py")):
+        directory, package = os.path.split(directory)
+        parts.insert(0, package)
+        if not package:
+            break
+    return ".".join(parts)
+
+
+def _usage_count(usage: Any, name: str) -> Optional[int]:
+    """Read a token count from a response's usage block, if reported"""
+    value = getattr(usage, name, None)
+    return value if isinstance(value, int) else None
+
+def _cached_count(usage: Any) -> Optional[int]:
+    """Read the prompt tokens served from the provider's prompt cache, if reported"""
+    return _usage_count(getattr(usage, "prompt_tokens_details", None), "cached_tokens")
+
+def _add_count(first: Optional[int], second: Optional[int]) -> Optional[int]:
+    """Add two token counts, either of which may be unreported"""
+    if first is None or second is None:
+        return first if second is None else second
+    return first + second
+
+def _split_count(total: Optional[int], count: int) -> List[Optional[int]]:
+    """Split a token count over ``count`` results, remainder to the first"""
+    if total is None:
+        return [None] * count
+    share, remainder = divmod(total, count)
+    return [share + remainder] + [share] * (count - 1)
+
 @dataclass
 class TestGenerationResult:
     """
@@ -18,29 +117,111 @@ class TestGenerationResult:
     function_info: Dict[str, Any]
     test_code: str
     error: str = None
+    cached: bool = False
+    retries: int = 0
+    estimated_prompt_tokens: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    attempts: int = 1
+    # response cache entry the test code came from, dropped if the code is rejected
+    cache_key: Optional[str] = None
+
+@dataclass
+class Completion:
+    """
+    Completion text returned for one request
+    """
+    text: str
+    cached: bool = False
+    retries: int = 0
+    estimated_prompt_tokens: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cache_key: Optional[str] = None
 
 class TestGenerator:
     """
     Generate pytest test cases using LLM
     """
 
-    def __init__(self, api_key: str, model: str = "gpt-4o", output_dir: str = "output_tests"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o",
+        concurrency: int = 1,
+        timeout: Optional[float] = None,
+        cache: Optional[ResponseCache] = None,
+        pack_token_budget: int = 0,
+        scheduler: Optional[RequestScheduler] = None,
+        prompt_token_budget: int = 0,
+        max_output_tokens: int = 1000,
+        validator: Optional[TestValidator] = None,
+        max_attempts: int = 1,
+        metrics: Optional[Metrics] = None,
+        module_context_tokens: int = 0,
+        journal: Optional["ProgressJournal"] = None,
+        client: Optional[Any] = None,
+        stream: bool = False,
+    ):
         """
         Initialize the test generator
         
         Args:
             api_key: OpenAI API key
             model: LLM model to use
-            output_dir: Directory to write generated test files
+            concurrency: Maximum number of LLM requests in flight at once
+            timeout: Per-request timeout in seconds (None uses the client default)
+            cache: Response cache consulted before calling the API (None disables caching)
+            pack_token_budget: Prompt token budget for packing several functions
+                from the same file into one request (0 disables packing)
+            scheduler: Scheduler enforcing rate limits and retrying transient
+                errors (default: retries only, no rate limits)
+            prompt_token_budget: Prompt token budget per function; longer
+                docstrings and annotations are shortened to fit (0 disables compaction)
+            max_output_tokens: Upper bound on the completion tokens requested
+                per function; the actual limit is sized from its complexity
+            validator: Checks generated code; rejected code is regenerated
+                (None disables validation)
+            max_attempts: Generation attempts per function, including
+                regenerations after failed validation
+            metrics: Collector for request latencies, token usage and cache
+                hits (default: a private one)
+            module_context_tokens: Token budget for an outline of the function's
+                module, sent ahead of the per-function prompt (0 disables it)
+            journal: Progress journal that completed results are recorded in
+                and successful results of an earlier run are replayed from
+            client: OpenAI-compatible client requests are sent through, such
+                as a ``BackendPool`` (default: an OpenAI client for ``api_key``)
+            stream: Stream completions and close the stream once the code
+                block is complete or the output budget is used up
         """
         self.api_key = api_key
         self.model = model
-        self.output_dir = output_dir
-        self._setup_openai()
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.cache = cache
+        self.pack_token_budget = pack_token_budget
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=self.concurrency)
+        self.temperature = 0.7
+        self.max_tokens = max_output_tokens
+        self.prompt_token_budget = prompt_token_budget
+        self.validator = validator
+        self.max_attempts = max(1, max_attempts)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.module_context_tokens = module_context_tokens
+        self.journal = journal
+        self.stream = stream
+        # one rendering per module version, reused by all of its requests
+        self._rendered_system_prompt = lru_cache(maxsize=64)(self._render_system_prompt)
+        if client is not None:
+            self.client = client
+        else:
+            self._setup_openai()
 
     def _setup_openai(self):
         """Initialize OpenAI client"""
-        self.client = OpenAI(api_key=self.api_key)
+        # retries are handled by the request scheduler
+        self.client = OpenAI(api_key=self.api_key, max_retries=0)
 
     def _generate_prompt(self, function_info: Dict[str, Any]) -> str:
         """
@@ -52,86 +233,712 @@ class TestGenerator:
         Returns:
             Generated prompt string
         """
-        args_info = ", ".join([
-            f"{arg['name']}: {arg['annotation'] if arg['annotation'] else 'Any'}"
-            for arg in function_info["args"]
-        ])
+        prompt = self._prompt_template().format(signature=self._format_signature(function_info))
+        import_line = self._import_line(function_info)
+        if import_line:
+            prompt += IMPORT_PROMPT.format(import_line=import_line) + "\n"
+        return prompt
 
-        docstring = function_info["docstring"] or "No docstring available"
+    def _import_line(self, function_info: Dict[str, Any]) -> Optional[str]:
+        """
+        Import statement that makes the function (or its class) available to a test
+        
+        Args:
+            function_info: Dictionary containing function information
+        
+        Returns:
+            Import statement, or None if the function's file is unknown
+        """
+        file_path = function_info.get("file_path")
+        if not file_path:
+            return None
+        name = function_info.get("class_name") or function_info["function_name"]
+        return f"from {module_import_path(file_path)} import {name}"
 
+    def _prompt_template(self) -> str:
+        """
+        Build the single-function prompt with a ``{signature}`` placeholder
+        
+        Returns:
+            Prompt template string
+        """
         prompt = '''Write pytest test cases for the following Python function:
 
 Function signature:
-```python
-def {function_name}({args_info}):
-    """{docstring}"""
-```
+{signature}
 
-Requirements:
-1. Write at least 3 test cases that cover different scenarios
-2. Use descriptive test names that indicate what's being tested
-3. Include assertions that verify the function's behavior
-4. Follow pytest best practices
-5. If the function has type hints, use appropriate test data types
+{requirements}
 
 Return only the test code, without any additional text or explanations.
 '''.format(
+            signature="{signature}",
+            requirements=PROMPT_REQUIREMENTS
+        )
+
+        return prompt
+
+    def _signature_budget(self, function_info: Dict[str, Any]) -> Optional[int]:
+        """
+        Compute the token budget left for a function signature
+        
+        Args:
+            function_info: Dictionary containing function information
+        
+        Returns:
+            Tokens available to the signature block, or None without a prompt budget
+        """
+        if not self.prompt_token_budget:
+            return None
+        fixed = estimate_tokens(self._prompt_template().format(signature=""), self.model)
+        import_line = self._import_line(function_info)
+        if import_line:
+            fixed += estimate_tokens(IMPORT_PROMPT.format(import_line=import_line), self.model)
+        return max(1, self.prompt_token_budget - fixed)
+
+    def _format_signature(self, function_info: Dict[str, Any]) -> str:
+        """
+        Render a function signature and docstring as a code block
+        
+        With a ``prompt_token_budget``, the docstring and then overlong
+        annotations are shortened until the block fits the budget.
+        
+        Args:
+            function_info: Dictionary containing function information
+        
+        Returns:
+            Markdown code block with the signature
+        """
+        annotations = [arg["annotation"] or "Any" for arg in function_info["args"]]
+        docstring = function_info["docstring"] or "No docstring available"
+        block = self._render_signature(function_info, annotations, docstring)
+
+        budget = self._signature_budget(function_info)
+        if budget is None or estimate_tokens(block, self.model) <= budget:
+            return block
+
+        annotations_only = self._render_signature(function_info, annotations, "")
+        remaining = budget - estimate_tokens(annotations_only, self.model)
+        if remaining < 1:
+            annotations = [
+                truncate_to_tokens(annotation, MAX_ANNOTATION_TOKENS, self.model)
+                for annotation in annotations
+            ]
+            remaining = budget - estimate_tokens(self._render_signature(function_info, annotations, ""), self.model)
+        docstring = truncate_to_tokens(docstring, max(1, remaining), self.model)
+        logger.debug(f"Compacted prompt for {function_info['function_name']} to {budget} signature tokens")
+        return self._render_signature(function_info, annotations, docstring)
+
+    def _render_signature(self, function_info: Dict[str, Any], annotations: List[str], docstring: str) -> str:
+        """
+        Format the signature code block from its parts
+        
+        Args:
+            function_info: Dictionary containing function information
+            annotations: Annotation text per argument
+            docstring: Docstring text
+        
+        Returns:
+            Markdown code block with the signature
+        """
+        args_info = ", ".join(
+            f"{arg['name']}: {annotation}"
+            for arg, annotation in zip(function_info["args"], annotations)
+        )
+
+        return '''```python
+def {function_name}({args_info}):
+    """{docstring}"""
+```'''.format(
             function_name=function_info['function_name'],
             args_info=args_info,
             docstring=docstring
         )
 
-        return prompt
+    def _generate_pack_prompt(self, functions: List[Dict[str, Any]]) -> str:
+        """
+        Generate a single prompt covering several functions
+        
+        Args:
+            functions: Function information dictionaries from one module
+        
+        Returns:
+            Generated prompt string
+        """
+        sections = []
+        for position, function_info in enumerate(functions, 1):
+            import_line = self._import_line(function_info)
+            sections.append(
+                f"Function {position}: {function_info['function_name']}\n"
+                f"{self._format_signature(function_info)}"
+                + (f"\n{IMPORT_PROMPT.format(import_line=import_line)}" if import_line else "")
+            )
+
+        markers = "\n".join(
+            PACK_MARKER.format(position=position, name=function_info["function_name"])
+            for position, function_info in enumerate(functions, 1)
+        )
+
+        return '''Write pytest test cases for each of the following Python functions:
+
+{sections}
+
+{requirements}
+
+Answer with one section per function, in order. Start each section with its
+marker line, exactly as written below, followed by the test code for that
+function only:
+{markers}
+
+Return only the marker lines and test code, without any additional text or explanations.
+'''.format(
+            sections="\n\n".join(sections),
+            requirements=PROMPT_REQUIREMENTS,
+            markers=markers
+        )
 
-    def generate_test(self, function_info: Dict[str, Any]) -> TestGenerationResult:
+    def _split_pack_response(self, raw: str, count: int) -> Optional[List[str]]:
         """
-        Generate test cases for a function
+        Split a packed completion into per-function test code
+        
+        Args:
+            raw: Completion text returned for a packed prompt
+            count: Number of functions in the pack
+        
+        Code before the first marker, typically imports shared by all
+        sections, is prepended to every section.
+        
+        Returns:
+            Test code per function in pack order, or None if the response
+            does not contain exactly one non-empty section per function
+        """
+        preamble: List[str] = []
+        sections: Dict[int, List[str]] = {}
+        current = None
+        for line in raw.splitlines():
+            match = PACK_MARKER_RE.match(line.strip())
+            if match:
+                current = int(match.group(1))
+                if current in sections:
+                    return None
+                sections[current] = []
+            elif not line.strip().startswith("```"):
+                (preamble if current is None else sections[current]).append(line)
+
+        if sorted(sections) != list(range(1, count + 1)):
+            return None
+        codes = ["\n".join(sections[position]).strip() for position in range(1, count + 1)]
+        if not all(codes):
+            return None
+        shared = "\n".join(preamble).strip()
+        if shared:
+            try:
+                ast.parse(shared)
+            except SyntaxError:
+                # prose ahead of the first marker, not code
+                return codes
+            codes = [f"{shared}\n\n{code}" for code in codes]
+        return codes
+
+    def _extract_code(self, raw: str) -> str:
+        """
+        Strip markdown code fences from a completion
+
+        Args:
+            raw: Completion text returned by the model
+
+        Returns:
+            Test code without surrounding fences
+        """
+        if raw.startswith("```"):
+            lines = raw.splitlines()
+            # drop opening fence
+            if lines and lines[0].startswith("```"):
+                lines = lines[1:]
+            # drop closing fence
+            if lines and lines[-1].strip().startswith("```"):
+                lines = lines[:-1]
+            return "\n".join(lines).strip()
+        return raw.strip()
+
+    def _system_prompt(self, file_path: Optional[str]) -> Tuple[str, int]:
+        """
+        Return the system prompt for requests about functions of one module
+        
+        Renderings are cached per file version, so a module edited while
+        ``watch`` runs gets a fresh outline.
+        
+        Args:
+            file_path: Path of the module, if known
+        
+        Returns:
+            System prompt and the estimated token count of the module outline
+        """
+        if not self.module_context_tokens or not file_path:
+            return SYSTEM_PROMPT, 0
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return SYSTEM_PROMPT, 0
+        return self._rendered_system_prompt(file_path, st.st_mtime_ns, st.st_size)
+
+    def _render_system_prompt(self, file_path: str, mtime_ns: int, size: int) -> Tuple[str, int]:
+        """
+        Build the system prompt for requests about functions of one module
+        
+        With a ``module_context_tokens`` budget, the outline of the module is
+        appended. The result is byte-identical for every function of the
+        module, so the provider can serve it from its prompt cache.
+        
+        Args:
+            file_path: Path of the module
+            mtime_ns: Modification time, part of the cache key
+            size: File size, part of the cache key
+        
+        Returns:
+            System prompt and the estimated token count of the module outline
+        """
+        context = module_context(file_path)
+        if not context:
+            return SYSTEM_PROMPT, 0
+        section = MODULE_CONTEXT_PROMPT.format(
+            module=module_import_path(file_path),
+            context=truncate_to_tokens(context, self.module_context_tokens, self.model)
+        )
+        return SYSTEM_PROMPT + section, estimate_tokens(section, self.model)
+
+    def _build_messages(self, prompt: str, file_path: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Wrap a user prompt in the chat messages sent to the model
+        
+        The shared system prompt (and module outline) comes first and the
+        per-function prompt last, so that requests for one module share the
+        longest possible prefix.
+        
+        Args:
+            prompt: User prompt
+            file_path: Path of the module the prompt is about, if known
+        
+        Returns:
+            List of chat messages
+        """
+        return [
+            {"role": "system", "content": self._system_prompt(file_path)[0]},
+            {"role": "user", "content": prompt}
+        ]
+
+    def build_request(self, function_info: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the chat completion request body for a function
+        
+        Used by the offline batch mode, which submits requests instead of
+        sending them directly.
         
         Args:
             function_info: Dictionary containing function information
         
         Returns:
-            TestGenerationResult object
+            Request body with model, messages, temperature and max_tokens
+        """
+        return {
+            "model": self.model,
+            "messages": self._build_messages(self._generate_prompt(function_info), function_info.get("file_path")),
+            "temperature": self.temperature,
+            "max_tokens": completion_budget(function_info, self.max_tokens),
+        }
+
+    def estimate_request_tokens(self, function_info: Dict[str, Any]) -> int:
+        """
+        Estimate the tokens generating tests for a function will use
+
+        Args:
+            function_info: Dictionary containing function information
+
+        Returns:
+            Estimated prompt tokens plus the completion token limit
+        """
+        file_path = function_info.get("file_path")
+        prompt_tokens = estimate_tokens(self._generate_prompt(function_info), self.model) + self._system_prompt(file_path)[1]
+        return prompt_tokens + completion_budget(function_info, self.max_tokens)
+
+    def _complete(
+        self, prompt: str, max_tokens: int, file_path: Optional[str] = None, single_block: bool = False
+    ) -> Completion:
+        """
+        Get a completion for a prompt, from the cache if possible
+        
+        Args:
+            prompt: User prompt
+            max_tokens: Completion token limit
+            file_path: Path of the module the prompt is about, if known
+            single_block: The answer is one code block, so a streamed
+                completion can stop at its closing fence
+        
+        Returns:
+            Completion object
         """
+        messages = self._build_messages(prompt, file_path)
+        prompt_tokens = estimate_tokens(prompt, self.model) + self._system_prompt(file_path)[1]
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key(self.model, self.temperature, max_tokens, messages)
+            raw = self.cache.get(cache_key)
+            if raw is not None:
+                self.metrics.count("cache_hits")
+                return Completion(text=raw, cached=True, estimated_prompt_tokens=prompt_tokens, cache_key=cache_key)
+            self.metrics.count("cache_misses")
+
+        request_options = {}
+        if self.timeout is not None:
+            request_options["timeout"] = self.timeout
+
+        started = time.perf_counter()
         try:
-            prompt = self._generate_prompt(function_info)
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
+            response, retries = self.scheduler.call(
+                lambda: self._request(messages, max_tokens, request_options, single_block),
+                estimated_tokens=prompt_tokens + max_tokens
             )
+        except Exception:
+            self.metrics.count("request_errors")
+            raise
+        finally:
+            # includes rate-limit waits and retries
+            self.metrics.observe("request_latency_seconds", time.perf_counter() - started)
+        self.metrics.count("requests")
+        self.metrics.count("retries", retries)
 
+        if isinstance(response, StreamedCompletion):
+            raw, usage = response.text, response.usage
+        else:
             raw = response.choices[0].message.content if response.choices else ""
-            # strip markdown code fences if present
-            if raw.startswith("```"):
-                lines = raw.splitlines()
-                # drop opening fence
-                if lines and lines[0].startswith("```"):
-                    lines = lines[1:]
-                # drop closing fence
-                if lines and lines[-1].strip().startswith("```"):
-                    lines = lines[:-1]
-                test_code = "\n".join(lines).strip()
-            else:
-                test_code = raw.strip()
-            return TestGenerationResult(function_info=function_info, test_code=test_code)
+            usage = getattr(response, "usage", None)
+        if cache_key is not None and raw:
+            self.cache.set(cache_key, raw, model=self.model)
+        completion = Completion(
+            text=raw,
+            retries=retries,
+            estimated_prompt_tokens=prompt_tokens,
+            prompt_tokens=_usage_count(usage, "prompt_tokens"),
+            completion_tokens=_usage_count(usage, "completion_tokens"),
+            cache_key=cache_key
+        )
+        if isinstance(response, StreamedCompletion) and usage is None:
+            # a stream closed at the fence never receives its usage chunk
+            completion.prompt_tokens = prompt_tokens
+            completion.completion_tokens = max(response.chunks, estimate_tokens(raw, self.model))
+            self.metrics.count("usage_estimated")
+        self.metrics.count("estimated_prompt_tokens", prompt_tokens)
+        if completion.prompt_tokens is not None:
+            self.metrics.count("prompt_tokens", completion.prompt_tokens)
+        if completion.completion_tokens is not None:
+            self.metrics.count("completion_tokens", completion.completion_tokens)
+        cached_tokens = _cached_count(usage)
+        if cached_tokens is not None:
+            self.metrics.count("cached_prompt_tokens", cached_tokens)
+        return completion
+
+    def _request(
+        self, messages: List[Dict[str, str]], max_tokens: int, request_options: Dict[str, Any], single_block: bool
+    ) -> Any:
+        """
+        Send one chat completion request
+        
+        Runs inside the scheduler, so errors raised while a stream is read
+        are retried like any other request error.
+        
+        Args:
+            messages: Chat messages
+            max_tokens: Completion token limit
+            request_options: Extra options such as ``timeout``
+            single_block: Stop a streamed completion at its closing fence
+        
+        Returns:
+            The API response, or a StreamedCompletion when streaming
+        """
+        if not self.stream:
+            return self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=max_tokens,
+                **request_options
+            )
+
+        started = time.perf_counter()
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            # usage arrives in a last chunk, unless the stream is closed early
+            extra_body={"stream_options": {"include_usage": True}},
+            **request_options
+        )
+        streamed = consume_stream(stream, max_tokens, stop_at_fence=single_block, started=started)
+        if streamed.time_to_first_token is not None:
+            self.metrics.observe("time_to_first_token_seconds", streamed.time_to_first_token)
+        if streamed.cancelled:
+            self.metrics.count("streams_cancelled")
+        return streamed
+
+    def generate_tests_for_pack(self, functions: List[Dict[str, Any]]) -> List[TestGenerationResult]:
+        """
+        Generate and validate test cases for several functions
+        
+        Runs in the generation worker, so results are validated while other
+        requests are still in flight. Results rejected by the validator are
+        regenerated one function at a time, with the problem added to the
+        prompt, up to ``max_attempts`` attempts in total.
+        
+        With a ``journal``, functions completed by an earlier run are replayed
+        from it without a request, and every new result is recorded.
+        
+        Args:
+            functions: Function information dictionaries from one module
+        
+        Returns:
+            List of TestGenerationResult objects in the order of ``functions``
+        """
+        if self.journal is None:
+            return [self._validate(result) for result in self._generate_pack(functions)]
+
+        replayed = [self.journal.replay(function_info) for function_info in functions]
+        pending = [function_info for function_info, result in zip(functions, replayed) if result is None]
+        self.metrics.count("journal_replays", len(functions) - len(pending))
+        generated = iter([self._validate(result) for result in self._generate_pack(pending)] if pending else [])
+        results = []
+        for result in replayed:
+            if result is None:
+                result = next(generated)
+                self.journal.record(result)
+            results.append(result)
+        return results
+
+    def _validate(self, result: TestGenerationResult) -> TestGenerationResult:
+        """
+        Validate a result, regenerating it until it passes or attempts run out
+        
+        Args:
+            result: Result of the first attempt
+        
+        Returns:
+            Valid result, or a result carrying the last validation problem as its error
+        """
+        if self.validator is None or result.error:
+            return result
+
+        function_info = result.function_info
+        prompt_tokens, completion_tokens = result.prompt_tokens, result.completion_tokens
+        attempt = 1
+        while True:
+            with self.metrics.stage("validate"):
+                problem = self.validator.validate(result.test_code, function_info)
+            if problem is None:
+                break
+            # a rerun must not replay the rejected answer from the cache
+            self._uncache(result.cache_key)
+            if attempt >= self.max_attempts:
+                logger.warning(f"Discarding invalid tests for {function_info['function_name']}: {problem}")
+                result.error = f"generated tests failed validation: {problem}"
+                break
+            attempt += 1
+            self.metrics.count("regenerations")
+            logger.info(f"Regenerating tests for {function_info['function_name']} (attempt {attempt}): {problem}")
+            result = self.generate_test(function_info, problem=problem)
+            prompt_tokens = _add_count(prompt_tokens, result.prompt_tokens)
+            completion_tokens = _add_count(completion_tokens, result.completion_tokens)
+            if result.error:
+                break
+
+        result.attempts = attempt
+        result.prompt_tokens, result.completion_tokens = prompt_tokens, completion_tokens
+        return result
+
+    def _uncache(self, cache_key: Optional[str]):
+        """Drop a rejected completion from the response cache"""
+        if self.cache is not None and cache_key is not None:
+            self.cache.delete(cache_key)
+
+    def _generate_pack(self, functions: List[Dict[str, Any]]) -> List[TestGenerationResult]:
+        """
+        Generate test cases for several functions with one request
+        
+        Falls back to one request per function if the request is rejected
+        as too large or the response cannot be split into a section per
+        function. Other failures, such as retries exhausted while the
+        provider is throttling, give an error result for every function
+        instead of multiplying the requests.
+        
+        Args:
+            functions: Function information dictionaries from one module
+        
+        Returns:
+            List of TestGenerationResult objects in the order of ``functions``
+        """
+        if len(functions) == 1:
+            return [self.generate_test(functions[0])]
+
+        completion = None
+        try:
+            max_tokens = sum(completion_budget(function_info, self.max_tokens) for function_info in functions)
+            completion = self._complete(
+                self._generate_pack_prompt(functions), max_tokens, functions[0].get("file_path")
+            )
+            codes = self._split_pack_response(completion.text, len(functions))
+        except Exception as e:
+            if not is_too_large(e):
+                logger.error(f"Packed request for {len(functions)} functions failed: {str(e)}")
+                return [
+                    TestGenerationResult(
+                        function_info=function_info,
+                        test_code="",
+                        error=str(e),
+                        retries=e.retries if isinstance(e, RetriesExhaustedError) else 0
+                    )
+                    for function_info in functions
+                ]
+            logger.warning(f"Packed request for {len(functions)} functions was too large: {str(e)}")
+            codes = None
+
+        if codes is None:
+            if completion is not None:
+                self._uncache(completion.cache_key)
+            logger.info(f"Falling back to per-function requests for {len(functions)} functions")
+            return [self.generate_test(function_info) for function_info in functions]
+
+        # attribute the pack's usage evenly so that per-result totals add up
+        count = len(functions)
+        estimated = _split_count(completion.estimated_prompt_tokens, count)
+        prompt_tokens = _split_count(completion.prompt_tokens, count)
+        completion_tokens = _split_count(completion.completion_tokens, count)
+        return [
+            TestGenerationResult(
+                function_info=function_info,
+                test_code=code,
+                cached=completion.cached,
+                retries=completion.retries,
+                estimated_prompt_tokens=estimated[position],
+                prompt_tokens=prompt_tokens[position],
+                completion_tokens=completion_tokens[position],
+                cache_key=completion.cache_key
+            )
+            for position, (function_info, code) in enumerate(zip(functions, codes))
+        ]
+
+    def _iter_packs(self, functions: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Group consecutive functions from the same file within the token budget
+        
+        Args:
+            functions: Iterable of function information dictionaries
+        
+        Yields:
+            Lists of functions to be sent in one request
+        """
+        if not self.pack_token_budget:
+            for function_info in functions:
+                yield [function_info]
+            return
+
+        pack: List[Dict[str, Any]] = []
+        pack_tokens = PACK_OVERHEAD_TOKENS
+        for function_info in functions:
+            tokens = estimate_tokens(self._format_signature(function_info), self.model)
+            same_file = not pack or pack[0].get("file_path") == function_info.get("file_path")
+            if pack and (not same_file or pack_tokens + tokens > self.pack_token_budget):
+                yield pack
+                pack, pack_tokens = [], PACK_OVERHEAD_TOKENS
+            pack.append(function_info)
+            pack_tokens += tokens
+        if pack:
+            yield pack
+
+    def generate_test(self, function_info: Dict[str, Any], problem: Optional[str] = None) -> TestGenerationResult:
+        """
+        Generate test cases for a function
+        
+        Args:
+            function_info: Dictionary containing function information
+            problem: Why a previous answer was rejected, added to the prompt
+        
+        Returns:
+            TestGenerationResult object
+        """
+        prompt = self._generate_prompt(function_info)
+        if problem:
+            import_line = self._import_line(function_info)
+            prompt += REPAIR_PROMPT.format(
+                problem=problem,
+                import_hint=f" Import the function under test with `{import_line}`; do not guess another module." if import_line else ""
+            )
+        try:
+            completion = self._complete(
+                prompt,
+                completion_budget(function_info, self.max_tokens),
+                function_info.get("file_path"),
+                single_block=True
+            )
+            return TestGenerationResult(
+                function_info=function_info,
+                test_code=self._extract_code(completion.text),
+                cached=completion.cached,
+                retries=completion.retries,
+                estimated_prompt_tokens=completion.estimated_prompt_tokens,
+                prompt_tokens=completion.prompt_tokens,
+                completion_tokens=completion.completion_tokens,
+                cache_key=completion.cache_key
+            )
 
         except Exception as e:
             logger.error(f"Error generating tests for {function_info['function_name']}: {str(e)}")
             return TestGenerationResult(
                 function_info=function_info,
                 test_code="",
-                error=str(e)
+                error=str(e),
+                retries=e.retries if isinstance(e, RetriesExhaustedError) else 0
             )
 
+    def iter_tests_for_functions(self, functions: Iterable[Dict[str, Any]]) -> Iterator[TestGenerationResult]:
+        """
+        Generate tests for a stream of functions
+
+        ``functions`` is consumed lazily: at most ``2 * self.concurrency``
+        requests are queued or in flight at any time, and each result is
+        yielded, in input order, as soon as it and its predecessors are done.
+        With a ``pack_token_budget``, consecutive functions from the same file
+        share a request. Functions should arrive grouped by file, as discovery
+        yields them, so that requests sharing a module outline are sent
+        back to back while the provider's prompt cache is warm.
+
+        Args:
+            functions: Iterable of function information dictionaries
+
+        Yields:
+            TestGenerationResult objects
+        """
+        packs = self._iter_packs(functions)
+        if self.concurrency <= 1:
+            for pack in packs:
+                yield from self.generate_tests_for_pack(pack)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            in_flight = deque()
+            for pack in packs:
+                in_flight.append(executor.submit(self.generate_tests_for_pack, pack))
+                if len(in_flight) >= 2 * self.concurrency:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+
     def generate_tests_for_functions(self, functions: List[Dict[str, Any]]) -> List[TestGenerationResult]:
         """
         Generate tests for multiple functions
+
+        Requests are issued on a thread pool of ``self.concurrency`` workers.
+        Results are returned in the same order as ``functions``; writing
+        them is left to ``TestFileWriter``.
         
         Args:
             functions: List of function information dictionaries
@@ -139,16 +946,4 @@ Return only the test code, without any additional text or explanations.
         Returns:
             List of TestGenerationResult objects
         """
-        # ensure output directory exists
-        os.makedirs(self.output_dir, exist_ok=True)
-        results = []
-        for func_info in functions:
-            result = self.generate_test(func_info)
-            results.append(result)
-            # write test file
-            if result.test_code:
-                fname = f"test_{func_info['function_name']}.py"
-                path = os.path.join(self.output_dir, fname)
-                with open(path, 'w') as f:
-                    f.write(result.test_code)
-        return results
+        return list(self.iter_tests_for_functions(functions))
@@ -0,0 +1,335 @@
+"""
+Grouped, atomic writing of generated tests for PyTest-Gen
+"""
+
+import ast
+import logging
+import os
+import tempfile
+import textwrap
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .function_discovery import module_test_name
+from .metrics import Metrics
+from .test_generator import TestGenerationResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WriteOutcome:
+    """
+    What happened to one generation result
+    """
+    result: TestGenerationResult
+    test_file: Optional[Path] = None
+    added: int = 0
+    skipped: int = 0
+
+
+class TestNameIndex:
+    """
+    Names defined at the top level of a test file, and its import lines
+
+    Used to merge generated code into an existing file without defining a
+    test (or helper, fixture or class) twice. A test class that is already
+    defined is merged member by member: its new methods are collected in
+    ``class_additions`` and inserted into the existing class by
+    ``apply_class_additions``.
+    """
+
+    __test__ = False  # not a pytest test class
+
+    def __init__(self):
+        self.names: Set[str] = set()
+        self.imports: Set[str] = set()
+        self.class_members: Dict[str, Set[str]] = {}
+        # class name -> (member name, dedented source) to insert into the class
+        self.class_additions: Dict[str, List[Tuple[str, str]]] = {}
+        # qualified names of the definitions dropped by the last ``select_new``
+        self.dropped: List[str] = []
+
+    def add_source(self, source: str):
+        """
+        Index the top-level definitions and imports of a module
+
+        Args:
+            source: Python source text; unparseable text is ignored
+        """
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            return
+        lines = source.splitlines()
+        for node in tree.body:
+            name = _definition_name(node)
+            if name is not None:
+                self.names.add(name)
+                if isinstance(node, ast.ClassDef):
+                    self.class_members[name] = _member_names(node)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                self.imports.add(_node_source(lines, node))
+
+    def select_new(self, source: str) -> Tuple[List[str], int, int]:
+        """
+        Pick the top-level blocks of ``source`` not yet in the index
+
+        The selected blocks are added to the index. New members of a class
+        that is already defined are queued in ``class_additions``.
+
+        Args:
+            source: Generated test code
+
+        Returns:
+            Tuple of (new source blocks, number of new definitions, number of
+            duplicate definitions dropped); unparseable code is returned as
+            one block
+        """
+        self.dropped = []
+        try:
+            tree = ast.parse(source)
+        except SyntaxError as e:
+            logger.warning(f"Generated tests do not parse, writing them unmerged: {str(e)}")
+            return [source.strip()], 1, 0
+
+        lines = source.splitlines()
+        blocks: List[str] = []
+        added = skipped = 0
+        for node in tree.body:
+            text = _node_source(lines, node)
+            name = _definition_name(node)
+            if name is not None:
+                if name in self.class_members and isinstance(node, ast.ClassDef):
+                    merged, duplicates = self._merge_class(name, node, lines)
+                    added += merged
+                    skipped += duplicates
+                    continue
+                if name in self.names:
+                    self.dropped.append(name)
+                    skipped += 1
+                    continue
+                self.names.add(name)
+                if isinstance(node, ast.ClassDef):
+                    self.class_members[name] = _member_names(node)
+                added += 1
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                if text in self.imports:
+                    continue
+                self.imports.add(text)
+            blocks.append(text)
+        return blocks, added, skipped
+
+    def _merge_class(self, name: str, node: ast.ClassDef, lines: List[str]) -> Tuple[int, int]:
+        """
+        Queue the members of a generated class that its existing definition lacks
+
+        Args:
+            name: Class name
+            node: Generated class definition
+            lines: Lines of the generated source
+
+        Returns:
+            Tuple of (members queued, duplicate members dropped)
+        """
+        members = self.class_members[name]
+        added = skipped = 0
+        for member in node.body:
+            member_name = _definition_name(member)
+            if member_name is None:
+                continue
+            if member_name in members:
+                self.dropped.append(f"{name}.{member_name}")
+                skipped += 1
+                continue
+            members.add(member_name)
+            self.class_additions.setdefault(name, []).append((member_name, textwrap.dedent(_node_source(lines, member))))
+            added += 1
+        return added, skipped
+
+    def apply_class_additions(self, source: str) -> str:
+        """
+        Insert the queued class members at the end of their classes
+
+        Args:
+            source: Merged module source defining the classes
+
+        Returns:
+            Source with the members added
+        """
+        if not self.class_additions:
+            return source
+        try:
+            tree = ast.parse(source)
+        except SyntaxError as e:
+            names = [f"{cls}.{member}" for cls, members in self.class_additions.items() for member, _ in members]
+            logger.warning(f"Could not merge {', '.join(names)} into existing test classes: {str(e)}")
+            return source
+
+        lines = source.splitlines()
+        classes = [node for node in tree.body if isinstance(node, ast.ClassDef) and node.name in self.class_additions]
+        for node in sorted(classes, key=lambda n: n.end_lineno, reverse=True):
+            indent = " " * node.body[0].col_offset
+            members = [textwrap.indent(text, indent) for _, text in self.class_additions[node.name]]
+            lines[node.end_lineno:node.end_lineno] = ["\n" + "\n\n".join(members)]
+        return "\n".join(lines)
+
+
+def _member_names(node: ast.ClassDef) -> Set[str]:
+    return {name for name in map(_definition_name, node.body) if name is not None}
+
+
+def _definition_name(node: ast.stmt) -> Optional[str]:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return node.name
+    return None
+
+
+def _node_source(lines: List[str], node: ast.stmt) -> str:
+    """Source lines of a top-level statement, including its decorators"""
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return "\n".join(lines[start - 1:node.end_lineno]).rstrip()
+
+
+def target_test_file(output_dir: Path, result: TestGenerationResult, project_dir: Optional[Path] = None) -> Path:
+    """
+    Return the test file a result belongs in
+
+    Args:
+        output_dir: Directory holding generated test files
+        result: Generation result
+        project_dir: Project root the module's name is derived against
+
+    Returns:
+        Path to ``<output_dir>/test_<module>.py``, named by ``module_test_name``
+    """
+    module_name = module_test_name(result.function_info.get("file_path", "module.py"), project_dir)
+    return Path(output_dir) / f"test_{module_name}.py"
+
+
+class TestFileWriter:
+    """
+    Write generation results to one test file per source module
+
+    Results for the same module are buffered and written together, so each
+    file is read and replaced once per consecutive run of results instead
+    of being reopened for every function. Files are replaced atomically.
+    """
+
+    __test__ = False  # not a pytest test class
+
+    def __init__(
+        self,
+        output_dir: Path,
+        overwrite: bool = False,
+        metrics: Optional[Metrics] = None,
+        project_dir: Optional[Path] = None,
+    ):
+        """
+        Initialize the writer
+
+        Args:
+            output_dir: Directory holding generated test files
+            overwrite: Replace test files that existed before this run
+                instead of merging into them
+            metrics: Collector for write timings and byte counts (default: a private one)
+            project_dir: Project root test file names are derived against
+        """
+        self.output_dir = Path(output_dir)
+        self.overwrite = overwrite
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.project_dir = project_dir
+        self._written: Set[Path] = set()
+
+    def write(self, results: Iterable[TestGenerationResult]) -> Iterator[WriteOutcome]:
+        """
+        Write results as they arrive
+
+        A module's file is written when the next result belongs to another
+        module, or when ``results`` is exhausted.
+
+        Args:
+            results: Generation results, typically grouped by source file
+
+        Yields:
+            WriteOutcome per result, once its file has been written
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        pending: List[TestGenerationResult] = []
+        pending_file = None
+        for result in results:
+            if not result.error:
+                test_file = target_test_file(self.output_dir, result, self.project_dir)
+                if pending_file is not None and test_file != pending_file:
+                    yield from self._flush(pending_file, pending)
+                    pending = []
+                pending_file = test_file
+            # failed results keep their place among the module's outcomes
+            pending.append(result)
+        if pending:
+            yield from self._flush(pending_file, pending)
+
+    def _flush(self, test_file: Optional[Path], results: List[TestGenerationResult]) -> List[WriteOutcome]:
+        """
+        Merge a module's results into its test file and write it once
+
+        Args:
+            test_file: Target test file (None if every result failed)
+            results: Results for the module, in order
+
+        Returns:
+            WriteOutcome per result
+        """
+        if test_file is None:
+            return [WriteOutcome(result=result) for result in results]
+        with self.metrics.stage("write"):
+            return self._merge_and_write(test_file, results)
+
+    def _merge_and_write(self, test_file: Path, results: List[TestGenerationResult]) -> List[WriteOutcome]:
+        existing = ""
+        replace = self.overwrite and test_file not in self._written
+        if not replace and test_file.exists():
+            existing = test_file.read_text(encoding="utf-8")
+
+        index = TestNameIndex()
+        index.add_source(existing)
+        sections = [existing.rstrip()] if existing.strip() else []
+        outcomes = []
+        for result in results:
+            if result.error:
+                outcomes.append(WriteOutcome(result=result))
+                continue
+            blocks, added, skipped = index.select_new(result.test_code)
+            if index.dropped:
+                logger.warning(
+                    f"Dropping tests for {result.function_info.get('function_name')} already defined in "
+                    f"{test_file.name}: {', '.join(index.dropped)}"
+                )
+            if blocks:
+                sections.append("\n\n".join(blocks))
+            outcomes.append(WriteOutcome(result=result, test_file=test_file, added=added, skipped=skipped))
+
+        if replace or len(sections) > (1 if existing.strip() else 0) or index.class_additions:
+            merged = index.apply_class_additions("\n\n\n".join(sections))
+            content = (merged + "\n").encode("utf-8")
+            _atomic_write(test_file, content)
+            self.metrics.count("files_written")
+            self.metrics.count("bytes_written", len(content))
+        self._written.add(test_file)
+        return outcomes
+
+
+def _atomic_write(path: Path, content: bytes):
+    """Replace ``path`` with ``content`` via a temporary file in the same directory"""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
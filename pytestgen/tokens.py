@@ -0,0 +1,93 @@
+"""
+Token estimation and budgeting helpers for PyTest-Gen
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
+
+# Appended to text shortened by truncate_to_tokens
+TRUNCATION_MARKER = " [...]"
+
+# Completion budget: base + per decision point + per argument, see completion_budget
+COMPLETION_BASE_TOKENS = 300
+COMPLETION_TOKENS_PER_BRANCH = 100
+COMPLETION_TOKENS_PER_ARG = 50
+MIN_COMPLETION_TOKENS = 256
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: Optional[str]):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+    except (KeyError, ValueError):
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Estimate the number of tokens in a piece of text
+
+    Uses ``tiktoken`` when it is installed, otherwise assumes about four
+    characters per token.
+
+    Args:
+        text: Text to measure
+        model: Model whose tokenizer should be used, if known
+
+    Returns:
+        Approximate token count
+    """
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text: str, budget: int, model: Optional[str] = None) -> str:
+    """
+    Shorten text to fit a token budget
+
+    Args:
+        text: Text to shorten
+        budget: Maximum number of tokens to keep
+        model: Model whose tokenizer should be used, if known
+
+    Returns:
+        ``text`` unchanged if it fits, otherwise a prefix ending in ``TRUNCATION_MARKER``
+    """
+    if estimate_tokens(text, model) <= budget:
+        return text
+    budget = max(1, budget - estimate_tokens(TRUNCATION_MARKER, model))
+    # shrink proportionally, then trim until the estimate fits
+    keep = max(1, len(text) * budget // estimate_tokens(text, model))
+    while keep > 1 and estimate_tokens(text[:keep], model) > budget:
+        keep = keep * 9 // 10
+    return text[:keep].rstrip() + TRUNCATION_MARKER
+
+
+def completion_budget(function_info: Dict[str, Any], cap: int) -> int:
+    """
+    Size the completion token limit for a function from its complexity
+
+    Args:
+        function_info: Dictionary containing function information
+        cap: Upper bound on the returned limit
+
+    Returns:
+        ``max_tokens`` to request for the function
+    """
+    complexity = function_info.get("complexity") or 1
+    args = function_info.get("args") or []
+    budget = (
+        COMPLETION_BASE_TOKENS
+        + COMPLETION_TOKENS_PER_BRANCH * complexity
+        + COMPLETION_TOKENS_PER_ARG * len(args)
+    )
+    return max(min(MIN_COMPLETION_TOKENS, cap), min(budget, cap))
@@ -0,0 +1,111 @@
+"""
+Validation of generated test code for PyTest-Gen
+"""
+
+import ast
+import builtins
+import logging
+from typing import Any, Dict, Optional, Set
+
+try:
+    from pyflakes import checker as pyflakes_checker
+    from pyflakes import messages as pyflakes_messages
+except ImportError:  # optional: linting is skipped without pyflakes
+    pyflakes_checker = None
+    pyflakes_messages = None
+
+logger = logging.getLogger(__name__)
+
+# pyflakes findings that make a test module fail or silently lose tests
+LINT_ERRORS = (
+    "UndefinedName",
+    "UndefinedLocal",
+    "DuplicateArgument",
+    "RedefinedWhileUnused",
+    "ReturnOutsideFunction",
+    "YieldOutsideFunction",
+)
+
+
+def _bound_names(tree: ast.Module) -> Set[str]:
+    """Names bound anywhere in a module: imports, definitions, assignments and arguments"""
+    names = set(dir(builtins))
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+    return names
+
+
+class TestValidator:
+    """
+    Check generated test code before it is written
+    """
+
+    __test__ = False  # not a pytest test class
+
+    def __init__(self, lint: bool = False):
+        """
+        Initialize the validator
+
+        Args:
+            lint: Also run pyflakes, when installed, and reject code with
+                undefined names or redefined tests
+        """
+        self.lint = lint
+        if lint and pyflakes_checker is None:
+            logger.warning("pyflakes is not installed; skipping lint checks of generated tests")
+
+    def validate(self, code: str, function_info: Dict[str, Any]) -> Optional[str]:
+        """
+        Validate the test code generated for a function
+
+        Args:
+            code: Generated test code
+            function_info: Dictionary containing function information
+
+        Returns:
+            Description of the first problem found, or None if the code is valid
+        """
+        if not code.strip():
+            return "no test code was returned"
+        try:
+            tree = ast.parse(code)
+            compile(tree, "<generated test>", "exec")
+        except SyntaxError as e:
+            return f"syntax error on line {e.lineno}: {e.msg}"
+
+        target = function_info.get("class_name") or function_info["function_name"]
+        used = any(
+            isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id == target
+            for node in ast.walk(tree)
+        )
+        if used and target not in _bound_names(tree):
+            return f"'{target}' is used but never imported"
+
+        if self.lint and pyflakes_checker is not None:
+            return self._lint(tree)
+        return None
+
+    def _lint(self, tree: ast.Module) -> Optional[str]:
+        """
+        Run pyflakes over a parsed module
+
+        Args:
+            tree: Parsed test module
+
+        Returns:
+            First relevant pyflakes message, or None
+        """
+        errors = tuple(getattr(pyflakes_messages, name) for name in LINT_ERRORS)
+        found = pyflakes_checker.Checker(tree, filename="<generated test>")
+        for message in sorted(found.messages, key=lambda m: m.lineno):
+            if isinstance(message, errors):
+                return f"line {message.lineno}: {message.message % message.message_args}"
+        return None
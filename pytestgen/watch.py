@@ -0,0 +1,224 @@
+"""
+Watch mode for PyTest-Gen: keep the function index in memory and react to saves
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .file_walker import FileWalker
+from .function_discovery import FunctionDiscovery, TestIndex
+from .function_info import FunctionInfo
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size) of a watched file
+FileState = Tuple[int, int]
+
+
+class FunctionWatcher:
+    """
+    Poll a project for changed files and report new or changed untested functions
+
+    The functions of every file are held in memory after the first scan.
+    Each poll walks the tree with the discovery's ``FileWalker`` and compares
+    modification times and sizes, so only files that changed are parsed
+    again. A burst of saves is collected until the tree has been quiet for
+    ``debounce`` seconds.
+
+    A function is reported when it is new or its ``fingerprint`` changed,
+    it lives outside test files, and no test covers it by name. Functions
+    present at the first scan are not reported until they change. Test
+    directories outside the project, such as an external ``--output-dir``,
+    are polled too, so tests written during the session count as coverage.
+    """
+
+    def __init__(
+        self,
+        discovery: FunctionDiscovery,
+        poll_interval: float = 0.5,
+        debounce: float = 0.3,
+        metrics: Optional[Metrics] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize the watcher
+
+        Args:
+            discovery: Discovery whose walker, index and test directories are used
+            poll_interval: Seconds between polls of the file tree
+            debounce: Seconds without further changes before a burst is processed
+            metrics: Collector for the ``watch_polls`` and ``watch_files_changed``
+                counters (default: a private one)
+            clock: Monotonic time source
+            sleep: Function used to wait between polls
+        """
+        self.discovery = discovery
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.clock = clock
+        self.sleep = sleep
+        self.files: Dict[Path, FileState] = {}
+        # files of the discovery's test_dirs outside the project
+        self.external_files: Dict[Path, FileState] = {}
+        self.functions: Dict[Path, List[FunctionInfo]] = {}
+        self.test_index = TestIndex(discovery.project_dir)
+        self._external_tests: List[FunctionInfo] = []
+        self._external_changed = False
+
+    def start(self) -> int:
+        """
+        Scan the whole project and build the in-memory index
+
+        Returns:
+            Number of files indexed
+        """
+        self.files = self._snapshot()
+        for file_path in self.files:
+            self._scan(file_path)
+        self.external_files = self._external_snapshot(self.files)
+        self._load_external_tests()
+        self._rebuild_test_index()
+        self._save_index()
+        return len(self.files)
+
+    def _snapshot(self) -> Dict[Path, FileState]:
+        """Modification time and size of every file the walker selects"""
+        return _stat_files(self.discovery.walker.walk())
+
+    def _external_snapshot(self, project_files: Dict[Path, FileState]) -> Dict[Path, FileState]:
+        """Modification time and size of the files in test directories outside the project"""
+        snapshot = {}
+        for test_dir in self.discovery.test_dirs:
+            if Path(test_dir).is_dir():
+                files = (file_path for file_path in FileWalker(Path(test_dir)).walk() if file_path not in project_files)
+                snapshot.update(_stat_files(files))
+        return snapshot
+
+    def _load_external_tests(self):
+        self._external_tests = self.discovery.discover_external_tests({str(file_path) for file_path in self.files})
+        self._external_changed = False
+
+    def _scan(self, file_path: Path) -> Optional[List[FunctionInfo]]:
+        try:
+            functions = self.discovery.scan_file(file_path)
+        except Exception as e:
+            logger.warning(f"Error processing {file_path}: {str(e)}")
+            return None
+        for func in functions:
+            # fingerprints are lazy; read them before the file changes again
+            func.fingerprint
+        self.functions[file_path] = functions
+        return functions
+
+    def _rebuild_test_index(self):
+        self.test_index = TestIndex(self.discovery.project_dir)
+        self.test_index.update(self._external_tests)
+        for functions in self.functions.values():
+            self.test_index.update(functions)
+
+    def _save_index(self):
+        index = self.discovery.index
+        if index is not None:
+            if self.discovery.scan_is_complete(list(self.files)):
+                index.retain(str(file_path) for file_path in self.files)
+            index.save()
+
+    def changed_files(self) -> Tuple[Set[Path], Set[Path]]:
+        """
+        Compare the file tree against the last known state and remember it
+
+        Changes to test directories outside the project are not returned;
+        they mark the external tests for reloading in the next ``apply``.
+
+        Returns:
+            Tuple of (added or modified project files, deleted project files)
+        """
+        self.metrics.count("watch_polls")
+        current = self._snapshot()
+        modified = {file_path for file_path, state in current.items() if self.files.get(file_path) != state}
+        deleted = set(self.files) - set(current)
+        self.files = current
+        external = self._external_snapshot(current)
+        if external != self.external_files:
+            self.external_files = external
+            self._external_changed = True
+        return modified, deleted
+
+    def apply(self, modified: Set[Path], deleted: Set[Path]) -> List[FunctionInfo]:
+        """
+        Re-parse changed files and find the functions that need tests
+
+        Args:
+            modified: Added or modified files
+            deleted: Deleted files
+
+        Returns:
+            New or changed untested functions, in file and definition order
+        """
+        self.metrics.count("watch_files_changed", len(modified) + len(deleted))
+        for file_path in deleted:
+            self.functions.pop(file_path, None)
+
+        candidates = []
+        for file_path in sorted(modified):
+            previous = {
+                (func["class_name"], func["function_name"]): func.get("fingerprint")
+                for func in self.functions.get(file_path, ())
+            }
+            functions = self._scan(file_path)
+            if functions is None or self.discovery.is_test_file(file_path):
+                continue
+            candidates.extend(
+                func for func in functions
+                if not func["is_test"]
+                and previous.get((func["class_name"], func["function_name"]), "") != func.get("fingerprint")
+            )
+
+        if self._external_changed:
+            self._load_external_tests()
+        # a save can add a test as well as remove one
+        self._rebuild_test_index()
+        return [func for func in candidates if not self.test_index.covers(func)]
+
+    def wait(self) -> List[FunctionInfo]:
+        """
+        Block until a burst of changes yields functions that need tests
+
+        Returns:
+            New or changed untested functions of the burst
+        """
+        while True:
+            modified: Set[Path] = set()
+            deleted: Set[Path] = set()
+            last_change = None
+            while last_change is None or self.clock() - last_change < self.debounce:
+                self.sleep(self.poll_interval if last_change is None else min(self.poll_interval, self.debounce))
+                changed, removed = self.changed_files()
+                if changed or removed or self._external_changed:
+                    last_change = self.clock()
+                    # a file re-created within the burst counts as modified
+                    deleted = (deleted | removed) - changed
+                    modified = (modified | changed) - removed
+            functions = self.apply(modified, deleted)
+            self._save_index()
+            if functions:
+                return functions
+
+
+def _stat_files(file_paths: Iterable[Path]) -> Dict[Path, FileState]:
+    """Modification time and size of each file that still exists"""
+    snapshot = {}
+    for file_path in file_paths:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            # deleted between the walk and the stat
+            continue
+        snapshot[file_path] = (st.st_mtime_ns, st.st_size)
+    return snapshot
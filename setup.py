@@ -13,6 +13,10 @@ setup(
         "click>=8.1.7",
         "astor>=0.8.1",
     ],
+    extras_require={
+        "tokens": ["tiktoken>=0.5.0"],
+        "lint": ["pyflakes>=3.0.0"],
+    },
     entry_points={
         "console_scripts": [
             "pytestgen=pytestgen:cli",
@@ -0,0 +1,128 @@
+from unittest.mock import MagicMock
+import openai
+import pytest
+from pytestgen.backends import BackendPool, Endpoint, endpoints_from_specs, parse_endpoint
+from pytestgen.rate_limit import RequestScheduler, RetryPolicy
+from pytestgen.test_generator import TestGenerator
+
+def _status_error(cls, status_code):
+    return cls(f"HTTP {status_code}", response=MagicMock(status_code=status_code, headers={}), body=None)
+
+def _endpoint(name, weight=1.0, side_effect=None):
+    client = MagicMock()
+    client.chat.completions.create.side_effect = side_effect or (lambda **kwargs: name)
+    return Endpoint(name=name, client=client, weight=weight)
+
+def test_parse_endpoint():
+    assert parse_endpoint("http://localhost:8000/v1, weight=2, key_env=LOCAL_KEY") == {
+        "base_url": "http://localhost:8000/v1", "weight": 2.0, "key_env": "LOCAL_KEY"
+    }
+    with pytest.raises(ValueError):
+        parse_endpoint("http://localhost:8000/v1,priority=1")
+    with pytest.raises(ValueError):
+        parse_endpoint("http://localhost:8000/v1,weight=0")
+
+def test_endpoints_share_one_connection_pool(monkeypatch):
+    monkeypatch.setenv("SECOND_KEY", "key-2")
+    first, second = endpoints_from_specs(["http://a/v1", "http://b/v1,key_env=SECOND_KEY"], "key-1")
+
+    assert first.client.api_key == "key-1" and second.client.api_key == "key-2"
+    assert first.client._client is second.client._client
+
+def test_weighted_routing_follows_weights():
+    pool = BackendPool([_endpoint("a", weight=3), _endpoint("b")], strategy="weighted")
+
+    picks = [pool.chat.completions.create(model="m") for _ in range(8)]
+
+    assert picks.count("a") == 6 and picks.count("b") == 2
+    assert picks[:4] == ["a", "a", "b", "a"]
+
+def test_least_outstanding_prefers_idle_endpoint():
+    busy, idle = _endpoint("busy"), _endpoint("idle")
+    busy.outstanding = 2
+    pool = BackendPool([busy, idle])
+
+    assert pool.create(model="m") == "idle"
+    assert busy.outstanding == 2 and idle.outstanding == 0
+
+def test_failing_endpoint_is_ejected_and_returns_after_cooldown():
+    now = [0.0]
+    # the heavier endpoint is picked while it is healthy
+    failing = _endpoint("failing", weight=100, side_effect=_status_error(openai.InternalServerError, 503))
+    pool = BackendPool([failing, _endpoint("ok")], max_failures=2, cooldown=10, clock=lambda: now[0])
+
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            pool.create(model="m")
+
+    assert pool.create(model="m") == "ok"
+    assert failing.ejected_until == 10
+    assert pool.metrics.summary()["counters"]["endpoint_ejections"] == 1
+    now[0] = 11
+    with pytest.raises(openai.InternalServerError):
+        pool.create(model="m")
+
+def test_bad_requests_do_not_eject_endpoints():
+    endpoint = _endpoint("a", side_effect=_status_error(openai.BadRequestError, 400))
+    pool = BackendPool([endpoint], max_failures=1)
+
+    with pytest.raises(openai.BadRequestError):
+        pool.create(model="m")
+    assert endpoint.ejected_until == 0 and endpoint.failures == 0
+
+def _streaming_endpoint(name, chunks):
+    def stream(**kwargs):
+        for chunk in chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    return _endpoint(name, side_effect=stream)
+
+def test_stream_holds_endpoint_until_closed():
+    endpoint = _streaming_endpoint("a", ["x", "y"])
+    pool = BackendPool([endpoint])
+
+    stream = pool.create(model="m", stream=True)
+    assert endpoint.outstanding == 1
+    assert next(iter(stream)) == "x"
+    assert endpoint.outstanding == 1
+    stream.close()
+    stream.close()
+    assert endpoint.outstanding == 0
+
+def test_stream_releases_endpoint_when_exhausted():
+    endpoint = _streaming_endpoint("a", ["x", "y"])
+    pool = BackendPool([endpoint])
+
+    assert list(pool.create(model="m", stream=True)) == ["x", "y"]
+    assert endpoint.outstanding == 0
+
+def test_stream_errors_while_reading_eject_endpoint():
+    endpoint = _streaming_endpoint("a", ["x", _status_error(openai.InternalServerError, 503)])
+    pool = BackendPool([endpoint], max_failures=1, cooldown=10, clock=lambda: 0.0)
+
+    stream = pool.create(model="m", stream=True)
+    with pytest.raises(openai.InternalServerError):
+        list(stream)
+    stream.close()
+
+    assert endpoint.outstanding == 0 and endpoint.failures == 1
+    assert endpoint.ejected_until == 10
+
+def test_generator_retries_on_another_endpoint():
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "def test_f():\n    pass"
+    down = _endpoint("down", weight=100, side_effect=_status_error(openai.APIStatusError, 502))
+    up = _endpoint("up", side_effect=lambda **kwargs: response)
+    generator = TestGenerator(
+        api_key="test-key",
+        client=BackendPool([down, up], max_failures=1),
+        scheduler=RequestScheduler(retry_policy=RetryPolicy(max_retries=2, base_delay=0.001)),
+    )
+
+    result = generator.generate_test({"function_name": "f", "args": [], "docstring": None})
+
+    assert result.test_code == "def test_f():\n    pass"
+    assert result.retries == 1
+    assert down.client.chat.completions.create.call_count == 1
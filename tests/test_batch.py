@@ -0,0 +1,114 @@
+import json
+from pathlib import Path
+import pytest
+from unittest.mock import MagicMock
+from pytestgen.batch import BatchRunner, BatchTransport, OpenAIBatchTransport
+from pytestgen.cache import ResponseCache
+from pytestgen.test_generator import TestGenerator
+
+class LocalBatchTransport(BatchTransport):
+    """Stand-in for a provider batch endpoint that answers from the request file"""
+
+    def __init__(self, polls_until_done=2):
+        self.polls_until_done = polls_until_done
+        self.requests = {}
+
+    def submit(self, requests_path):
+        lines = [json.loads(line) for line in Path(requests_path).read_text().splitlines()]
+        self.requests["batch_1"] = lines
+        return "batch_1"
+
+    def status(self, batch_id):
+        self.polls_until_done -= 1
+        return "completed" if self.polls_until_done <= 0 else "in_progress"
+
+    def fetch_results(self, batch_id):
+        for request in self.requests[batch_id]:
+            prompt = request["body"]["messages"][1]["content"]
+            if "def broken(" in prompt:
+                yield {"custom_id": request["custom_id"], "response": None,
+                       "error": {"code": "server_error", "message": "model overloaded"}}
+                continue
+            name = prompt.split("def ", 1)[1].split("(", 1)[0]
+            yield {
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {"choices": [{"message": {"content": f"```python\ndef test_{name}():\n    pass\n```"}}]},
+                },
+                "error": None,
+            }
+
+def _function(name):
+    return {"function_name": name, "args": [], "docstring": None, "line_number": 1,
+            "is_test": False, "file_path": "module.py"}
+
+def test_batch_submit_wait_collect(tmp_path):
+    cache = ResponseCache(tmp_path / "cache")
+    generator = TestGenerator(api_key="test-key", cache=cache)
+    transport = LocalBatchTransport()
+    runner = BatchRunner(generator, transport, tmp_path / "batches")
+
+    batch_id = runner.submit([_function("add"), _function("broken"), _function("sub")])
+    requests = transport.requests[batch_id]
+    assert [r["custom_id"] for r in requests] == ["fn-0", "fn-1", "fn-2"]
+    assert requests[0]["url"] == "/v1/chat/completions"
+    assert requests[0]["body"]["model"] == "gpt-4o"
+
+    assert runner.wait(batch_id, poll_interval=0) == "completed"
+
+    # A fresh runner resumes from the saved state using only the batch id
+    results = BatchRunner(generator, transport, tmp_path / "batches").collect(batch_id)
+    assert [r.function_info["function_name"] for r in results] == ["add", "broken", "sub"]
+    assert results[0].test_code == "def test_add():\n    pass"
+    assert results[1].error == "model overloaded"
+    assert results[2].test_code == "def test_sub():\n    pass"
+
+    # Batch results are cached for later interactive runs
+    generator.client = MagicMock()
+    assert generator.generate_test(_function("add")).cached
+    generator.client.chat.completions.create.assert_not_called()
+
+def test_batch_collect_caches_only_valid_results(tmp_path):
+    validator = MagicMock()
+    validator.validate.side_effect = lambda code, function_info: "rejected" if "test_sub" in code else None
+    generator = TestGenerator(api_key="test-key", cache=ResponseCache(tmp_path / "cache"), validator=validator)
+    transport = LocalBatchTransport(polls_until_done=0)
+    runner = BatchRunner(generator, transport, tmp_path / "batches")
+
+    batch_id = runner.submit([_function("add"), _function("sub")])
+    results = runner.collect(batch_id)
+
+    assert results[0].error is None and results[1].error == "generated tests failed validation: rejected"
+    assert generator.cache.stats().entries == 1
+
+def test_incomplete_transport_cannot_be_created():
+    class SubmitOnly(BatchTransport):
+        def submit(self, requests_path):
+            return "batch_1"
+
+    with pytest.raises(TypeError):
+        SubmitOnly()
+
+def test_batch_wait_timeout_returns_last_state(tmp_path):
+    runner = BatchRunner(TestGenerator(api_key="test-key"), LocalBatchTransport(polls_until_done=100), tmp_path)
+    assert runner.wait("batch_1", poll_interval=0.01, timeout=0.05) == "in_progress"
+
+def test_openai_batch_transport(tmp_path):
+    client = MagicMock()
+    client.files.create.return_value.id = "file_in"
+    client.batches.create.return_value.id = "batch_abc"
+    client.batches.retrieve.return_value.status = "completed"
+    client.batches.retrieve.return_value.output_file_id = "file_out"
+    client.batches.retrieve.return_value.error_file_id = None
+    client.files.content.return_value.text = '{"custom_id": "fn-0"}\n\n'
+    requests_path = tmp_path / "requests.jsonl"
+    requests_path.write_text("{}\n")
+
+    transport = OpenAIBatchTransport(client)
+    assert transport.submit(requests_path) == "batch_abc"
+    assert client.batches.create.call_args.kwargs == {
+        "input_file_id": "file_in", "endpoint": "/v1/chat/completions", "completion_window": "24h"
+    }
+    assert transport.status("batch_abc") == "completed"
+    assert list(transport.fetch_results("batch_abc")) == [{"custom_id": "fn-0"}]
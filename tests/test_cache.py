@@ -0,0 +1,53 @@
+import os
+import time
+from pytestgen.cache import ResponseCache
+
+def _messages(prompt):
+    return [{"role": "user", "content": prompt}]
+
+def test_make_key_depends_on_all_parameters():
+    base = ResponseCache.make_key("gpt-4o", 0.7, 1000, _messages("p"))
+    assert base == ResponseCache.make_key("gpt-4o", 0.7, 1000, _messages("p"))
+    assert base != ResponseCache.make_key("gpt-4o-mini", 0.7, 1000, _messages("p"))
+    assert base != ResponseCache.make_key("gpt-4o", 0.2, 1000, _messages("p"))
+    assert base != ResponseCache.make_key("gpt-4o", 0.7, 500, _messages("p"))
+    assert base != ResponseCache.make_key("gpt-4o", 0.7, 1000, _messages("q"))
+
+def test_get_and_set_roundtrip(tmp_path):
+    cache = ResponseCache(tmp_path)
+    key = ResponseCache.make_key("gpt-4o", 0.7, 1000, _messages("p"))
+
+    assert cache.get(key) is None
+    cache.set(key, "def test_x():\n    pass", model="gpt-4o")
+    assert cache.get(key) == "def test_x():\n    pass"
+
+    stats = cache.stats()
+    assert stats.entries == 1
+    assert stats.total_bytes > 0
+
+def test_max_age_treats_old_entries_as_misses(tmp_path):
+    cache = ResponseCache(tmp_path, max_age=60)
+    key = ResponseCache.make_key("gpt-4o", 0.7, 1000, _messages("p"))
+    cache.set(key, "old")
+    old = time.time() - 120
+    os.utime(cache._entry_path(key), (old, old))
+
+    assert cache.get(key) is None
+
+def test_prune_by_age_and_size(tmp_path):
+    cache = ResponseCache(tmp_path)
+    keys = [ResponseCache.make_key("gpt-4o", 0.7, 1000, _messages(str(i))) for i in range(4)]
+    now = time.time()
+    for i, key in enumerate(keys):
+        cache.set(key, "x" * 100)
+        # key 0 is the oldest, key 3 the most recently used
+        ts = now - (4 - i) * 1000
+        os.utime(cache._entry_path(key), (ts, ts))
+
+    assert cache.prune(max_age=3500) == 1
+    assert cache.get(keys[0]) is None
+
+    newest_size = sum(cache._entry_path(key).stat().st_size for key in keys[2:])
+    assert cache.prune(max_bytes=newest_size) == 1
+    assert cache.stats().entries == 2
+    assert not cache._entry_path(keys[1]).exists()
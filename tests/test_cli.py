@@ -2,7 +2,9 @@ import pytest
 import click
 from click.testing import CliRunner
 from pytestgen import cli
+from pytestgen.test_generator import TestGenerationResult
 from unittest.mock import patch, MagicMock
+import os
 import tempfile
 from pathlib import Path
 
@@ -38,22 +40,20 @@ def mock_discover(self, max_files=None):
         "file_path": "sample.py"
     }]
 
-def mock_get_untested_functions(self):
-    return self.discover()
+def mock_iter_untested_functions(self, max_files=None):
+    yield from mock_discover(self, max_files)
 
-def mock_generate_tests_for_functions(self, functions):
-    # Return a fake test code for the mock function
-    return [
-        MagicMock(function_info=functions[0], test_code="def test_add():\n    assert add(1, 2) == 3", error=None)
-    ]
+def mock_iter_tests_for_functions(self, functions):
+    # Return a fake test code for each mock function
+    for function_info in functions:
+        yield TestGenerationResult(function_info=function_info, test_code="def test_add():\n    assert add(1, 2) == 3")
 
 def test_generate_dry_run(monkeypatch):
     runner = CliRunner()
     monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
     
-    with patch("pytestgen.function_discovery.FunctionDiscovery.discover", mock_discover), \
-         patch("pytestgen.function_discovery.FunctionDiscovery.get_untested_functions", mock_get_untested_functions), \
-         patch("pytestgen.test_generator.TestGenerator.generate_tests_for_functions", mock_generate_tests_for_functions):
+    with patch("pytestgen.function_discovery.FunctionDiscovery.iter_untested_functions", mock_iter_untested_functions), \
+         patch("pytestgen.test_generator.TestGenerator.iter_tests_for_functions", mock_iter_tests_for_functions):
         result = runner.invoke(cli, ["generate", "--dry-run"])
         assert result.exit_code == 0
         assert "DRY RUN" in result.output
@@ -64,9 +64,8 @@ def test_generate_output_dir(monkeypatch):
     runner = CliRunner()
     monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
     with tempfile.TemporaryDirectory() as tmpdir:
-        with patch("pytestgen.function_discovery.FunctionDiscovery.discover", mock_discover), \
-             patch("pytestgen.function_discovery.FunctionDiscovery.get_untested_functions", mock_get_untested_functions), \
-             patch("pytestgen.test_generator.TestGenerator.generate_tests_for_functions", mock_generate_tests_for_functions):
+        with patch("pytestgen.function_discovery.FunctionDiscovery.iter_untested_functions", mock_iter_untested_functions), \
+             patch("pytestgen.test_generator.TestGenerator.iter_tests_for_functions", mock_iter_tests_for_functions):
             result = runner.invoke(cli, ["generate", f"--output-dir={tmpdir}", "--overwrite"])
             assert result.exit_code == 0
             test_file = Path(tmpdir) / "test_sample.py"
@@ -74,3 +73,211 @@ def test_generate_output_dir(monkeypatch):
             content = test_file.read_text()
             assert "def test_add()" in content
             assert "add(1, 2) == 3" in content
+
+def test_generate_reports_token_usage(monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
+
+    def iter_tests_with_usage(self, functions):
+        for function_info in functions:
+            yield TestGenerationResult(
+                function_info=function_info,
+                test_code="def test_add():\n    pass",
+                prompt_tokens=120,
+                completion_tokens=45
+            )
+
+    with patch("pytestgen.function_discovery.FunctionDiscovery.iter_untested_functions", mock_iter_untested_functions), \
+         patch("pytestgen.test_generator.TestGenerator.iter_tests_for_functions", iter_tests_with_usage):
+        result = runner.invoke(cli, ["generate", "--dry-run", "--prompt-token-budget", "500", "--max-output-tokens", "800"])
+        assert result.exit_code == 0
+        assert "Tokens used: 120 prompt, 45 completion" in result.output
+
+def test_cache_stats_and_prune(tmp_path):
+    from pytestgen.cache import ResponseCache
+
+    cache = ResponseCache(tmp_path)
+    cache.set(ResponseCache.make_key("gpt-4o", 0.7, 1000, []), "def test_x():\n    pass")
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["cache", "stats", f"--cache-dir={tmp_path}"])
+    assert result.exit_code == 0
+    assert "Entries: 1" in result.output
+
+    result = runner.invoke(cli, ["cache", "prune", f"--cache-dir={tmp_path}", "--max-size-mb=0"])
+    assert result.exit_code == 0
+    assert "Removed 1 cache entries" in result.output
+    assert cache.stats().entries == 0
+
+def test_generate_writes_metrics_and_profile(monkeypatch, tmp_path):
+    import json
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
+    metrics_file = tmp_path / "metrics.json"
+    profile_file = tmp_path / "run.prof"
+
+    with patch("pytestgen.function_discovery.FunctionDiscovery.iter_untested_functions", mock_iter_untested_functions), \
+         patch("pytestgen.test_generator.TestGenerator.iter_tests_for_functions", mock_iter_tests_for_functions):
+        result = runner.invoke(cli, [
+            "generate", f"--output-dir={tmp_path / 'out'}",
+            f"--metrics-json={metrics_file}", f"--profile={profile_file}"
+        ])
+
+    assert result.exit_code == 0, result.output
+    summary = json.loads(metrics_file.read_text())
+    assert summary["stages"]["total"]["calls"] == 1
+    assert summary["stages"]["write"]["calls"] == 1
+    assert summary["counters"]["files_written"] == 1
+    assert summary["counters"]["bytes_written"] == len((tmp_path / "out" / "test_sample.py").read_bytes())
+    assert summary["counters"]["functions_processed"] == 1
+    assert profile_file.exists()
+
+def test_generate_resume_replays_journal(monkeypatch, tmp_path):
+    from pytestgen.journal import ProgressJournal, default_journal_path
+
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
+    with ProgressJournal(default_journal_path(tmp_path)) as journal:
+        journal.record(TestGenerationResult(
+            function_info=mock_discover(None)[0], test_code="def test_add():\n    assert add(2, 2) == 4"
+        ))
+
+    # the journaled function is replayed without any request
+    with patch("pytestgen.function_discovery.FunctionDiscovery.iter_untested_functions", mock_iter_untested_functions):
+        result = runner.invoke(cli, ["generate", f"--project-dir={tmp_path}", "--dry-run", "--no-cache", "--resume"])
+
+    assert result.exit_code == 0, result.output
+    assert "Resuming: 1 completed functions" in result.output
+    assert "add(2, 2) == 4" in result.output
+
+def test_generate_coverage_guided_within_budget(monkeypatch, tmp_path):
+    import sqlite3
+
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
+    (tmp_path / "mod.py").write_text(
+        "def small(x):\n    return x\n\n"
+        "def big(x):\n    if x:\n        return 1\n    return 2\n\n"
+        "def done(x):\n    return x\n",
+        encoding="utf-8"
+    )
+    connection = sqlite3.connect(tmp_path / ".coverage")
+    connection.execute("CREATE TABLE file (id INTEGER PRIMARY KEY, path TEXT)")
+    connection.execute("CREATE TABLE line_bits (file_id INTEGER, context_id INTEGER, numbits BLOB)")
+    connection.execute("INSERT INTO file VALUES (1, 'mod.py')")
+    # lines 1, 4, 9 and 10 ran
+    connection.execute("INSERT INTO line_bits VALUES (1, 1, ?)", (bytes([0b00010010, 0b00000110]),))
+    connection.commit()
+    connection.close()
+
+    with patch("pytestgen.test_generator.TestGenerator.iter_tests_for_functions", mock_iter_tests_for_functions):
+        result = runner.invoke(cli, [
+            "generate", f"--project-dir={tmp_path}", "--dry-run", "--no-cache", "--no-index",
+            f"--coverage-file={tmp_path / '.coverage'}", "--budget=1"
+        ])
+
+    assert result.exit_code == 0, result.output
+    assert "2 functions have uncovered lines" in result.output
+    assert "Budget of 1 functions covers 1 of 2 functions" in result.output
+    assert "# For function: big" in result.output
+    assert "# For function: small" not in result.output
+
+def test_watch_generates_for_each_burst_until_interrupted(monkeypatch, tmp_path):
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
+    (tmp_path / "sample.py").write_text("def add(a, b):\n    return a + b\n", encoding="utf-8")
+    bursts = iter([mock_discover(None)])
+
+    def wait(self):
+        for functions in bursts:
+            return functions
+        raise KeyboardInterrupt
+
+    with patch("pytestgen.watch.FunctionWatcher.wait", wait), \
+         patch("pytestgen.test_generator.TestGenerator.iter_tests_for_functions", mock_iter_tests_for_functions):
+        result = runner.invoke(cli, ["watch", f"--project-dir={tmp_path}", "--dry-run", "--no-cache", "--no-index"])
+
+    assert result.exit_code == 0, result.output
+    assert "Watching 1 files" in result.output
+    assert "1 new or changed untested functions" in result.output
+    assert "add(1, 2) == 3" in result.output
+    assert "Stopped watching" in result.output
+
+def test_watch_sends_current_module_context_after_each_edit(monkeypatch, tmp_path):
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
+    sample = tmp_path / "sample.py"
+    sample.write_text("def add(a, b):\n    return a + b\n", encoding="utf-8")
+    edits = iter([
+        "def add(a, b):\n    return a + b\n\ndef mul(a, b):\n    return a * b\n",
+        "def add(a, b):\n    return a + b\n\ndef mul(a, b):\n    return a * b\n\ndef neg(a):\n    return -a\n",
+    ])
+
+    def wait(self):
+        for version, source in enumerate(edits, start=1):
+            sample.write_text(source, encoding="utf-8")
+            st = sample.stat()
+            os.utime(sample, ns=(st.st_atime_ns, st.st_mtime_ns + version * 10**9))
+            return self.apply(*self.changed_files())
+        raise KeyboardInterrupt
+
+    system_prompts = []
+
+    def create(**request):
+        system_prompts.append(request["messages"][0]["content"])
+        response = MagicMock()
+        response.choices[0].message.content = "def test_f():\n    pass"
+        response.usage = None
+        return response
+
+    with patch("pytestgen.watch.FunctionWatcher.wait", wait), \
+         patch("pytestgen.test_generator.OpenAI") as openai_client:
+        openai_client.return_value.chat.completions.create.side_effect = create
+        result = runner.invoke(cli, [
+            "watch", f"--project-dir={tmp_path}", "--dry-run", "--no-cache", "--no-index",
+            "--no-validate", "--module-context-tokens=500",
+        ])
+
+    assert result.exit_code == 0, result.output
+    assert len(system_prompts) == 2
+    assert "def mul(a, b)" in system_prompts[0] and "def neg(a)" not in system_prompts[0]
+    assert "def neg(a)" in system_prompts[1]
+
+def test_generate_shards_and_merge(monkeypatch, tmp_path):
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
+    (tmp_path / "sample.py").write_text(
+        "".join(f"def func{i}(a):\n    return a + {i}\n\n" for i in range(6)), encoding="utf-8"
+    )
+
+    def generate_tests(self, functions):
+        for function_info in functions:
+            name = function_info["function_name"]
+            yield TestGenerationResult(function_info=function_info, test_code=f"def test_{name}():\n    assert {name}(0) >= 0")
+
+    with patch("pytestgen.test_generator.TestGenerator.iter_tests_for_functions", generate_tests):
+        for index in (1, 2):
+            result = runner.invoke(cli, [
+                "generate", f"--project-dir={tmp_path}", "--no-cache", "--no-index", f"--shard={index}/2"
+            ])
+            assert result.exit_code == 0, result.output
+            assert f"written to {tmp_path / '.pytestgen' / 'shards' / f'shard-{index}-of-2.json'}" in result.output
+
+    bundles = sorted(str(path) for path in (tmp_path / ".pytestgen" / "shards").glob("*.json"))
+    result = runner.invoke(cli, ["merge", *bundles, f"--project-dir={tmp_path}", f"--output-dir={tmp_path / 'out'}"])
+
+    assert result.exit_code == 0, result.output
+    assert "Merging 6 results from 2 bundles" in result.output
+    content = (tmp_path / "out" / "test_sample.py").read_text(encoding="utf-8")
+    assert [line for line in content.splitlines() if line.startswith("def ")] == [f"def test_func{i}():" for i in range(6)]
+
+def test_generate_with_max_functions_saves_discovery_index(monkeypatch, tmp_path):
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy-key")
+    (tmp_path / "sample.py").write_text("def add(a, b):\n    return a + b\n\ndef sub(a, b):\n    return a - b\n", encoding="utf-8")
+
+    with patch("pytestgen.test_generator.TestGenerator.iter_tests_for_functions", mock_iter_tests_for_functions):
+        result = runner.invoke(cli, ["generate", f"--project-dir={tmp_path}", "--dry-run", "--no-cache", "--max-functions=1"])
+
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / ".pytestgen" / "discovery_index.json").exists()
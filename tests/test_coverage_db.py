@@ -0,0 +1,86 @@
+import sqlite3
+
+import pytest
+
+from pytestgen.coverage_db import (
+    CoverageData, CoverageDataError, numbits_to_lines, rank_by_coverage, select_within_budget
+)
+from pytestgen.function_discovery import FunctionDiscovery
+
+SOURCE = '''def covered(x):
+    """Fully tested."""
+    return x + 1
+
+def branchy(x):
+    if x > 0:
+        return 1
+    elif x < 0:
+        return -1
+    return 0
+
+def untouched(x):
+    y = x * 2
+    return y
+'''
+
+def _numbits(lines):
+    data = bytearray(max(lines) // 8 + 1)
+    for line in lines:
+        data[line // 8] |= 1 << (line % 8)
+    return bytes(data)
+
+def _write_coverage(path, files, arcs=None):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE file (id INTEGER PRIMARY KEY, path TEXT)")
+    connection.execute("CREATE TABLE line_bits (file_id INTEGER, context_id INTEGER, numbits BLOB)")
+    connection.execute("CREATE TABLE arc (file_id INTEGER, context_id INTEGER, fromno INTEGER, tono INTEGER)")
+    for file_id, (file_path, lines) in enumerate(files.items(), 1):
+        connection.execute("INSERT INTO file VALUES (?, ?)", (file_id, file_path))
+        if lines:
+            connection.execute("INSERT INTO line_bits VALUES (?, 1, ?)", (file_id, _numbits(lines)))
+        for from_line, to_line in (arcs or {}).get(file_path, ()):
+            connection.execute("INSERT INTO arc VALUES (?, 1, ?, ?)", (file_id, from_line, to_line))
+    connection.commit()
+    connection.close()
+
+def test_numbits_to_lines():
+    assert numbits_to_lines(_numbits([1, 7, 8, 20])) == [1, 7, 8, 20]
+    assert numbits_to_lines(b"") == []
+
+def test_ranks_by_uncovered_lines_times_complexity(tmp_path):
+    (tmp_path / "mod.py").write_text(SOURCE, encoding="utf-8")
+    # relative paths are resolved against the data file's directory
+    _write_coverage(tmp_path / ".coverage", {"mod.py": [1, 3, 5, 6, 10, 12]})
+    coverage = CoverageData(tmp_path / ".coverage")
+    functions = {f["function_name"]: f for f in FunctionDiscovery(tmp_path).iter_source_functions()}
+
+    assert coverage.uncovered_lines(functions["covered"]) == (0, 1)
+    assert coverage.uncovered_lines(functions["branchy"]) == (3, 5)
+    assert coverage.uncovered_lines(functions["untouched"]) == (2, 2)
+    ranked = rank_by_coverage(functions.values(), coverage)
+    assert [f["function_name"] for f in ranked] == ["branchy", "untouched"]
+
+def test_arcs_count_as_executed_and_missing_files_as_uncovered(tmp_path):
+    (tmp_path / "mod.py").write_text(SOURCE, encoding="utf-8")
+    (tmp_path / "new.py").write_text("def fresh():\n    return 1\n", encoding="utf-8")
+    source = str(tmp_path / "mod.py")
+    _write_coverage(tmp_path / ".coverage", {source: []}, arcs={source: [(-12, 13), (13, 14), (14, -12)]})
+    coverage = CoverageData(tmp_path / ".coverage")
+    functions = {f["function_name"]: f for f in FunctionDiscovery(tmp_path).iter_source_functions()}
+
+    assert coverage.uncovered_lines(functions["untouched"]) == (0, 2)
+    assert coverage.uncovered_lines(functions["fresh"]) == (1, 1)
+
+def test_rejects_files_that_are_not_coverage_data(tmp_path):
+    with pytest.raises(CoverageDataError):
+        CoverageData(tmp_path / ".coverage")
+    (tmp_path / "other.db").write_text("not a database", encoding="utf-8")
+    with pytest.raises(CoverageDataError):
+        CoverageData(tmp_path / "other.db")
+
+def test_select_within_budget_skips_functions_that_do_not_fit():
+    functions = [{"function_name": name, "cost": cost} for name, cost in [("a", 50), ("b", 80), ("c", 30), ("d", 40)]]
+
+    selected = select_within_budget(functions, 100, lambda f: f["cost"])
+
+    assert [f["function_name"] for f in selected] == ["a", "c"]
@@ -0,0 +1,101 @@
+from pytestgen.dedup import Deduplicator, module_names, retarget_imports
+from pytestgen.function_discovery import FunctionDiscovery
+from pytestgen.test_generator import TestGenerationResult
+
+HELPER = '''
+def slugify(text):
+    """Make a URL slug."""
+    return text.lower().replace(" ", "-")
+'''
+
+def _write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+def test_copies_share_a_fingerprint(tmp_path):
+    _write(tmp_path / "app" / "text.py", HELPER)
+    _write(tmp_path / "vendor" / "lib" / "strings.py", "\n\n# copied\n" + HELPER)
+    _write(tmp_path / "other.py", HELPER.replace("lower()", "upper()"))
+
+    functions = {f["file_path"]: f["fingerprint"] for f in FunctionDiscovery(tmp_path).discover()}
+
+    assert functions[str(tmp_path / "app" / "text.py")] == functions[str(tmp_path / "vendor" / "lib" / "strings.py")]
+    assert functions[str(tmp_path / "other.py")] != functions[str(tmp_path / "app" / "text.py")]
+
+def test_module_names(tmp_path):
+    _write(tmp_path / "src" / "app" / "__init__.py", "")
+    assert module_names(str(tmp_path / "src" / "app" / "text.py")) == ("app.text", "text")
+    assert module_names(str(tmp_path / "text.py")) == ("text", "text")
+    assert module_names(str(tmp_path / "src" / "app" / "__init__.py")) == ("app", "app")
+
+def test_retarget_imports():
+    code = (
+        "import text\n"
+        "from text import slugify as slug\n"
+        "from app.text import slugify\n"
+        "from unittest.mock import patch\n\n"
+        "@patch(\"app.text.re\")\n"
+        "def test_slugify(re):\n"
+        "    assert text.slugify(\"A b\") == slug(\"A b\") == slugify(\"A b\")\n"
+    )
+
+    assert retarget_imports(code, ("app.text", "text"), ("vendor.lib.strings", "strings")) == (
+        "import strings as text\n"
+        "from strings import slugify as slug\n"
+        "from vendor.lib.strings import slugify\n"
+        "from unittest.mock import patch\n\n"
+        "@patch(\"vendor.lib.strings.re\")\n"
+        "def test_slugify(re):\n"
+        "    assert text.slugify(\"A b\") == slug(\"A b\") == slugify(\"A b\")"
+    )
+
+def test_deduplicator_generates_once_and_fans_out_in_order(tmp_path):
+    functions = [
+        {"function_name": "slugify", "file_path": str(tmp_path / "a.py"), "fingerprint": "f1"},
+        {"function_name": "other", "file_path": str(tmp_path / "a.py"), "fingerprint": "f2"},
+        {"function_name": "slugify", "file_path": str(tmp_path / "b.py"), "fingerprint": "f1"},
+        {"function_name": "plain", "file_path": str(tmp_path / "b.py")},
+        {"function_name": "other", "file_path": str(tmp_path / "c.py"), "fingerprint": "f2"},
+    ]
+    generated = []
+
+    def generate(stream):
+        for function_info in stream:
+            generated.append(function_info["function_name"])
+            yield TestGenerationResult(
+                function_info=function_info,
+                test_code=f"from a import {function_info['function_name']}\n\ndef test_it():\n    pass",
+                prompt_tokens=10
+            )
+
+    dedup = Deduplicator()
+    results = list(dedup.run(functions, generate))
+
+    assert generated == ["slugify", "other", "plain"]
+    assert [r.function_info for r in results] == functions
+    assert results[2].test_code.startswith("from b import slugify\n")
+    assert results[2].cached and results[2].prompt_tokens is None
+    assert results[4].test_code.startswith("from c import other\n")
+    summary = dedup.metrics.summary()
+    assert summary["counters"]["functions_deduplicated"] == 2
+    assert summary["dedup_ratio"] == 0.4
+
+def test_deduplicator_retargets_package_rooted_project(tmp_path):
+    project = tmp_path / "proj"
+    for package in ("", "a", "b"):
+        _write(project / package / "__init__.py", "")
+    _write(project / "a" / "util.py", "def f(x):\n    return x + 1\n")
+    _write(project / "b" / "util.py", "def f(x):\n    return x + 1\n")
+    functions = FunctionDiscovery(project).discover()
+
+    def generate(stream):
+        for function_info in stream:
+            yield TestGenerationResult(
+                function_info=function_info,
+                test_code="from proj.a.util import f\n\ndef test_f():\n    assert f(1) == 2"
+            )
+
+    results = list(Deduplicator().run(sorted(functions, key=lambda f: f["file_path"]), generate))
+
+    assert results[1].function_info["file_path"] == str(project / "b" / "util.py")
+    assert results[1].test_code.startswith("from proj.b.util import f\n")
@@ -0,0 +1,75 @@
+import os
+import pytest
+from pathlib import Path
+from pytestgen.file_walker import FileWalker, IgnoreRule
+
+def _touch(root, rel_path, content="def f():\n    pass\n"):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    return path
+
+def _walk(walker, **kwargs):
+    return [p.relative_to(walker.root).as_posix() for p in walker.walk(**kwargs)]
+
+def test_default_excludes_prune_vendored_directories(tmp_path):
+    _touch(tmp_path, "pkg/core.py")
+    _touch(tmp_path, ".git/hooks/hook.py")
+    _touch(tmp_path, ".venv/lib/python3.11/site-packages/dep.py")
+    _touch(tmp_path, "node_modules/x/y.py")
+    _touch(tmp_path, "build/lib/pkg/core.py")
+    _touch(tmp_path, "pkg.egg-info/setup.py")
+    _touch(tmp_path, "pkg/notes.txt")
+
+    assert _walk(FileWalker(tmp_path)) == ["pkg/core.py"]
+    assert "build/lib/pkg/core.py" in _walk(FileWalker(tmp_path, use_default_excludes=False))
+
+def test_walk_order_is_deterministic(tmp_path):
+    for rel_path in ["b.py", "a.py", "sub/z.py", "sub/inner/y.py", "other/x.py"]:
+        _touch(tmp_path, rel_path)
+
+    assert _walk(FileWalker(tmp_path)) == ["a.py", "b.py", "other/x.py", "sub/z.py", "sub/inner/y.py"]
+    assert _walk(FileWalker(tmp_path), max_files=2) == ["a.py", "b.py"]
+
+def test_gitignore_patterns(tmp_path):
+    _touch(tmp_path, ".gitignore", "# generated\n*_pb2.py\ngenerated/\n/top_only.py\n!keep_pb2.py\n")
+    _touch(tmp_path, "sub/.gitignore", "local.py\n")
+    for rel_path in [
+        "app.py", "api_pb2.py", "keep_pb2.py", "generated/code.py", "top_only.py",
+        "sub/top_only.py", "sub/local.py", "local.py",
+    ]:
+        _touch(tmp_path, rel_path)
+
+    assert _walk(FileWalker(tmp_path)) == ["app.py", "keep_pb2.py", "local.py", "sub/top_only.py"]
+    assert len(_walk(FileWalker(tmp_path, respect_gitignore=False))) == 8
+
+def test_include_and_exclude_globs(tmp_path):
+    for rel_path in ["src/pkg/a.py", "src/pkg/migrations/0001.py", "scripts/run.py", "setup.py"]:
+        _touch(tmp_path, rel_path)
+
+    walker = FileWalker(tmp_path, include=["src"], exclude=["migrations/"])
+    assert _walk(walker) == ["src/pkg/a.py"]
+
+    walker = FileWalker(tmp_path, include=["**/run.py", "setup.py"])
+    assert _walk(walker) == ["setup.py", "scripts/run.py"]
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="symlinks not supported")
+def test_symlinks_not_followed_by_default(tmp_path):
+    _touch(tmp_path, "real/mod.py")
+    os.symlink(tmp_path / "real", tmp_path / "link")
+    # a cycle must not hang the walker when following links
+    os.symlink(tmp_path, tmp_path / "real" / "loop")
+
+    assert _walk(FileWalker(tmp_path)) == ["real/mod.py"]
+    # each real directory is visited once, through whichever path comes first
+    assert _walk(FileWalker(tmp_path, follow_symlinks=True)) == ["link/mod.py"]
+
+def test_ignore_rule_anchoring():
+    assert IgnoreRule("*.py").matches("a/b/c.py", False)
+    assert IgnoreRule("/c.py").matches("c.py", False)
+    assert not IgnoreRule("/c.py").matches("a/c.py", False)
+    assert IgnoreRule("a/**/c.py").matches("a/c.py", False)
+    assert IgnoreRule("a/**/c.py").matches("a/x/y/c.py", False)
+    assert not IgnoreRule("docs/").matches("docs", False)
+    assert IgnoreRule("local.py", base="sub").matches("sub/deep/local.py", False)
+    assert not IgnoreRule("local.py", base="sub").matches("local.py", False)
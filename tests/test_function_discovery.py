@@ -1,4 +1,5 @@
 import pytest
+import os
 from pathlib import Path
 import tempfile
 from pytestgen.function_discovery import FunctionDiscovery
@@ -68,6 +69,7 @@ def add(a: int, b: int) -> int:
         assert func_info["function_name"] == "add"
         assert func_info["docstring"] == "Add two numbers."
         assert func_info["line_number"] == 1
+        assert func_info["end_line_number"] == 3
         assert not func_info["is_test"]
         
         # Check arguments
@@ -105,3 +107,268 @@ def test_add():
         # Check results
         assert len(untested) == 1
         assert untested[0]["function_name"] == "multiply"
+
+def test_discover_with_index_skips_unchanged_files(tmp_path):
+    from unittest.mock import patch
+    from pytestgen.discovery_index import DiscoveryIndex
+
+    (tmp_path / "a.py").write_text("def one():\n    return 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("def two():\n    return 2\n", encoding="utf-8")
+    index_path = tmp_path / ".pytestgen" / "discovery_index.json"
+
+    discovery = FunctionDiscovery(tmp_path, index=DiscoveryIndex(index_path))
+    assert sorted(f["function_name"] for f in discovery.discover()) == ["one", "two"]
+    assert index_path.exists()
+
+    # Edit one file, delete the other, and rerun with a freshly loaded index
+    (tmp_path / "a.py").write_text("def one():\n    return 1\n\ndef three():\n    return 3\n", encoding="utf-8")
+    (tmp_path / "b.py").unlink()
+
+    discovery = FunctionDiscovery(tmp_path, index=DiscoveryIndex(index_path))
+    with patch.object(FunctionDiscovery, "_parse_source", wraps=discovery._parse_source) as parse:
+        functions = discovery.discover()
+    assert sorted(f["function_name"] for f in functions) == ["one", "three"]
+    assert parse.call_count == 1
+
+    index = DiscoveryIndex(index_path)
+    assert list(index.entries) == [str(tmp_path / "a.py")]
+
+    # A touched but unchanged file is matched by content hash, not re-parsed
+    os.utime(tmp_path / "a.py", ns=(1, 1))
+    discovery = FunctionDiscovery(tmp_path, index=index)
+    with patch.object(FunctionDiscovery, "_parse_source") as parse:
+        functions = discovery.discover()
+    assert len(functions) == 2
+    parse.assert_not_called()
+
+def test_filtered_scans_keep_index_entries_of_other_files(tmp_path):
+    from pytestgen.discovery_index import DiscoveryIndex
+    from pytestgen.file_walker import FileWalker
+
+    (tmp_path / "a.py").write_text("def one():\n    return 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("def two():\n    return 2\n", encoding="utf-8")
+    index_path = tmp_path / "index.json"
+    FunctionDiscovery(tmp_path, index=DiscoveryIndex(index_path)).discover()
+
+    walker = FileWalker(tmp_path, include=["a.py"])
+    FunctionDiscovery(tmp_path, index=DiscoveryIndex(index_path), walker=walker).discover()
+    FunctionDiscovery(tmp_path, index=DiscoveryIndex(index_path), changed_lines={}).discover()
+
+    assert sorted(DiscoveryIndex(index_path).entries) == [str(tmp_path / "a.py"), str(tmp_path / "b.py")]
+
+def test_closing_a_partial_scan_saves_the_index(tmp_path):
+    from pytestgen.discovery_index import DiscoveryIndex
+
+    (tmp_path / "a.py").write_text("def one():\n    return 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("def two():\n    return 2\n", encoding="utf-8")
+    index_path = tmp_path / "index.json"
+
+    scan = FunctionDiscovery(tmp_path, index=DiscoveryIndex(index_path)).iter_untested_functions()
+    assert next(scan)["function_name"] == "one"
+    scan.close()
+
+    assert list(DiscoveryIndex(index_path).entries) == [str(tmp_path / "a.py")]
+
+def test_discover_with_index_logs_cached_syntax_errors(tmp_path, caplog):
+    from pytestgen.discovery_index import DiscoveryIndex
+
+    (tmp_path / "broken.py").write_text("def broken(:\n", encoding="utf-8")
+    index_path = tmp_path / "index.json"
+    FunctionDiscovery(tmp_path, index=DiscoveryIndex(index_path)).discover()
+
+    caplog.clear()
+    discovery = FunctionDiscovery(tmp_path, index=DiscoveryIndex(index_path))
+    assert discovery.discover() == []
+    assert "Syntax error in" in caplog.text
+
+def test_discover_with_workers_matches_serial(tmp_path, caplog):
+    from pytestgen.discovery_index import DiscoveryIndex
+
+    for i in range(12):
+        (tmp_path / f"module_{i}.py").write_text(
+            f"def func_{i}(x):\n    return x\n\ndef helper_{i}():\n    pass\n", encoding="utf-8"
+        )
+    (tmp_path / "broken.py").write_text("def broken(:\n", encoding="utf-8")
+
+    serial = FunctionDiscovery(tmp_path).discover()
+    caplog.clear()
+    parallel = FunctionDiscovery(tmp_path, workers=3).discover()
+
+    assert parallel == serial
+    assert len(parallel) == 24
+    assert "Syntax error in" in caplog.text
+
+    # Parallel parsing also fills the discovery index
+    index = DiscoveryIndex(tmp_path / "index.json")
+    FunctionDiscovery(tmp_path, index=index, workers=3).discover()
+    assert len(index.entries) == 13
+    assert FunctionDiscovery(tmp_path, index=index, workers=3).discover() == serial
+
+def test_workers_match_touched_files_by_content_hash(tmp_path):
+    from pytestgen.discovery_index import DiscoveryIndex
+    from pytestgen.function_discovery import _parse_chunk
+
+    for i in range(4):
+        (tmp_path / f"module_{i}.py").write_text(f"def func_{i}(x):\n    return x\n", encoding="utf-8")
+    index = DiscoveryIndex(tmp_path / "index.json")
+    expected = FunctionDiscovery(tmp_path, index=index).discover()
+    for i in range(4):
+        os.utime(tmp_path / f"module_{i}.py", ns=(1, 1))
+
+    # an unchanged file is hashed in the worker but not parsed
+    digest = index.entries[str(tmp_path / "module_0.py")]["sha256"]
+    [((functions, error, mtime_ns, _, _), exception)] = _parse_chunk(str(tmp_path), [str(tmp_path / "module_0.py")], [digest])
+    assert functions is None and exception is None and mtime_ns == 1
+
+    assert FunctionDiscovery(tmp_path, index=index, workers=2).discover() == expected
+    assert {entry["mtime_ns"] for entry in index.entries.values()} == {1}
+
+def test_is_test_function_requires_test_prefix():
+    discovery = FunctionDiscovery(Path("."))
+    assert discovery._is_test_function("test_add")
+    assert discovery._is_test_function("test")
+    assert discovery._is_test_function("testAdd")
+    assert not discovery._is_test_function("attest_signature")
+    assert not discovery._is_test_function("latest")
+    assert not discovery._is_test_function("testify")
+
+def test_get_untested_functions_maps_tests_to_targets(tmp_path):
+    (tmp_path / "module.py").write_text('''
+def add(a, b):
+    return a + b
+
+def subtract(a, b):
+    return a - b
+
+def parse_config(text):
+    return text
+
+def attest_signature(sig):
+    return sig
+
+class Parser:
+    def parse(self, text):
+        return text
+
+    def reset(self):
+        pass
+
+class Cache:
+    def reset(self):
+        pass
+'''.strip(), encoding="utf-8")
+    (tmp_path / "test_module.py").write_text('''
+def test_add_negative_numbers():
+    pass
+
+class TestParser:
+    def test_parse_empty(self):
+        pass
+
+class TestParseConfig:
+    def test_defaults(self):
+        pass
+'''.strip(), encoding="utf-8")
+
+    discovery = FunctionDiscovery(tmp_path)
+    discovery.discover()
+    untested = discovery.get_untested_functions()
+
+    names = sorted(
+        f"{f['class_name']}.{f['function_name']}" if f["class_name"] else f["function_name"]
+        for f in untested
+    )
+    assert names == ["Cache.reset", "Parser.reset", "attest_signature", "subtract"]
+
+def test_shortened_test_names_only_cover_their_module(tmp_path):
+    (tmp_path / "users.py").write_text("def get_user(uid):\n    return uid\n\ndef get(key):\n    return key\n", encoding="utf-8")
+    (tmp_path / "cache.py").write_text("def get(key):\n    return key\n\ndef get_user(uid):\n    return uid\n", encoding="utf-8")
+    (tmp_path / "test_users.py").write_text("def test_get_user_by_id():\n    pass\n", encoding="utf-8")
+
+    discovery = FunctionDiscovery(tmp_path)
+    discovery.discover()
+    untested = sorted(f"{Path(f['file_path']).stem}.{f['function_name']}" for f in discovery.get_untested_functions())
+
+    assert untested == ["cache.get", "cache.get_user"]
+
+def test_shortened_test_names_cover_modules_by_generated_file_name(tmp_path):
+    for package in ("app", "vendor"):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / "text.py").write_text("def slugify(text):\n    return text\n", encoding="utf-8")
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "tests" / "test_app_text.py").write_text("def test_slugify_spaces():\n    pass\n", encoding="utf-8")
+
+    discovery = FunctionDiscovery(tmp_path)
+    discovery.discover()
+    untested = [Path(f["file_path"]).parent.name for f in discovery.get_untested_functions()]
+
+    assert untested == ["vendor"]
+
+def test_get_untested_functions_uses_test_dirs(tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "module.py").write_text("def add(a, b):\n    return a + b\n\ndef mul(a, b):\n    return a * b\n", encoding="utf-8")
+    output_dir = tmp_path / "generated"
+    output_dir.mkdir()
+    (output_dir / "test_module.py").write_text("def test_mul_by_zero():\n    pass\n", encoding="utf-8")
+
+    discovery = FunctionDiscovery(project, test_dirs=[output_dir])
+    discovery.discover()
+    assert [f["function_name"] for f in discovery.get_untested_functions()] == ["add"]
+
+def test_iter_untested_functions_streams_and_matches_get_untested(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("def add(a, b):\n    return a + b\n\ndef sub(a, b):\n    return a - b\n", encoding="utf-8")
+    (tmp_path / "pkg" / "b.py").write_text("def mul(a, b):\n    return a * b\n", encoding="utf-8")
+    # tests live in a directory that sorts after the sources
+    (tmp_path / "tests" / "test_b.py").write_text("def test_mul():\n    pass\n\ndef make_fixture():\n    pass\n", encoding="utf-8")
+
+    discovery = FunctionDiscovery(tmp_path)
+    streamed = discovery.iter_untested_functions()
+    assert not isinstance(streamed, list)
+    names = [f["function_name"] for f in streamed]
+    assert sorted(names) == ["add", "make_fixture", "sub"]
+    assert discovery.discovered_functions == []
+
+    batch = FunctionDiscovery(tmp_path)
+    batch.discover()
+    assert sorted(f["function_name"] for f in batch.get_untested_functions()) == sorted(names)
+
+def test_extract_function_info_complexity(tmp_path):
+    (tmp_path / "branchy.py").write_text(
+        "def straight(x):\n"
+        "    return x\n"
+        "\n"
+        "def branchy(items, flag):\n"
+        "    if flag and items:\n"
+        "        return [i for i in items if i]\n"
+        "    for item in items:\n"
+        "        try:\n"
+        "            item()\n"
+        "        except ValueError:\n"
+        "            pass\n"
+        "    return None\n",
+        encoding="utf-8",
+    )
+
+    functions = {f["function_name"]: f for f in FunctionDiscovery(tmp_path).discover()}
+
+    assert functions["straight"]["complexity"] == 1
+    # if, and, comprehension + its filter, for, except
+    assert functions["branchy"]["complexity"] == 7
+
+def test_discovery_records_stage_metrics(tmp_path):
+    from pytestgen.discovery_index import DiscoveryIndex
+
+    (tmp_path / "mod.py").write_text("def f():\n    pass\n", encoding="utf-8")
+    index = DiscoveryIndex(tmp_path / "index.json")
+    FunctionDiscovery(tmp_path, index=index).discover()
+    discovery = FunctionDiscovery(tmp_path, index=DiscoveryIndex(tmp_path / "index.json"))
+    discovery.discover()
+
+    summary = discovery.metrics.summary()
+    assert summary["stages"]["walk"]["calls"] == 1
+    assert summary["stages"]["parse"]["calls"] == 1
+    assert summary["counters"]["files_found"] == 1
+    assert summary["counters"]["index_hits"] == 1
@@ -0,0 +1,73 @@
+import json
+import pickle
+
+from pytestgen.discovery_index import DiscoveryIndex
+from pytestgen.function_discovery import FunctionDiscovery
+from pytestgen.function_info import FunctionInfo
+
+SOURCE = '''
+class Calculator:
+    def add(self, a: int, b: int) -> int:
+        """Add two numbers."""
+        return a + b
+'''
+
+def test_function_info_dict_compatibility():
+    info = FunctionInfo(
+        file_path="calc.py",
+        function_name="add",
+        class_name="Calculator",
+        arg_specs=(("self", None), ("a", "int")),
+        line_number=3,
+        end_line_number=5,
+        docstring="Add two numbers.",
+    )
+
+    assert info["function_name"] == "add"
+    assert info.get("class_name") == "Calculator"
+    assert info.get("missing", "default") == "default"
+    assert info["args"] == [{"name": "self", "annotation": None}, {"name": "a", "annotation": "int"}]
+    assert "docstring" in info
+    assert dict(info) == info.to_dict()
+    assert FunctionInfo.from_dict(dict(info)) == info
+    assert json.loads(json.dumps(dict(info)))["args"][1]["name"] == "a"
+
+def test_docstring_and_source_load_lazily(tmp_path):
+    (tmp_path / "calc.py").write_text(SOURCE.strip() + "\n", encoding="utf-8")
+
+    [info] = FunctionDiscovery(tmp_path).discover()
+
+    assert isinstance(info, FunctionInfo)
+    assert info._docstring is ...
+    assert info["docstring"] == "Add two numbers."
+    assert info.source.startswith("    def add(self, a: int, b: int) -> int:")
+    assert info.source.endswith("return a + b")
+
+def test_fingerprint_is_computed_on_first_access(tmp_path):
+    (tmp_path / "calc.py").write_text(SOURCE.strip() + "\n", encoding="utf-8")
+    (tmp_path / "copy.py").write_text("\n\n" + SOURCE.strip() + "\n", encoding="utf-8")
+
+    first, second = sorted(FunctionDiscovery(tmp_path).discover(), key=lambda info: info.file_path)
+
+    assert first._fingerprint is ... and second._fingerprint is ...
+    assert first["fingerprint"] == second["fingerprint"] is not None
+
+def test_function_info_pickles_and_interns(tmp_path):
+    (tmp_path / "calc.py").write_text(SOURCE.strip() + "\n", encoding="utf-8")
+    [info] = FunctionDiscovery(tmp_path).discover()
+
+    copy = pickle.loads(pickle.dumps(info))
+
+    assert copy == info
+    assert copy.file_path is info.file_path
+
+def test_index_stores_records_without_docstrings(tmp_path):
+    (tmp_path / "calc.py").write_text(SOURCE.strip() + "\n", encoding="utf-8")
+    index = DiscoveryIndex(tmp_path / "index.json")
+    FunctionDiscovery(tmp_path, index=index).discover()
+
+    [record] = next(iter(index.entries.values()))["functions"]
+    assert "docstring" not in record and "fingerprint" not in record
+
+    [info] = FunctionDiscovery(tmp_path, index=DiscoveryIndex(tmp_path / "index.json")).discover()
+    assert info["docstring"] == "Add two numbers."
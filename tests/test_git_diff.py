@@ -0,0 +1,78 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from pytestgen.function_discovery import FunctionDiscovery
+from pytestgen.git_diff import GitDiffError, changed_lines, overlaps, parse_diff
+
+DIFF = """diff --git a/pkg/mod.py b/pkg/mod.py
+index 1111111..2222222 100644
+--- a/pkg/mod.py
++++ b/pkg/mod.py
+@@ -3 +3 @@ def f():
+-    return 1
++    return 2
+@@ -10,2 +10,0 @@ def g():
+-    x = 1
+-    y = 2
+@@ -20,0 +19,3 @@
++def h():
++    pass
++
+diff --git a/old.py b/old.py
+deleted file mode 100644
+--- a/old.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+-def gone():
+-    pass
+"""
+
+def test_parse_diff_new_side_ranges(tmp_path):
+    changed = parse_diff(DIFF, tmp_path)
+
+    assert changed == {tmp_path / "pkg" / "mod.py": [(3, 3), (10, 11), (19, 21)]}
+
+def test_overlaps():
+    assert overlaps([(3, 3)], 1, 4)
+    assert overlaps([(10, 11)], 11, 15)
+    assert not overlaps([(3, 3), (19, 21)], 5, 18)
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+@pytest.fixture
+def repo(tmp_path):
+    try:
+        _git(tmp_path, "init", "-q")
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        pytest.skip("git is not available")
+    _git(tmp_path, "config", "user.email", "dev@example.com")
+    _git(tmp_path, "config", "user.name", "dev")
+    (tmp_path / "calc.py").write_text(
+        "def add(a, b):\n    return a + b\n\n\ndef sub(a, b):\n    return a - b\n", encoding="utf-8"
+    )
+    (tmp_path / "other.py").write_text("def untouched():\n    pass\n", encoding="utf-8")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+def test_discovery_limited_to_changed_functions(repo):
+    (repo / "calc.py").write_text(
+        "def add(a, b):\n    return a + b\n\n\ndef sub(a, b):\n    return b - a\n", encoding="utf-8"
+    )
+    (repo / "new.py").write_text("def fresh():\n    pass\n", encoding="utf-8")
+
+    changed = changed_lines(repo, "HEAD")
+    assert changed[(repo / "calc.py").resolve()] == [(6, 6)]
+
+    discovery = FunctionDiscovery(repo.resolve(), changed_lines=changed)
+    names = sorted(func["function_name"] for func in discovery.iter_untested_functions())
+
+    assert names == ["fresh", "sub"]
+    assert discovery.metrics.summary()["counters"]["files_processed"] == 2
+
+def test_changed_lines_unknown_ref(repo):
+    with pytest.raises(GitDiffError):
+        changed_lines(repo, "no-such-ref")
@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock
+
+from pytestgen.journal import ProgressJournal
+from pytestgen.test_generator import TestGenerator, TestGenerationResult
+
+def _function(name, class_name=None):
+    return {"file_path": "calc.py", "function_name": name, "class_name": class_name, "args": [], "docstring": None}
+
+def _response(content):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+def test_journal_replays_successful_results(tmp_path):
+    path = tmp_path / "journal.ndjson"
+    with ProgressJournal(path) as journal:
+        journal.record(TestGenerationResult(function_info=_function("add"), test_code="def test_add():\n    pass"))
+        journal.record(TestGenerationResult(function_info=_function("sub"), test_code="", error="timeout"))
+        journal.record(TestGenerationResult(function_info=_function("add", "Calc"), test_code="def test_calc_add():\n    pass"))
+
+    journal = ProgressJournal(path, resume=True)
+    replayed = journal.replay(_function("add"))
+
+    assert len(journal) == 2
+    assert replayed.test_code == "def test_add():\n    pass"
+    assert replayed.cached
+    assert journal.replay(_function("sub")) is None
+    assert journal.replay(_function("add", "Calc")).test_code == "def test_calc_add():\n    pass"
+    journal.close()
+
+def test_journal_does_not_replay_edited_functions(tmp_path):
+    path = tmp_path / "journal.ndjson"
+    with ProgressJournal(path) as journal:
+        journal.record(TestGenerationResult(function_info=dict(_function("add"), fingerprint="old"), test_code="def test_add():\n    pass"))
+        journal.record(TestGenerationResult(function_info=dict(_function("sub"), line_number=4), test_code="def test_sub():\n    pass"))
+
+    with ProgressJournal(path, resume=True) as journal:
+        assert journal.replay(dict(_function("add"), fingerprint="old")) is not None
+        assert journal.replay(dict(_function("add"), fingerprint="new")) is None
+        # without fingerprints, a moved function counts as edited
+        assert journal.replay(dict(_function("sub"), line_number=4)) is not None
+        assert journal.replay(dict(_function("sub"), line_number=9)) is None
+
+def test_journal_without_resume_starts_over(tmp_path):
+    path = tmp_path / "journal.ndjson"
+    with ProgressJournal(path) as journal:
+        journal.record(TestGenerationResult(function_info=_function("add"), test_code="def test_add():\n    pass"))
+
+    with ProgressJournal(path) as journal:
+        assert len(journal) == 0
+    assert path.read_text(encoding="utf-8") == ""
+
+def test_journal_survives_torn_last_line(tmp_path):
+    path = tmp_path / "journal.ndjson"
+    with ProgressJournal(path) as journal:
+        journal.record(TestGenerationResult(function_info=_function("add"), test_code="def test_add():\n    pass"))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"version":1,"file_path":"calc.py","func')
+
+    with ProgressJournal(path, resume=True) as journal:
+        assert len(journal) == 1
+        journal.record(TestGenerationResult(function_info=_function("sub"), test_code="def test_sub():\n    pass"))
+
+    with ProgressJournal(path, resume=True) as journal:
+        assert journal.replay(_function("sub")).test_code == "def test_sub():\n    pass"
+
+def test_generator_skips_journaled_functions(tmp_path):
+    path = tmp_path / "journal.ndjson"
+    with ProgressJournal(path) as journal:
+        journal.record(TestGenerationResult(function_info=_function("add"), test_code="def test_add():\n    pass"))
+
+    with ProgressJournal(path, resume=True) as journal:
+        generator = TestGenerator(api_key="test-key", concurrency=2, journal=journal)
+        generator.client = MagicMock()
+        generator.client.chat.completions.create.return_value = _response("def test_sub():\n    pass")
+        results = generator.generate_tests_for_functions([_function("add"), _function("sub")])
+
+    assert [r.test_code for r in results] == ["def test_add():\n    pass", "def test_sub():\n    pass"]
+    assert generator.client.chat.completions.create.call_count == 1
+    assert generator.metrics.summary()["counters"]["journal_replays"] == 1
+    with ProgressJournal(path, resume=True) as journal:
+        assert len(journal) == 2
@@ -0,0 +1,32 @@
+import json
+from pytestgen.metrics import Metrics, percentile
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+def test_metrics_summary(tmp_path):
+    metrics = Metrics()
+    with metrics.stage("parse"):
+        pass
+    with metrics.stage("parse"):
+        pass
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        metrics.observe("request_latency_seconds", latency)
+    metrics.count("cache_hits", 3)
+    metrics.count("cache_misses")
+
+    path = tmp_path / "metrics.json"
+    metrics.write_json(path)
+    summary = json.loads(path.read_text())
+
+    assert summary["stages"]["parse"]["calls"] == 2
+    assert summary["stages"]["parse"]["wall_seconds"] >= 0
+    latency = summary["histograms"]["request_latency_seconds"]
+    assert latency["count"] == 4
+    assert (latency["p50"], latency["p99"], latency["max"]) == (0.2, 0.4, 0.4)
+    assert summary["cache_hit_rate"] == 0.75
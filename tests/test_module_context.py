@@ -0,0 +1,62 @@
+from pytestgen.module_context import module_context
+
+SOURCE = '''"""Shapes."""
+import math
+from typing import List
+
+UNIT = 1.0
+TABLE = {"a": "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa", "b": "bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb", "c": "cccccccccccccccccccccccc"}
+
+class Circle:
+    """A circle.
+
+    With a radius.
+    """
+    sides = 0
+
+    def __init__(self, radius: float):
+        self.radius = radius
+
+    @property
+    def area(self) -> float:
+        """Area of the circle."""
+        return math.pi * self.radius ** 2
+
+def total(shapes: List[Circle]) -> float: return sum(s.area for s in shapes)
+'''
+
+def test_module_context_outlines_module(tmp_path):
+    path = tmp_path / "shapes.py"
+    path.write_text(SOURCE, encoding="utf-8")
+
+    assert module_context(str(path)) == '''import math
+from typing import List
+UNIT = 1.0
+TABLE = ...
+
+class Circle:
+    """A circle."""
+    sides = 0
+    def __init__(self, radius: float):
+        ...
+    @property
+    def area(self) -> float:
+        """Area of the circle."""
+
+def total(shapes: List[Circle]) -> float:
+    ...'''
+
+def test_module_context_follows_file_changes(tmp_path):
+    path = tmp_path / "shapes.py"
+    path.write_text("import os\n", encoding="utf-8")
+    assert module_context(str(path)) == "import os"
+
+    path.write_text("import os\nimport sys\n", encoding="utf-8")
+    assert module_context(str(path)) == "import os\nimport sys"
+
+def test_module_context_of_unparsable_file_is_empty(tmp_path):
+    path = tmp_path / "broken.py"
+    path.write_text("def broken(:\n", encoding="utf-8")
+
+    assert module_context(str(path)) == ""
+    assert module_context(str(tmp_path / "missing.py")) == ""
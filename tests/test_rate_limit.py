@@ -0,0 +1,96 @@
+import time
+from unittest.mock import MagicMock, patch
+import openai
+import pytest
+from pytestgen.rate_limit import (
+    AdaptiveConcurrency, RequestScheduler, RetriesExhaustedError, RetryPolicy, TokenBucket, retry_after_seconds
+)
+
+def _status_error(cls, status_code, headers=None):
+    response = MagicMock(status_code=status_code, headers=headers or {})
+    return cls(f"HTTP {status_code}", response=response, body=None)
+
+def test_retries_transient_errors_and_counts_them():
+    request = MagicMock(side_effect=[
+        _status_error(openai.RateLimitError, 429, {"retry-after": "0"}),
+        _status_error(openai.InternalServerError, 503),
+        "ok",
+    ])
+    scheduler = RequestScheduler(retry_policy=RetryPolicy(max_retries=3, base_delay=0.001))
+
+    assert scheduler.call(request) == ("ok", 2)
+    assert request.call_count == 3
+
+def test_non_retryable_errors_fail_immediately():
+    request = MagicMock(side_effect=_status_error(openai.BadRequestError, 400))
+    scheduler = RequestScheduler(retry_policy=RetryPolicy(max_retries=3, base_delay=0.001))
+
+    with pytest.raises(openai.BadRequestError):
+        scheduler.call(request)
+    assert request.call_count == 1
+
+def test_exhausted_retries_keep_last_error_message():
+    request = MagicMock(side_effect=_status_error(openai.RateLimitError, 429, {"retry-after-ms": "1"}))
+    scheduler = RequestScheduler(retry_policy=RetryPolicy(max_retries=2))
+
+    with pytest.raises(RetriesExhaustedError) as excinfo:
+        scheduler.call(request)
+    assert excinfo.value.retries == 2
+    assert str(excinfo.value) == "HTTP 429"
+
+def test_retry_after_header_is_honored():
+    policy = RetryPolicy(base_delay=0.001, max_delay=30)
+    assert retry_after_seconds(_status_error(openai.RateLimitError, 429, {"retry-after": "7"})) == 7.0
+    assert retry_after_seconds(_status_error(openai.RateLimitError, 429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(_status_error(openai.RateLimitError, 429)) is None
+    assert policy.delay(0, retry_after=7.0) == 7.0
+    assert policy.delay(0, retry_after=120.0) == 30
+    assert 0 <= policy.delay(3) <= 0.008
+
+def test_throttling_shrinks_and_recovers_concurrency():
+    limiter = AdaptiveConcurrency(8)
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.on_success()
+    assert limiter.limit == 3
+
+    scheduler = RequestScheduler(max_concurrency=4, retry_policy=RetryPolicy(base_delay=0.001))
+    request = MagicMock(side_effect=[_status_error(openai.RateLimitError, 429, {"retry-after": "0"}), "ok"])
+    scheduler.call(request)
+    assert scheduler.concurrency.limit == 2
+
+def test_token_bucket_enforces_rate():
+    bucket = TokenBucket(per_minute=600, capacity=2)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    # two requests burst, the next two wait 0.1s each
+    assert time.monotonic() - start >= 0.15
+
+def test_generator_reports_retries(tmp_path):
+    from pytestgen.test_generator import TestGenerator
+
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "def test_f():\n    pass"
+    generator = TestGenerator(
+        api_key="test-key",
+        scheduler=RequestScheduler(retry_policy=RetryPolicy(max_retries=3, base_delay=0.001)),
+    )
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.side_effect = [
+        _status_error(openai.RateLimitError, 429, {"retry-after": "0"}),
+        response,
+    ]
+    function_info = {"function_name": "f", "args": [], "docstring": None}
+
+    result = generator.generate_test(function_info)
+    assert result.error is None
+    assert result.retries == 1
+
+    generator.client.chat.completions.create.side_effect = _status_error(openai.InternalServerError, 500)
+    result = generator.generate_test(function_info)
+    assert result.error == "HTTP 500"
+    assert result.retries == 3
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from pytestgen.sharding import in_shard, merge_bundles, parse_shard, shard_key, shard_of, write_bundle
+from pytestgen.test_generator import TestGenerationResult
+
+def _function(file_path, name, line=1, class_name=None):
+    return {
+        "file_path": str(file_path), "function_name": name, "class_name": class_name,
+        "line_number": line, "args": [], "is_test": False,
+    }
+
+def test_parse_shard():
+    assert parse_shard("2/8") == (2, 8)
+    for spec in ("0/4", "5/4", "1/0", "2", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+def test_shards_partition_functions_the_same_way_in_any_checkout(tmp_path):
+    functions = [_function(tmp_path / f"pkg/mod{i % 7}.py", f"func{i}", i) for i in range(200)]
+    other_checkout = [dict(f, file_path=f["file_path"].replace(str(tmp_path), "/elsewhere")) for f in functions]
+
+    shards = [list(in_shard(functions, index, 4, tmp_path)) for index in range(1, 5)]
+
+    assert sorted(f["function_name"] for shard in shards for f in shard) == sorted(f["function_name"] for f in functions)
+    assert all(shards)
+    assert shard_key(functions[3], tmp_path) == "pkg/mod3.py:func3"
+    assert shard_key(_function(tmp_path / "a.py", "run", class_name="Job"), tmp_path) == "a.py:Job.run"
+    assert [shard_of(f, 4, tmp_path) for f in functions] == [shard_of(f, 4, "/elsewhere") for f in other_checkout]
+
+def test_merge_is_deterministic_and_prefers_successful_results(tmp_path):
+    results = [
+        TestGenerationResult(function_info=_function(tmp_path / "b.py", "beta", 5), test_code="def test_beta(): pass"),
+        TestGenerationResult(function_info=_function(tmp_path / "a.py", "alpha", 9), test_code="", error="boom"),
+        TestGenerationResult(function_info=_function(tmp_path / "a.py", "first", 2), test_code="def test_first(): pass"),
+    ]
+    list(write_bundle(tmp_path / "s1.json", results[:2], 1, 2, tmp_path))
+    retried = TestGenerationResult(function_info=_function(tmp_path / "a.py", "alpha", 9), test_code="def test_alpha(): pass")
+    list(write_bundle(tmp_path / "s2.json", [results[2], retried], 2, 2, tmp_path))
+
+    bundle = json.loads((tmp_path / "s1.json").read_text(encoding="utf-8"))
+    assert bundle["results"][0]["function"]["file_path"] == "b.py"
+
+    merged, missing = merge_bundles([tmp_path / "s2.json", tmp_path / "s1.json"], tmp_path)
+    again, _ = merge_bundles([tmp_path / "s1.json", tmp_path / "s2.json"], tmp_path)
+
+    assert missing == []
+    assert [r.function_info["function_name"] for r in merged] == ["first", "alpha", "beta"]
+    assert [r.test_code for r in merged] == [r.test_code for r in again]
+    assert merged[1].error is None
+    assert merged[0].function_info["file_path"] == str(tmp_path / "a.py")
+
+def test_merge_keeps_definitions_sharing_a_qualified_name(tmp_path):
+    getter = _function(tmp_path / "a.py", "value", 3, class_name="Box")
+    setter = _function(tmp_path / "a.py", "value", 7, class_name="Box")
+    assert shard_key(getter, tmp_path) == shard_key(setter, tmp_path)
+    list(write_bundle(tmp_path / "s1.json", [
+        TestGenerationResult(function_info=getter, test_code="def test_value(): pass"),
+        TestGenerationResult(function_info=setter, test_code="def test_value_setter(): pass"),
+    ], 1, 1, tmp_path))
+
+    merged, _ = merge_bundles([tmp_path / "s1.json"], tmp_path)
+
+    assert [r.test_code for r in merged] == ["def test_value(): pass", "def test_value_setter(): pass"]
+
+def test_merge_reports_missing_shards_and_rejects_mixed_counts(tmp_path):
+    list(write_bundle(tmp_path / "s1.json", [], 1, 3, tmp_path))
+    assert merge_bundles([tmp_path / "s1.json"], tmp_path) == ([], [2, 3])
+
+    list(write_bundle(tmp_path / "other.json", [], 1, 2, tmp_path))
+    with pytest.raises(ValueError):
+        merge_bundles([tmp_path / "s1.json", tmp_path / "other.json"], tmp_path)
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from pytestgen.streaming import CodeStream, consume_stream
+from pytestgen.test_generator import TestGenerator
+
+def _chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+def test_code_stream_stops_at_closing_fence():
+    code = CodeStream()
+
+    assert [code.feed(delta) for delta in ["```py", "thon\ndef test_a():\n", "    pass\n``", "`\nThis test"]] == [
+        False, False, False, True
+    ]
+    assert code.text == "```python\ndef test_a():\n    pass\n```"
+
+def test_code_stream_without_fence_runs_to_the_end():
+    code = CodeStream()
+
+    assert not code.feed("def test_a():\n    pass\n")
+    assert not code.feed("```\n")
+    assert code.text == "def test_a():\n    pass\n```\n"
+
+def test_consume_stream_closes_early_and_keeps_first_token_time():
+    stream = FakeStream([_chunk("```python\n"), _chunk("def test_a():\n    pass\n"), _chunk("```"), _chunk("Bye")])
+
+    result = consume_stream(stream, max_tokens=100, started=0.0)
+
+    assert result.cancelled and stream.closed
+    assert stream.read == 3
+    assert result.text == "```python\ndef test_a():\n    pass\n```"
+    assert result.time_to_first_token > 0
+
+def test_consume_stream_enforces_output_budget():
+    stream = FakeStream([_chunk("x")] * 10)
+
+    result = consume_stream(stream, max_tokens=3)
+
+    assert result.cancelled
+    assert result.text == "xxxx"
+
+def test_consume_stream_keeps_usage_chunk():
+    usage = SimpleNamespace(prompt_tokens=50, completion_tokens=5)
+    stream = FakeStream([_chunk("def test_a():\n    pass"), _chunk(usage=usage)])
+
+    result = consume_stream(stream, max_tokens=100)
+
+    assert not result.cancelled
+    assert result.usage is usage
+
+def test_generator_streams_and_records_time_to_first_token():
+    generator = TestGenerator(api_key="test-key", stream=True)
+    generator.client = MagicMock()
+    stream = FakeStream([_chunk("```python\ndef test_f():\n    pass\n```\n"), _chunk("Explanation")])
+    generator.client.chat.completions.create.return_value = stream
+
+    result = generator.generate_test({"function_name": "f", "args": [], "docstring": None})
+
+    assert result.test_code == "def test_f():\n    pass"
+    assert generator.client.chat.completions.create.call_args.kwargs["stream"] is True
+    assert stream.read == 1
+    summary = generator.metrics.summary()
+    assert summary["counters"]["streams_cancelled"] == 1
+    assert summary["histograms"]["time_to_first_token_seconds"]["count"] == 1
+
+def test_generator_estimates_usage_of_stream_closed_at_fence():
+    generator = TestGenerator(api_key="test-key", stream=True)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.return_value = FakeStream([
+        _chunk("```python\n"), _chunk("def test_f():\n    pass\n"), _chunk("```"),
+        _chunk(usage=SimpleNamespace(prompt_tokens=50, completion_tokens=5)),
+    ])
+
+    result = generator.generate_test({"function_name": "f", "args": [], "docstring": None})
+
+    assert result.prompt_tokens > 0 and result.completion_tokens >= 3
+    counters = generator.metrics.summary()["counters"]
+    assert counters["usage_estimated"] == 1
+    assert counters["prompt_tokens"] == result.prompt_tokens
@@ -1,6 +1,12 @@
 import pytest
+import openai
 from unittest.mock import patch, MagicMock
+from pytestgen.rate_limit import RequestScheduler, RetryPolicy
 from pytestgen.test_generator import TestGenerator, TestGenerationResult
+from pytestgen.tokens import estimate_tokens
+
+def _status_error(cls, status_code):
+    return cls(f"HTTP {status_code}", response=MagicMock(status_code=status_code, headers={}), body=None)
 
 def test_generate_prompt():
     # Create a mock function info
@@ -96,3 +102,420 @@ def test_generate_test_error():
         assert result.function_info == function_info
         assert result.test_code == ""
         assert "API error" in result.error
+
+def _make_function_info(name):
+    return {
+        "function_name": name,
+        "args": [],
+        "docstring": None,
+        "line_number": 1,
+        "is_test": False
+    }
+
+def _make_response(content):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+def test_generate_tests_for_functions_concurrent_keeps_order():
+    import time
+
+    # Later functions answer faster, so completion order differs from input order
+    delays = {"f0": 0.06, "f1": 0.04, "f2": 0.02, "f3": 0.0}
+
+    def fake_create(**kwargs):
+        prompt = kwargs["messages"][1]["content"]
+        name = next(n for n in delays if f"def {n}(" in prompt)
+        time.sleep(delays[name])
+        return _make_response(f"def test_{name}():\n    pass")
+
+    generator = TestGenerator(api_key="test-key", concurrency=4, timeout=5)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.side_effect = fake_create
+
+    functions = [_make_function_info(name) for name in delays]
+    results = generator.generate_tests_for_functions(functions)
+
+    assert [r.function_info["function_name"] for r in results] == list(delays)
+    assert all(r.error is None for r in results)
+    assert results[0].test_code == "def test_f0():\n    pass"
+    for call in generator.client.chat.completions.create.call_args_list:
+        assert call.kwargs["timeout"] == 5
+
+def test_generate_tests_for_functions_concurrent_isolates_errors():
+    def fake_create(**kwargs):
+        if "def broken(" in kwargs["messages"][1]["content"]:
+            raise TimeoutError("Request timed out.")
+        return _make_response("def test_ok():\n    pass")
+
+    generator = TestGenerator(api_key="test-key", concurrency=2)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.side_effect = fake_create
+
+    results = generator.generate_tests_for_functions(
+        [_make_function_info("ok"), _make_function_info("broken")]
+    )
+
+    assert results[0].error is None
+    assert results[1].test_code == ""
+    assert "timed out" in results[1].error
+    assert "timeout" not in generator.client.chat.completions.create.call_args_list[0].kwargs
+
+def test_generate_test_uses_cache(tmp_path):
+    from pytestgen.cache import ResponseCache
+
+    cache = ResponseCache(tmp_path)
+    generator = TestGenerator(api_key="test-key", cache=cache)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.return_value = _make_response(
+        "```python\ndef test_add():\n    assert add(1, 2) == 3\n```"
+    )
+    function_info = _make_function_info("add")
+
+    first = generator.generate_test(function_info)
+    second = generator.generate_test(function_info)
+
+    assert not first.cached
+    assert second.cached
+    assert second.test_code == first.test_code == "def test_add():\n    assert add(1, 2) == 3"
+    assert generator.client.chat.completions.create.call_count == 1
+
+    # A different model must not reuse the cached completion
+    generator.model = "gpt-4o-mini"
+    generator.generate_test(function_info)
+    assert generator.client.chat.completions.create.call_count == 2
+
+def test_iter_tests_for_functions_consumes_input_lazily():
+    consumed = []
+
+    def functions():
+        for i in range(20):
+            consumed.append(i)
+            yield _make_function_info(f"f{i}")
+
+    generator = TestGenerator(api_key="test-key", concurrency=2)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.return_value = _make_response("def test_f():\n    pass")
+
+    results = generator.iter_tests_for_functions(functions())
+    first = next(results)
+
+    assert first.function_info["function_name"] == "f0"
+    # only a bounded window of functions has been pulled from the input
+    assert len(consumed) <= 2 * generator.concurrency
+    rest = list(results)
+    assert [r.function_info["function_name"] for r in rest] == [f"f{i}" for i in range(1, 20)]
+
+def _make_module_function(name, file_path="module.py"):
+    function_info = _make_function_info(name)
+    function_info["file_path"] = file_path
+    return function_info
+
+def test_pack_groups_functions_by_file_within_budget():
+    generator = TestGenerator(api_key="test-key", pack_token_budget=200)
+    functions = [
+        _make_module_function("a"),
+        _make_module_function("b"),
+        _make_module_function("c"),
+        _make_module_function("d", file_path="other.py"),
+    ]
+
+    packs = [[f["function_name"] for f in pack] for pack in generator._iter_packs(functions)]
+
+    # every signature block costs 14 tokens on top of the fixed overhead
+    assert packs == [["a", "b", "c"], ["d"]]
+    generator.pack_token_budget = 180
+    assert [len(pack) for pack in generator._iter_packs(functions)] == [2, 1, 1]
+
+def test_packed_request_is_split_per_function():
+    generator = TestGenerator(api_key="test-key", pack_token_budget=4000)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.return_value = _make_response(
+        "```python\n"
+        "# === pytestgen function 1: add ===\n"
+        "def test_add():\n    assert add(1, 2) == 3\n"
+        "# === pytestgen function 2: sub ===\n"
+        "def test_sub():\n    assert sub(3, 2) == 1\n"
+        "```"
+    )
+
+    results = generator.generate_tests_for_functions(
+        [_make_module_function("add"), _make_module_function("sub")]
+    )
+
+    assert generator.client.chat.completions.create.call_count == 1
+    prompt = generator.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "def add(" in prompt and "def sub(" in prompt
+    assert [r.test_code for r in results] == [
+        "def test_add():\n    assert add(1, 2) == 3",
+        "def test_sub():\n    assert sub(3, 2) == 1",
+    ]
+
+def test_packed_request_falls_back_when_unparseable():
+    generator = TestGenerator(api_key="test-key", pack_token_budget=4000)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.side_effect = [
+        _make_response("def test_add():\n    pass\n\ndef test_sub():\n    pass"),
+        _make_response("def test_add():\n    pass"),
+        _make_response("def test_sub():\n    pass"),
+    ]
+
+    results = generator.generate_tests_for_functions(
+        [_make_module_function("add"), _make_module_function("sub")]
+    )
+
+    assert generator.client.chat.completions.create.call_count == 3
+    assert [r.test_code for r in results] == ["def test_add():\n    pass", "def test_sub():\n    pass"]
+    assert all(r.error is None for r in results)
+
+def test_packed_sections_keep_shared_imports():
+    generator = TestGenerator(api_key="test-key", pack_token_budget=4000)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.return_value = _make_response(
+        "```python\n"
+        "import pytest\n"
+        "from calc import add, sub\n\n"
+        "# === pytestgen function 1: add ===\n"
+        "def test_add():\n    assert add(1, 2) == 3\n"
+        "# === pytestgen function 2: sub ===\n"
+        "def test_sub():\n    assert sub(3, 2) == 1\n"
+        "```"
+    )
+
+    results = generator.generate_tests_for_functions(
+        [_make_module_function("add"), _make_module_function("sub")]
+    )
+
+    assert [r.test_code for r in results] == [
+        "import pytest\nfrom calc import add, sub\n\ndef test_add():\n    assert add(1, 2) == 3",
+        "import pytest\nfrom calc import add, sub\n\ndef test_sub():\n    assert sub(3, 2) == 1",
+    ]
+
+def test_packed_request_does_not_fan_out_after_retries_exhausted():
+    generator = TestGenerator(
+        api_key="test-key", pack_token_budget=4000,
+        scheduler=RequestScheduler(retry_policy=RetryPolicy(max_retries=1, base_delay=0.001))
+    )
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.side_effect = _status_error(openai.RateLimitError, 429)
+
+    results = generator.generate_tests_for_functions(
+        [_make_module_function("add"), _make_module_function("sub")]
+    )
+
+    assert generator.client.chat.completions.create.call_count == 2
+    assert all(r.error and r.retries == 1 for r in results)
+
+def test_packed_request_falls_back_when_too_large():
+    generator = TestGenerator(api_key="test-key", pack_token_budget=4000)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.side_effect = [
+        _status_error(openai.APIStatusError, 413),
+        _make_response("def test_add():\n    pass"),
+        _make_response("def test_sub():\n    pass"),
+    ]
+
+    results = generator.generate_tests_for_functions(
+        [_make_module_function("add"), _make_module_function("sub")]
+    )
+
+    assert generator.client.chat.completions.create.call_count == 3
+    assert [r.test_code for r in results] == ["def test_add():\n    pass", "def test_sub():\n    pass"]
+
+def test_prompt_budget_compacts_long_docstring():
+    generator = TestGenerator(api_key="test-key", prompt_token_budget=150)
+    function_info = _make_function_info("parse")
+    function_info["docstring"] = "Parse the input. " + "More detail. " * 500
+
+    prompt = generator._generate_prompt(function_info)
+
+    assert "Parse the input." in prompt
+    assert "[...]" in prompt
+    assert estimate_tokens(prompt) <= 150
+    generator.prompt_token_budget = 0
+    assert "[...]" not in generator._generate_prompt(function_info)
+
+def test_generate_test_sizes_max_tokens_and_records_usage():
+    generator = TestGenerator(api_key="test-key")
+    generator.client = MagicMock()
+    response = _make_response("def test_f():\n    pass")
+    response.usage.prompt_tokens = 120
+    response.usage.completion_tokens = 30
+    generator.client.chat.completions.create.return_value = response
+    function_info = _make_function_info("f")
+    function_info["complexity"] = 3
+
+    result = generator.generate_test(function_info)
+
+    assert generator.client.chat.completions.create.call_args.kwargs["max_tokens"] == 600
+    assert result.prompt_tokens == 120
+    assert result.completion_tokens == 30
+    assert result.estimated_prompt_tokens == estimate_tokens(generator._generate_prompt(function_info))
+
+def test_packed_usage_is_split_across_results():
+    generator = TestGenerator(api_key="test-key", pack_token_budget=4000)
+    generator.client = MagicMock()
+    response = _make_response(
+        "# === pytestgen function 1: add ===\ndef test_add():\n    pass\n"
+        "# === pytestgen function 2: sub ===\ndef test_sub():\n    pass\n"
+    )
+    response.usage.prompt_tokens = 101
+    response.usage.completion_tokens = 40
+    generator.client.chat.completions.create.return_value = response
+
+    results = generator.generate_tests_for_functions(
+        [_make_module_function("add"), _make_module_function("sub")]
+    )
+
+    assert generator.client.chat.completions.create.call_args.kwargs["max_tokens"] == 800
+    assert [r.prompt_tokens for r in results] == [51, 50]
+    assert [r.completion_tokens for r in results] == [20, 20]
+
+def test_invalid_tests_are_regenerated_with_problem_in_prompt():
+    from pytestgen.validation import TestValidator
+
+    generator = TestGenerator(api_key="test-key", validator=TestValidator(), max_attempts=2)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.side_effect = [
+        _make_response("def test_add(:\n    pass"),
+        _make_response("from module import add\n\ndef test_add():\n    assert add(1, 2) == 3"),
+    ]
+
+    [result] = generator.generate_tests_for_functions([_make_module_function("add")])
+
+    assert result.error is None
+    assert result.attempts == 2
+    assert result.test_code.startswith("from module import add")
+    retry_prompt = generator.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "rejected: syntax error on line 1" in retry_prompt
+
+def test_invalid_tests_become_errors_when_attempts_run_out():
+    from pytestgen.validation import TestValidator
+
+    generator = TestGenerator(api_key="test-key", validator=TestValidator(), max_attempts=2)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.return_value = _make_response("def test_add():\n    assert add(1, 2) == 3")
+
+    [result] = generator.generate_tests_for_functions([_make_module_function("add")])
+
+    assert generator.client.chat.completions.create.call_count == 2
+    assert result.attempts == 2
+    assert result.error == "generated tests failed validation: 'add' is used but never imported"
+
+def test_rejected_answers_are_not_replayed_from_cache(tmp_path):
+    from pytestgen.cache import ResponseCache
+    from pytestgen.validation import TestValidator
+
+    generator = TestGenerator(
+        api_key="test-key", cache=ResponseCache(tmp_path), validator=TestValidator(), max_attempts=2
+    )
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.return_value = _make_response("def test_add():\n    assert add(1, 2) == 3")
+
+    for _ in range(2):
+        [result] = generator.generate_tests_for_functions([_make_module_function("add")])
+        assert result.error and not result.cached
+
+    assert generator.client.chat.completions.create.call_count == 4
+    assert generator.cache.stats().entries == 0
+
+def test_metrics_record_requests_and_cache_hits(tmp_path):
+    from pytestgen.cache import ResponseCache
+
+    generator = TestGenerator(api_key="test-key", cache=ResponseCache(tmp_path))
+    generator.client = MagicMock()
+    response = _make_response("def test_f():\n    pass")
+    response.usage.prompt_tokens = 80
+    response.usage.completion_tokens = 20
+    generator.client.chat.completions.create.return_value = response
+
+    generator.generate_test(_make_function_info("f"))
+    generator.generate_test(_make_function_info("f"))
+
+    summary = generator.metrics.summary()
+    assert summary["counters"]["requests"] == 1
+    assert summary["counters"]["prompt_tokens"] == 80
+    assert summary["counters"]["completion_tokens"] == 20
+    assert summary["histograms"]["request_latency_seconds"]["count"] == 1
+    assert summary["cache_hit_rate"] == 0.5
+
+def test_module_context_is_a_shared_prefix(tmp_path):
+    path = tmp_path / "calc.py"
+    path.write_text(
+        "import math\n\nSCALE = 2\n\ndef add(a, b):\n    return a + b\n\ndef sub(a, b):\n    return a - b\n",
+        encoding="utf-8"
+    )
+    generator = TestGenerator(api_key="test-key", module_context_tokens=500)
+    generator.client = MagicMock()
+    response = _make_response("def test_f():\n    pass")
+    response.usage.prompt_tokens_details.cached_tokens = 30
+    generator.client.chat.completions.create.return_value = response
+
+    generator.generate_tests_for_functions([
+        _make_module_function("add", file_path=str(path)),
+        _make_module_function("sub", file_path=str(path)),
+    ])
+
+    first, second = [call.kwargs["messages"] for call in generator.client.chat.completions.create.call_args_list]
+    assert first[0] == second[0]
+    assert "SCALE = 2\n\ndef add(a, b):\n    ...\n\ndef sub(a, b):" in first[0]["content"]
+    assert "def add(" in first[1]["content"] and "def sub(" in second[1]["content"]
+    assert generator.metrics.summary()["counters"]["cached_prompt_tokens"] == 60
+
+def test_module_context_disabled_by_default(tmp_path):
+    path = tmp_path / "calc.py"
+    path.write_text("SCALE = 2\n", encoding="utf-8")
+    generator = TestGenerator(api_key="test-key")
+
+    request = generator.build_request(_make_module_function("add", file_path=str(path)))
+
+    assert request["messages"][0]["content"] == "You are a helpful assistant."
+
+def test_prompts_name_the_module_to_import_from(tmp_path):
+    from pytestgen.validation import TestValidator
+
+    package = tmp_path / "src" / "calc"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text("", encoding="utf-8")
+    (package / "ops.py").write_text("def add(a, b):\n    return a + b\n", encoding="utf-8")
+    function_info = {
+        "function_name": "add", "args": [{"name": "a", "annotation": None}, {"name": "b", "annotation": None}],
+        "docstring": None, "line_number": 1, "is_test": False, "file_path": str(package / "ops.py"),
+    }
+    generator = TestGenerator(api_key="test-key", validator=TestValidator(), max_attempts=2)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.side_effect = [
+        _make_response("def test_add():\n    assert add(1, 2) == 3"),
+        _make_response("from calc.ops import add\n\ndef test_add():\n    assert add(1, 2) == 3"),
+    ]
+
+    # the answer rejected for a missing import is repaired with the same import line
+    [result] = generator.generate_tests_for_functions([function_info])
+
+    first_prompt = generator.client.chat.completions.create.call_args_list[0].kwargs["messages"][1]["content"]
+    retry_prompt = generator.client.chat.completions.create.call_args_list[1].kwargs["messages"][1]["content"]
+    assert "`from calc.ops import add`" in first_prompt
+    assert "Import the function under test with `from calc.ops import add`" in retry_prompt
+    assert result.error is None
+
+def test_answer_following_the_import_hint_is_accepted_first_time(tmp_path):
+    from pytestgen.validation import TestValidator
+
+    (tmp_path / "calc.py").write_text("class Calculator:\n    def add(self, a, b):\n        return a + b\n", encoding="utf-8")
+    function_info = {
+        "function_name": "add", "class_name": "Calculator", "args": [], "docstring": None,
+        "line_number": 2, "is_test": False, "file_path": str(tmp_path / "calc.py"),
+    }
+    generator = TestGenerator(api_key="test-key", validator=TestValidator(), max_attempts=2)
+    generator.client = MagicMock()
+    generator.client.chat.completions.create.return_value = _make_response(
+        "from calc import Calculator\n\ndef test_add():\n    assert Calculator().add(1, 2) == 3"
+    )
+
+    [result] = generator.generate_tests_for_functions([function_info])
+
+    prompt = generator.client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "`from calc import Calculator`" in prompt
+    assert result.error is None and result.attempts == 1
+    assert generator.client.chat.completions.create.call_count == 1
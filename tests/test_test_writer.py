@@ -0,0 +1,101 @@
+from pytestgen.test_generator import TestGenerationResult
+from pytestgen.test_writer import TestFileWriter, TestNameIndex
+
+def _result(name, code, file_path="pkg/module.py", error=None):
+    return TestGenerationResult(
+        function_info={"function_name": name, "file_path": file_path},
+        test_code=code,
+        error=error
+    )
+
+def test_writer_groups_results_by_module(tmp_path, monkeypatch):
+    replaced = []
+    import pytestgen.test_writer as test_writer
+    original = test_writer._atomic_write
+    monkeypatch.setattr(test_writer, "_atomic_write", lambda path, content: (replaced.append(path.name), original(path, content)))
+
+    results = [
+        _result("add", "import pytest\n\ndef test_add():\n    assert add(1, 2) == 3"),
+        _result("sub", "import pytest\n\ndef test_sub():\n    assert sub(3, 2) == 1"),
+        _result("bad", "", error="boom"),
+        _result("mul", "def test_mul():\n    assert mul(2, 3) == 6", file_path="pkg/other.py"),
+    ]
+
+    outcomes = list(TestFileWriter(tmp_path).write(results))
+
+    assert [o.result.function_info["function_name"] for o in outcomes] == ["add", "sub", "bad", "mul"]
+    assert outcomes[2].test_file is None
+    assert replaced == ["test_module.py", "test_other.py"]
+    content = (tmp_path / "test_module.py").read_text()
+    assert content.count("import pytest") == 1
+    assert "def test_add()" in content and "def test_sub()" in content
+    assert not list(tmp_path.glob("*.tmp"))
+
+def test_writer_merges_without_duplicating_tests(tmp_path):
+    test_file = tmp_path / "test_module.py"
+    test_file.write_text("import pytest\n\ndef test_add():\n    assert add(0, 0) == 0\n", encoding="utf-8")
+
+    outcomes = list(TestFileWriter(tmp_path).write([
+        _result("add", "import pytest\n\ndef test_add():\n    assert add(1, 2) == 3\n\n@pytest.mark.slow\ndef test_add_large():\n    pass"),
+        _result("sub", "def test_add():\n    pass"),
+    ]))
+
+    content = test_file.read_text()
+    assert content.count("def test_add():") == 1
+    assert "assert add(0, 0) == 0" in content
+    assert "@pytest.mark.slow\ndef test_add_large():" in content
+    assert (outcomes[0].added, outcomes[0].skipped) == (1, 1)
+    assert (outcomes[1].added, outcomes[1].skipped) == (0, 1)
+
+def test_writer_overwrite_replaces_existing_file_once(tmp_path):
+    test_file = tmp_path / "test_module.py"
+    test_file.write_text("def test_old():\n    pass\n", encoding="utf-8")
+    writer = TestFileWriter(tmp_path, overwrite=True)
+
+    list(writer.write([_result("add", "def test_add():\n    pass")]))
+    # a later group for the same file in the same run merges instead of replacing
+    list(writer.write([_result("sub", "def test_sub():\n    pass")]))
+
+    content = test_file.read_text()
+    assert "test_old" not in content
+    assert "def test_add()" in content and "def test_sub()" in content
+
+def test_name_index_keeps_unparseable_code():
+    index = TestNameIndex()
+    index.add_source("def test_a():\n    pass\n")
+
+    blocks, added, skipped = index.select_new("def test_a(:\n")
+
+    assert blocks == ["def test_a(:"]
+    assert (added, skipped) == (1, 0)
+
+def test_writer_merges_methods_into_existing_test_classes(tmp_path, caplog):
+    test_file = tmp_path / "test_module.py"
+    test_file.write_text("class TestCalculator:\n    def test_mul(self):\n        assert True\n\ndef test_other():\n    pass\n", encoding="utf-8")
+
+    outcomes = list(TestFileWriter(tmp_path).write([
+        _result("add", "class TestCalculator:\n    def test_add(self):\n        assert add(1, 2) == 3"),
+        _result("sub", "class TestCalculator:\n\n    @staticmethod\n    def test_sub():\n        assert sub(3, 2) == 1\n\n    def test_mul(self):\n        pass"),
+    ]))
+
+    content = test_file.read_text()
+    assert content.count("class TestCalculator") == 1
+    assert content.index("def test_mul") < content.index("def test_add") < content.index("def test_sub") < content.index("def test_other")
+    assert "    @staticmethod\n    def test_sub():\n        assert sub(3, 2) == 1" in content
+    assert [(o.added, o.skipped) for o in outcomes] == [(1, 0), (1, 1)]
+    assert "TestCalculator.test_mul" in caplog.text
+
+def test_writer_keeps_modules_with_the_same_name_apart_across_runs(tmp_path):
+    project = tmp_path / "project"
+    for package in ("app", "vendor"):
+        (project / package).mkdir(parents=True)
+    (project / "vendor" / "__init__.py").write_text("", encoding="utf-8")
+    out = tmp_path / "tests"
+
+    for file_path in ("vendor/text.py", "app/text.py", "text.py"):
+        list(TestFileWriter(out, project_dir=project).write([
+            _result("slugify", "def test_slugify():\n    pass", file_path=str(project / file_path)),
+        ]))
+
+    assert sorted(path.name for path in out.glob("*.py")) == ["test_app_text.py", "test_text.py", "test_vendor_text.py"]
+    assert all("def test_slugify" in path.read_text() for path in out.glob("*.py"))
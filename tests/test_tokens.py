@@ -0,0 +1,32 @@
+from pytestgen import tokens
+from pytestgen.tokens import TRUNCATION_MARKER, completion_budget, estimate_tokens, truncate_to_tokens
+
+def test_estimate_tokens_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(tokens, "tiktoken", None)
+    tokens._encoding.cache_clear()
+    try:
+        assert estimate_tokens("") == 1
+        assert estimate_tokens("x" * 400) == 101
+    finally:
+        tokens._encoding.cache_clear()
+
+def test_truncate_to_tokens_fits_budget():
+    text = "word " * 500
+
+    short = truncate_to_tokens(text, 50)
+
+    assert short.endswith(TRUNCATION_MARKER)
+    assert estimate_tokens(short) <= 50
+    assert text.startswith(short[:-len(TRUNCATION_MARKER)])
+    assert truncate_to_tokens("short", 50) == "short"
+
+def test_completion_budget_scales_with_complexity():
+    simple = {"args": [], "complexity": 1}
+    branchy = {"args": [{"name": "a"}, {"name": "b"}], "complexity": 6}
+
+    assert completion_budget(simple, 1000) == 400
+    assert completion_budget(branchy, 1000) == 1000
+    assert completion_budget(branchy, 5000) == 1000
+    # records without a complexity (older indexes) count as straight-line code
+    assert completion_budget({"args": []}, 1000) == 400
+    assert completion_budget(simple, 100) == 100
@@ -0,0 +1,35 @@
+import pytest
+from pytestgen import validation
+from pytestgen.validation import TestValidator
+
+FUNCTION_INFO = {"function_name": "add", "class_name": None, "file_path": "calc.py"}
+
+def test_validate_accepts_importing_test():
+    code = "from calc import add\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+    assert TestValidator().validate(code, FUNCTION_INFO) is None
+
+def test_validate_reports_syntax_errors():
+    problem = TestValidator().validate("def test_add(:\n    pass\n", FUNCTION_INFO)
+    assert problem.startswith("syntax error on line 1")
+
+def test_validate_reports_missing_import_of_target():
+    problem = TestValidator().validate("def test_add():\n    assert add(1, 2) == 3\n", FUNCTION_INFO)
+    assert problem == "'add' is used but never imported"
+    # methods are reached through their class
+    method = {"function_name": "area", "class_name": "Shape"}
+    assert TestValidator().validate("def test_area():\n    assert Shape().area() == 0\n", method) == \
+        "'Shape' is used but never imported"
+    assert TestValidator().validate("import calc\n\ndef test_add():\n    assert calc.add(1, 2) == 3\n", FUNCTION_INFO) is None
+
+def test_validate_rejects_empty_code():
+    assert TestValidator().validate("  \n", FUNCTION_INFO) == "no test code was returned"
+
+def test_lint_reports_redefined_tests():
+    pytest.importorskip("pyflakes")
+    code = "from calc import add\n\ndef test_add():\n    pass\n\ndef test_add():\n    pass\n"
+    assert "redefinition" in TestValidator(lint=True).validate(code, FUNCTION_INFO)
+
+def test_lint_is_skipped_without_pyflakes(monkeypatch):
+    monkeypatch.setattr(validation, "pyflakes_checker", None)
+    code = "from calc import add\n\ndef test_add():\n    assert undefined_name\n"
+    assert TestValidator(lint=True).validate(code, FUNCTION_INFO) is None
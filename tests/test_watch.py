@@ -0,0 +1,98 @@
+import os
+
+from pytestgen.discovery_index import DiscoveryIndex
+from pytestgen.function_discovery import FunctionDiscovery
+from pytestgen.metrics import Metrics
+from pytestgen.watch import FunctionWatcher
+
+def _write(path, content, mtime_ns=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+class FakeTime:
+    """Clock advanced by sleeping; runs scheduled edits before each poll."""
+
+    def __init__(self, edits=None):
+        self.now = 0.0
+        self.edits = dict(edits or {})
+        self.sleeps = 0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.sleeps += 1
+        edit = self.edits.pop(self.sleeps, None)
+        if edit is not None:
+            edit()
+
+def _names(functions):
+    return [func["function_name"] for func in functions]
+
+def test_reports_only_new_or_changed_untested_functions(tmp_path):
+    _write(tmp_path / "app.py", "def add(a, b):\n    return a + b\n\ndef sub(a, b):\n    return a - b\n", 1)
+    _write(tmp_path / "tests" / "test_app.py", "def test_mul():\n    pass\n", 1)
+    metrics = Metrics()
+    watcher = FunctionWatcher(FunctionDiscovery(tmp_path, metrics=metrics), metrics=metrics)
+    assert watcher.start() == 2
+
+    # nothing changed: no re-parse
+    assert watcher.apply(*watcher.changed_files()) == []
+    parsed = metrics.summary()["counters"]["files_processed"]
+
+    _write(tmp_path / "app.py", (
+        "def add(a, b):\n    return a + b\n\n"
+        "def sub(a, b):\n    return b - a\n\n"
+        "def mul(a, b):\n    return a * b\n\n"
+        "def div(a, b):\n    return a / b\n"
+    ), 2)
+    assert _names(watcher.apply(*watcher.changed_files())) == ["sub", "div"]
+    assert metrics.summary()["counters"]["files_processed"] == parsed + 1
+
+def test_new_tests_and_deleted_files_update_the_index(tmp_path):
+    _write(tmp_path / "app.py", "def add(a, b):\n    return a + b\n", 1)
+    watcher = FunctionWatcher(FunctionDiscovery(tmp_path))
+    watcher.start()
+
+    _write(tmp_path / "tests" / "test_app.py", "def test_add():\n    pass\n", 2)
+    _write(tmp_path / "app.py", "def add(a, b):\n    return b + a\n", 2)
+    assert watcher.apply(*watcher.changed_files()) == []
+
+    (tmp_path / "app.py").unlink()
+    modified, deleted = watcher.changed_files()
+    assert (modified, deleted) == (set(), {tmp_path / "app.py"})
+    watcher.apply(modified, deleted)
+    assert tmp_path / "app.py" not in watcher.functions
+
+def test_wait_debounces_a_burst_of_saves(tmp_path):
+    _write(tmp_path / "app.py", "def add(a, b):\n    return a + b\n", 1)
+    time = FakeTime({
+        2: lambda: _write(tmp_path / "app.py", "def add(a, b):\n    return b + a\n", 2),
+        3: lambda: _write(tmp_path / "other.py", "def neg(a):\n    return -a\n", 3),
+    })
+    index = DiscoveryIndex(tmp_path / "index.json")
+    watcher = FunctionWatcher(
+        FunctionDiscovery(tmp_path, index=index), poll_interval=1.0, debounce=0.5,
+        clock=time.clock, sleep=time.sleep
+    )
+    watcher.start()
+
+    assert _names(watcher.wait()) == ["add", "neg"]
+    # both saves were processed together once the tree was quiet
+    assert time.sleeps == 4
+    assert str(tmp_path / "other.py") in DiscoveryIndex(tmp_path / "index.json").entries
+
+def test_tests_written_outside_the_project_are_indexed(tmp_path):
+    project, out = tmp_path / "project", tmp_path / "out"
+    _write(project / "app.py", "def add(a, b):\n    return a + b\n", 1)
+    watcher = FunctionWatcher(FunctionDiscovery(project, test_dirs=[out]))
+    watcher.start()
+
+    _write(out / "test_app.py", "def test_add():\n    pass\n", 2)
+    _write(project / "app.py", "def add(a, b):\n    return b + a\n", 3)
+
+    assert watcher.apply(*watcher.changed_files()) == []
+    assert list(watcher.external_files) == [out / "test_app.py"]